@@ -3,33 +3,251 @@ FastAPI application for Credit Risk Prediction
 This API provides endpoints to predict credit risk based on applicant data.
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List
 import joblib
 import numpy as np
-import pandas as pd
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import MinMaxScaler, LabelEncoder
+import asyncio
+import functools
+import hashlib
+import hmac
+import json
 import logging
+import os
+import time
 from joblib import load
+from artifact_bundle import BUNDLE_PATH_ENV_VAR, DEFAULT_BUNDLE_PATH, MANIFEST_FILE, bundle_exists, load_bundle
+from coalescer import PredictionCoalescer
+from inference_executor import ExecutorSaturated, InferenceExecutor
+from metrics import (CONTENT_TYPE_LATEST, REGISTRY, STAGE_SECONDS, Counter, Gauge, Histogram, RequestMetricsMiddleware,
+                     collect_stages, observe_stages, record_stage, timed_handler)
+from record_stream import (CSV_CONTENT_TYPES, NDJSON_CONTENT_TYPES, BodyStreamingResponse, RecordError,
+                           iter_csv_records, iter_ndjson_records)
+from feature_layout import DEFAULT_BINARY_ENCODINGS, FeatureLayout
+from fused_transform import FusedTransform
+from forest_engine import load_inference_engine
+from scoring_policy import ScoringPolicy, load_scoring_policy
+from ttl_cache import TTLCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Global variables for caching
-model = None
-train_columns = None
-imputer = None
-scaler = None
+model_artifacts = None  # active ModelArtifacts, replaced as a whole on reload
+scoring_policy = None
+
+# Files the pickled (non-bundle) artifact set is loaded from
+MODEL_FILE = 'random_forest_model.pkl'
+PREPROCESSING_FILES = ('feature_info.json', 'fitted_imputer.pkl', 'fitted_scaler.pkl')
+
+# Training columns filled directly from applicant values, in applicant_values() order
+RAW_FEATURES = (
+    'CODE_GENDER', 'FLAG_OWN_CAR', 'FLAG_OWN_REALTY', 'CNT_CHILDREN',
+    'AMT_INCOME_TOTAL', 'AMT_CREDIT', 'AMT_ANNUITY', 'AMT_GOODS_PRICE',
+    'DAYS_BIRTH', 'DAYS_EMPLOYED',
+    'FLAG_MOBIL', 'FLAG_WORK_PHONE', 'FLAG_PHONE', 'FLAG_EMAIL',
+    'EXT_SOURCE_1', 'EXT_SOURCE_2', 'EXT_SOURCE_3',
+    'REGION_POPULATION_RELATIVE',
+)
+
+# One-hot encoded column prefixes, in applicant_categories() order
+CATEGORICAL_FEATURES = (
+    'NAME_INCOME_TYPE', 'NAME_EDUCATION_TYPE', 'NAME_FAMILY_STATUS',
+    'NAME_HOUSING_TYPE', 'NAME_CONTRACT_TYPE', 'OCCUPATION_TYPE', 'ORGANIZATION_TYPE',
+)
+
+
+class MissingReferenceStats(RuntimeError):
+    """
+    No fitted preprocessing statistics (artifact bundle or fitted imputer/scaler pickles)
+    """
+
+
+class ArtifactVersionMismatch(RuntimeError):
+    """
+    A process worker could not load the artifact version the caller scored with
+    """
+
+
+def strip_feature_names(estimator, columns):
+    """
+    Drop the DataFrame feature names a fitted transformer remembers
+    The feature layout fixes the column order, so requests are passed as plain float64 arrays
+    """
+    fitted_names = getattr(estimator, 'feature_names_in_', None)
+    if fitted_names is None:
+        return
+    if list(fitted_names) != list(columns):
+        raise ValueError(f"{type(estimator).__name__} was fitted on different columns than feature_info.json")
+    del estimator.feature_names_in_
+
+class ModelArtifacts:
+    """
+    One loaded set of scoring artifacts: model, column layout and preprocessing
+    
+    A set is never modified after loading. Requests take the active set once and use it
+    throughout, so a reload swaps versions between requests, never within one.
+    """
+    
+    def __init__(self, inference_engine, feature_layout: FeatureLayout, model_metadata: dict, version: str,
+                 source: str, fused_transform: Optional[FusedTransform] = None, imputer=None, scaler=None,
+                 binary_encodings: Optional[dict] = None, mmap: bool = False, load_seconds: float = 0.0,
+                 bundle_path: Optional[str] = None):
+        self.inference_engine = inference_engine
+        self.feature_layout = feature_layout
+        self.model_metadata = model_metadata
+        self.version = version
+        self.source = source
+        self.fused_transform = fused_transform
+        self.imputer = imputer
+        self.scaler = scaler
+        self.binary_encodings = binary_encodings if binary_encodings is not None else DEFAULT_BINARY_ENCODINGS
+        self.mmap = mmap
+        self.load_seconds = load_seconds
+        self.bundle_path = bundle_path  # absolute bundle directory, None for the pickled set
+        self.loaded_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    
+    @property
+    def train_columns(self) -> List[str]:
+        return self.feature_layout.columns
+    
+    def info(self) -> dict:
+        return {
+            "artifact_version": self.version,
+            "artifact_source": self.source,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3),
+        }
+
+
+def file_version(paths) -> str:
+    """
+    Version of a pickled artifact set, derived from the size and modification time of its files
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return f"pkl-{digest.hexdigest()[:12]}"
+
+
+def load_model_artifacts(bundle_path: Optional[str] = None) -> ModelArtifacts:
+    """
+    Load the trained model and preprocessing artifacts
+    
+    From the artifact bundle at bundle_path (default: ARTIFACT_BUNDLE), falling back to the
+    pickled model and preprocessing objects when no bundle_path is given and no bundle exists.
+    Raises MissingReferenceStats when neither provides fitted preprocessing.
+    """
+    start = time.perf_counter()
+    explicit_bundle = bundle_path is not None
+    bundle_path = bundle_path or os.getenv(BUNDLE_PATH_ENV_VAR, DEFAULT_BUNDLE_PATH)
+    artifacts_mmap = os.getenv("ARTIFACT_MMAP", "false").lower() == "true"
+    
+    if bundle_exists(bundle_path):
+        # Precomputed bundle (see build_bundle.py): no pickles and no training CSV at startup.
+        # With ARTIFACT_MMAP=true the arrays are mapped read-only, so every uvicorn worker
+        # shares the same page-cache copy of the forest instead of holding its own.
+        bundle = load_bundle(bundle_path, mmap_mode='r' if artifacts_mmap else None)
+        artifacts = ModelArtifacts(
+            inference_engine=bundle.forest,
+            feature_layout=FeatureLayout(bundle.columns, RAW_FEATURES, CATEGORICAL_FEATURES),
+            model_metadata=bundle.model_info,
+            version=bundle.version,
+            source=f"bundle:{bundle_path}",
+            fused_transform=bundle.transform,
+            binary_encodings=bundle.manifest.get('binary_encodings'),
+            mmap=artifacts_mmap,
+            load_seconds=time.perf_counter() - start,
+            bundle_path=os.path.abspath(bundle_path),
+        )
+        logger.info(f"Loaded artifact bundle {artifacts.version} from {bundle_path}: {len(bundle.columns)} features"
+                    f"{' (memory-mapped)' if artifacts_mmap else ''}")
+        return artifacts
+    
+    if explicit_bundle:
+        raise FileNotFoundError(f"No artifact bundle at {bundle_path}")
+    if artifacts_mmap:
+        logger.warning("ARTIFACT_MMAP needs an artifact bundle; loading pickled artifacts into worker memory")
+    
+    model = joblib.load(MODEL_FILE)
+    logger.info("Model loaded successfully")
+    model_metadata = {
+        "model_type": type(model).__name__,
+        "n_features": model.n_features_in_ if hasattr(model, 'n_features_in_') else "Unknown",
+        "classes": model.classes_.tolist() if hasattr(model, 'classes_') else None,
+    }
+    if hasattr(model, 'n_estimators'):
+        model_metadata["n_estimators"] = model.n_estimators
+    
+    # sklearn by default; INFERENCE_ENGINE=compiled flattens the forest into NumPy arrays
+    inference_engine = load_inference_engine(model)
+    
+    # Preprocessing must come from training; fitting on request data would make scores
+    # depend on whatever traffic arrived first
+    missing = [path for path in PREPROCESSING_FILES if not os.path.exists(path)]
+    if missing:
+        raise MissingReferenceStats(
+            f"Fitted preprocessing not found ({', '.join(missing)}). Build an artifact bundle with "
+            f"'python build_bundle.py --from-csv credit_risk_data/application_train.csv' or run save_preprocessing.py"
+        )
+    
+    with open('feature_info.json', 'r') as f:
+        feature_info = json.load(f)
+        train_columns = feature_info['feature_columns']
+    
+    imputer = joblib.load('fitted_imputer.pkl')
+    scaler = joblib.load('fitted_scaler.pkl')
+    strip_feature_names(imputer, train_columns)
+    strip_feature_names(scaler, train_columns)
+    
+    # Fold imputer + scaler into one kernel, checked against sklearn before it is used
+    try:
+        fused_transform = FusedTransform.from_fitted(imputer, scaler)
+        max_diff = fused_transform.validate(imputer, scaler)
+        logger.info(f"Compiled fused impute+scale transform (max deviation {max_diff:.1e})")
+    except ValueError as e:
+        logger.warning(f"Fused transform unavailable, using sklearn transforms: {e}")
+        fused_transform = None
+    logger.info(f"Loaded preprocessing artifacts: {len(train_columns)} features")
+    
+    return ModelArtifacts(
+        inference_engine=inference_engine,
+        feature_layout=FeatureLayout(train_columns, RAW_FEATURES, CATEGORICAL_FEATURES),
+        model_metadata=model_metadata,
+        version=file_version((MODEL_FILE,) + PREPROCESSING_FILES),
+        source=f"pickle:{MODEL_FILE}",
+        fused_transform=fused_transform,
+        imputer=imputer,
+        scaler=scaler,
+        load_seconds=time.perf_counter() - start,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the artifact file watcher (MODEL_WATCH_INTERVAL seconds, 0 = off) for the server's lifetime
+    """
+    watcher = None
+    if MODEL_WATCH_INTERVAL > 0:
+        watcher = asyncio.create_task(watch_model_artifacts(MODEL_WATCH_INTERVAL))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Credit Risk Prediction API",
     description="API for predicting credit risk based on applicant financial data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -41,64 +259,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request counts, latency and in-flight requests per route for /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
 # Load the trained model and preprocessing artifacts
 try:
-    model = joblib.load('random_forest_model.pkl')
-    logger.info("Model loaded successfully")
-    
-    # Try to load saved preprocessing artifacts
-    try:
-        import json
-        with open('feature_info.json', 'r') as f:
-            feature_info = json.load(f)
-            train_columns = feature_info['feature_columns']
-        
-        imputer = joblib.load('fitted_imputer.pkl')
-        scaler = joblib.load('fitted_scaler.pkl')
-        logger.info(f"Loaded preprocessing artifacts: {len(train_columns)} features")
-        
-    except FileNotFoundError:
-        logger.warning("Preprocessing artifacts not found. Will generate from training data...")
-        # Load training data to get column structure (need full dataset for all categories)
-        train_data = pd.read_csv('credit_risk_data/application_train.csv')
-        logger.info(f"Training data loaded: {train_data.shape}")
-        
-        # Label encode binary columns (same as training)
-        le = LabelEncoder()
-        for col in train_data:
-            if train_data[col].dtype == 'object':
-                if len(list(train_data[col].unique())) <= 2:
-                    try:
-                        le.fit(train_data[col])
-                        train_data[col] = le.transform(train_data[col])
-                    except:
-                        pass
-        
-        # One-hot encode
-        train_data = pd.get_dummies(train_data)
-        
-        # Drop target and other columns (same as training)
-        columns_to_drop = ['TARGET']
-        for col in ['CODE_GENDER_XNA', 'NAME_INCOME_TYPE_Maternity leave', 'NAME_FAMILY_STATUS_Unknown']:
-            if col in train_data.columns:
-                columns_to_drop.append(col)
-        
-        train_columns = [col for col in train_data.columns if col not in columns_to_drop]
-        logger.info(f"Generated column structure: {len(train_columns)} features")
-        
-        # Create fresh imputer and scaler (will be fitted on first use)
-        imputer = SimpleImputer(strategy='median')
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        
-        # Clean up to free memory
-        del train_data
-        logger.info("Created new preprocessing pipelines")
-    
+    model_artifacts = load_model_artifacts()
+except MissingReferenceStats as e:
+    # Refuse to start rather than serve scores from unfitted preprocessing
+    logger.error(str(e))
+    raise
 except Exception as e:
     logger.error(f"Error during initialization: {e}")
     import traceback
     traceback.print_exc()
-    model = None
+    model_artifacts = None
+
+# Decision threshold and risk bands (scoring_policy.json, or the built-in 0.5 / 0.3 / 0.6)
+try:
+    scoring_policy = load_scoring_policy()
+    logger.info(f"Loaded scoring policy: {scoring_policy.version}")
+except Exception as e:
+    logger.error(f"Invalid scoring policy, using defaults: {e}")
+    scoring_policy = ScoringPolicy()
 
 
 class ApplicantData(BaseModel):
@@ -172,79 +355,546 @@ class HealthResponse(BaseModel):
     """
     status: str
     model_loaded: bool
+    pid: int
+    rss_mb: Optional[float] = None
+    shared_rss_mb: Optional[float] = None
+    artifacts_mmap: bool = False
+
+
+def process_memory() -> dict:
+    """
+    Resident memory of this worker process in MB
+    shared_rss_mb counts file-backed and shared pages (e.g. a memory-mapped bundle),
+    which are the same physical pages in every worker
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        kb = lambda key: int(status[key].split()[0]) if key in status else 0
+        return {
+            "rss_mb": round(kb('VmRSS') / 1024, 1),
+            "shared_rss_mb": round((kb('RssFile') + kb('RssShmem')) / 1024, 1),
+        }
+    except OSError:
+        # Not Linux: peak RSS is the best available figure (KB on Linux/BSD, bytes on macOS)
+        import resource
+        import sys
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_mb": round(max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)}
+
+
+def applicant_values(data: ApplicantData) -> tuple:
+    """
+    Raw numeric feature values for an applicant, in RAW_FEATURES order
+    """
+    return (
+        1 if data.code_gender == 'M' else 0,
+        1 if data.flag_own_car == 'Y' else 0,
+        1 if data.flag_own_realty == 'Y' else 0,
+        data.cnt_children,
+        data.amt_income_total,
+        data.amt_credit,
+        data.amt_annuity if data.amt_annuity else data.amt_credit / 12,
+        data.amt_goods_price if data.amt_goods_price else data.amt_credit * 0.9,
+        data.days_birth,
+        data.days_employed,
+        data.flag_mobil,
+        data.flag_work_phone,
+        data.flag_phone,
+        data.flag_email,
+        data.ext_source_1 if data.ext_source_1 is not None else np.nan,
+        data.ext_source_2 if data.ext_source_2 is not None else np.nan,
+        data.ext_source_3 if data.ext_source_3 is not None else np.nan,
+        data.region_population_relative if data.region_population_relative else 0.02,
+    )
+
+
+def applicant_categories(data: ApplicantData) -> tuple:
+    """
+    Categorical values for an applicant, in CATEGORICAL_FEATURES order
+    """
+    return (
+        data.name_income_type,
+        data.name_education_type,
+        data.name_family_status,
+        data.name_housing_type,
+        data.name_contract_type,
+        data.occupation_type,
+        data.organization_type,
+    )
 
 
-def preprocess_input(data: ApplicantData) -> np.ndarray:
+def transform_features(matrix: np.ndarray, artifacts: ModelArtifacts = None) -> np.ndarray:
+    """
+    Impute and scale an encoded feature matrix with the fitted preprocessing objects
+    The matrix is a buffer owned by the caller and may be transformed in place
+    """
+    artifacts = artifacts or model_artifacts
+    start = time.perf_counter()
+    if artifacts.fused_transform is not None:
+        matrix = artifacts.fused_transform.transform(matrix, inplace=True)
+    else:
+        # Impute missing values, then scale features
+        matrix = artifacts.scaler.transform(artifacts.imputer.transform(matrix))
+    record_stage("transform", start)
+    return matrix
+
+
+def preprocess_input(data: ApplicantData, artifacts: ModelArtifacts = None) -> np.ndarray:
     """
     Preprocess input data to match training data format
     This creates a full feature set matching the 239 features the model expects
     """
-    global train_columns, imputer, scaler
+    artifacts = artifacts or model_artifacts
+    if artifacts is None:
+        raise HTTPException(status_code=500, detail="Training columns not initialized")
+    
+    # Encode straight into a float64 row at the layout's precomputed offsets
+    start = time.perf_counter()
+    layout = artifacts.feature_layout
+    row = layout.new_matrix(1)
+    layout.encode_row(applicant_values(data), applicant_categories(data), row[0])
+    record_stage("preprocess", start)
     
-    if train_columns is None:
+    return transform_features(row, artifacts)
+
+
+def preprocess_batch(applicants: List[ApplicantData], artifacts: ModelArtifacts = None) -> np.ndarray:
+    """
+    Preprocess many applicants at once into a single feature matrix
+    Rows are encoded exactly like preprocess_input, but the imputer and scaler run once per batch
+    """
+    artifacts = artifacts or model_artifacts
+    if artifacts is None:
         raise HTTPException(status_code=500, detail="Training columns not initialized")
     
-    # Create input features dictionary with numerical values
-    features = {
-        'CODE_GENDER': 1 if data.code_gender == 'M' else 0,
-        'FLAG_OWN_CAR': 1 if data.flag_own_car == 'Y' else 0,
-        'FLAG_OWN_REALTY': 1 if data.flag_own_realty == 'Y' else 0,
-        'CNT_CHILDREN': data.cnt_children,
-        'AMT_INCOME_TOTAL': data.amt_income_total,
-        'AMT_CREDIT': data.amt_credit,
-        'AMT_ANNUITY': data.amt_annuity if data.amt_annuity else data.amt_credit / 12,
-        'AMT_GOODS_PRICE': data.amt_goods_price if data.amt_goods_price else data.amt_credit * 0.9,
-        'DAYS_BIRTH': data.days_birth,
-        'DAYS_EMPLOYED': data.days_employed,
-        'FLAG_MOBIL': data.flag_mobil,
-        'FLAG_WORK_PHONE': data.flag_work_phone,
-        'FLAG_PHONE': data.flag_phone,
-        'FLAG_EMAIL': data.flag_email,
-        'EXT_SOURCE_1': data.ext_source_1 if data.ext_source_1 is not None else np.nan,
-        'EXT_SOURCE_2': data.ext_source_2 if data.ext_source_2 is not None else np.nan,
-        'EXT_SOURCE_3': data.ext_source_3 if data.ext_source_3 is not None else np.nan,
-        'REGION_POPULATION_RELATIVE': data.region_population_relative if data.region_population_relative else 0.02,
-    }
+    start = time.perf_counter()
+    matrix = artifacts.feature_layout.encode_batch(
+        [applicant_values(applicant) for applicant in applicants],
+        [applicant_categories(applicant) for applicant in applicants],
+    )
+    record_stage("preprocess", start)
     
-    # Add one-hot encoded categorical columns
-    categorical_mappings = {
-        f'NAME_INCOME_TYPE_{data.name_income_type}': 1,
-        f'NAME_EDUCATION_TYPE_{data.name_education_type}': 1,
-        f'NAME_FAMILY_STATUS_{data.name_family_status}': 1,
-        f'NAME_HOUSING_TYPE_{data.name_housing_type}': 1,
-        f'NAME_CONTRACT_TYPE_{data.name_contract_type}': 1,
-    }
+    return transform_features(matrix, artifacts)
+
+
+def score_batch(processed_data: np.ndarray, policy: ScoringPolicy = None, artifacts: ModelArtifacts = None) -> List[dict]:
+    """
+    Score a preprocessed feature matrix with a single predict_proba call
+    The label and risk level are both derived from that one probability computation
+    """
+    policy = policy or scoring_policy
+    artifacts = artifacts or model_artifacts
+    start = time.perf_counter()
+    probabilities = artifacts.inference_engine.predict_proba(processed_data)[:, 1]  # Probability of class 1 (default)
+    predictions = policy.labels(probabilities)
+    bands = policy.band_indices(probabilities)
+    
+    results = []
+    for prediction, probability, band in zip(predictions, probabilities, bands):
+        risk_band = policy.risk_bands[band]
+        results.append({
+            "prediction": int(prediction),
+            "probability": float(probability),
+            "risk_level": risk_band.level,
+            "message": risk_band.message
+        })
+    record_stage("inference", start)
+    return results
+
+
+def score_applicant(data: ApplicantData, policy: ScoringPolicy = None, artifacts: ModelArtifacts = None) -> dict:
+    """
+    Preprocess and score a single applicant
+    """
+    artifacts = artifacts or model_artifacts
+    return score_batch(preprocess_input(data, artifacts), policy, artifacts)[0]
+
+
+def score_applicants(applicants: List[ApplicantData], policy: ScoringPolicy = None,
+                     artifacts: ModelArtifacts = None) -> List[dict]:
+    """
+    Preprocess and score a list of applicants as one batch
+    """
+    artifacts = artifacts or model_artifacts
+    return score_batch(preprocess_batch(applicants, artifacts), policy, artifacts)
+
+
+def warm_worker(bundle_path: Optional[str] = None):
+    """
+    Process pool initializer: importing this module in the worker has loaded the default artifacts
+    Workers started after a reload are given the parent's active bundle and load that instead.
+    """
+    global model_artifacts
+    if bundle_path is not None and (model_artifacts is None or model_artifacts.bundle_path != bundle_path):
+        model_artifacts = load_model_artifacts(bundle_path)
+    if model_artifacts is None:
+        logger.error(f"Inference worker {os.getpid()} started without a model")
+    else:
+        logger.info(f"Inference worker {os.getpid()} ready "
+                    f"({model_artifacts.inference_engine.name} engine, version {model_artifacts.version})")
+
+
+# Scoring runs off the event loop (INFERENCE_EXECUTOR=inline|thread|process) so /health stays responsive.
+# The active scoring policy is passed with each call, so process workers always use the parent's policy.
+inference_executor = InferenceExecutor(
+    mode=os.getenv("INFERENCE_EXECUTOR", "thread").lower(),
+    max_workers=int(os.getenv("INFERENCE_WORKERS", "0")) or None,
+    max_pending=int(os.getenv("INFERENCE_MAX_PENDING", "64")),
+    initializer=warm_worker if os.getenv("INFERENCE_EXECUTOR", "thread").lower() == "process" else None,
+)
+
+
+def busy_response(e: ExecutorSaturated) -> HTTPException:
+    """
+    503 with Retry-After for callers turned away by the saturated executor
+    """
+    logger.warning(f"Rejected scoring request: {e}")
+    return HTTPException(status_code=503, detail="Scoring capacity exhausted, retry later",
+                         headers={"Retry-After": "1"})
+
+
+def score_in_worker(bundle_path: Optional[str], version: str, fn, *args):
+    """
+    Process worker side of run_scoring: collect_stages(fn, *args, None) with the worker's own artifacts
+    A worker holding another version than the caller's (it missed a reload, or the bundle changed
+    on disk since it started) loads the caller's bundle first.
+    """
+    global model_artifacts
+    if model_artifacts is None or model_artifacts.version != version:
+        logger.info(f"Inference worker {os.getpid()} loading artifact version {version}")
+        model_artifacts = load_model_artifacts(bundle_path)
+        if model_artifacts.version != version:
+            raise ArtifactVersionMismatch(f"Worker loaded artifact version {model_artifacts.version} "
+                                          f"from {model_artifacts.source}, caller scores with {version}")
+    return collect_stages(fn, *args, None)
+
+
+SCORING_BATCH_ROWS = Histogram("credit_risk_scoring_batch_rows", "Applicants per scoring call",
+                               buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096))
+SCORED_ROWS = Counter("credit_risk_scored_rows_total", "Applicants scored")
+Gauge("credit_risk_executor_in_flight", "Scoring calls running or queued in the executor",
+      function=lambda: inference_executor.in_flight)
+Counter("credit_risk_executor_rejected_total", "Scoring calls rejected because the executor was saturated",
+        function=lambda: inference_executor.rejected)
+
+
+async def run_scoring(fn, rows: int, *args, artifacts: ModelArtifacts):
+    """
+    Run fn(*args, artifacts) in the executor, recording its batch size and stage timings
+    Stages are timed where the scoring runs (a pool worker too) and observed here. Process
+    workers score with their own loaded copy of the artifacts, checked against the caller's
+    version; in-process modes pass the caller's set.
+    """
+    if inference_executor.mode == "process":
+        call = (score_in_worker, artifacts.bundle_path, artifacts.version, fn, *args)
+    else:
+        call = (collect_stages, fn, *args, artifacts)
+    result, stages = await inference_executor.run(*call)
+    SCORING_BATCH_ROWS.observe(rows)
+    SCORED_ROWS.inc(rows)
+    observe_stages(stages)
+    return result
+
+
+# Repeat /predict calls for the same applicant (quote, edit, submit) are answered from memory.
+# Entries are keyed by model version and expire after PREDICTION_CACHE_TTL seconds; 0 entries disables the cache.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+prediction_cache = (
+    TTLCache(maxsize=PREDICTION_CACHE_SIZE, ttl=float(os.getenv("PREDICTION_CACHE_TTL", "300")))
+    if PREDICTION_CACHE_SIZE > 0 else None
+)
+if prediction_cache is not None:
+    Counter("credit_risk_prediction_cache_hits_total", "/predict results served from the cache",
+            function=lambda: prediction_cache.hits)
+    Counter("credit_risk_prediction_cache_misses_total", "/predict cache lookups that had to score",
+            function=lambda: prediction_cache.misses)
+    Gauge("credit_risk_prediction_cache_entries", "Entries in the /predict result cache",
+          function=lambda: len(prediction_cache))
+
+
+def prediction_cache_key(data: ApplicantData, artifacts: ModelArtifacts) -> str:
+    """
+    Stable hash of the validated applicant fields (defaults filled in) and the model artifact version
+    """
+    canonical = json.dumps(data.model_dump(), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{artifacts.version}|{canonical}".encode()).hexdigest()
+
+
+# Rows scored per executor call by /predict/stream
+STREAM_CHUNK_SIZE = int(os.getenv("PREDICT_STREAM_CHUNK_SIZE", "1000"))
+
+# How long a streamed chunk waits for executor capacity before the stream is aborted
+STREAM_BUSY_TIMEOUT = float(os.getenv("PREDICT_STREAM_BUSY_TIMEOUT", "30"))
+
+
+def validation_message(e: ValidationError) -> str:
+    """
+    Compact one-line summary of a Pydantic validation error
+    """
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+async def score_stream_chunk(chunk: list) -> str:
+    """
+    Validate and score one chunk of (line_number, record) pairs, returning NDJSON output lines
+    Invalid records produce an error line in place; valid ones are scored as one batch.
+    """
+    start = time.perf_counter()
+    output = [None] * len(chunk)
+    applicants, positions = [], []
+    for i, (line_number, record) in enumerate(chunk):
+        if isinstance(record, RecordError):
+            output[i] = {"line": line_number, "error": str(record)}
+            continue
+        try:
+            applicants.append(ApplicantData.model_validate(record))
+            positions.append(i)
+        except ValidationError as e:
+            output[i] = {"line": line_number, "error": validation_message(e)}
+    STAGE_SECONDS.labels(stage="parse").observe(time.perf_counter() - start)
+    
+    if applicants:
+        # The response is already streaming, so wait for executor capacity instead of failing with 503
+        deadline = asyncio.get_running_loop().time() + STREAM_BUSY_TIMEOUT
+        while True:
+            try:
+                results = await run_scoring(score_applicants, len(applicants), applicants, scoring_policy,
+                                            artifacts=model_artifacts)
+                break
+            except ExecutorSaturated:
+                if asyncio.get_running_loop().time() > deadline:
+                    raise
+                await asyncio.sleep(0.05)
+        for i, result in zip(positions, results):
+            output[i] = {"line": chunk[i][0], **result}
     
-    if data.occupation_type:
-        categorical_mappings[f'OCCUPATION_TYPE_{data.occupation_type}'] = 1
-    if data.organization_type:
-        categorical_mappings[f'ORGANIZATION_TYPE_{data.organization_type}'] = 1
+    start = time.perf_counter()
+    text = "".join(json.dumps(line) + "\n" for line in output)
+    STAGE_SECONDS.labels(stage="serialize").observe(time.perf_counter() - start)
+    return text
+
+
+async def stream_predictions(records) -> str:
+    """
+    Score records in STREAM_CHUNK_SIZE chunks as they are parsed, yielding NDJSON text
+    A failure mid-stream ends the response with a final {"error": ...} line.
+    """
+    chunk = []
+    try:
+        async for item in records:
+            chunk.append(item)
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield await score_stream_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield await score_stream_chunk(chunk)
+    except Exception as e:
+        logger.error(f"Streaming prediction error: {e}")
+        yield json.dumps({"error": f"Streaming prediction failed: {str(e)}"}) + "\n"
+
+
+# Opt-in micro-batching of concurrent /predict calls
+prediction_coalescer = None
+if os.getenv("PREDICT_COALESCE", "false").lower() == "true":
+    prediction_coalescer = PredictionCoalescer(
+        lambda applicants: run_scoring(score_applicants, len(applicants), applicants, scoring_policy,
+                                       artifacts=model_artifacts),
+        max_wait_ms=float(os.getenv("PREDICT_COALESCE_MAX_WAIT_MS", "2")),
+        max_batch_size=int(os.getenv("PREDICT_COALESCE_MAX_BATCH", "64")),
+        # One batch per executor worker at a time; the executor's admission limit still applies
+        max_concurrent_batches=inference_executor.max_workers if inference_executor.mode != "inline" else 1,
+        max_queue=int(os.getenv("PREDICT_COALESCE_MAX_QUEUE", "1024")),
+    )
+    logger.info(f"Coalescing /predict calls: up to {prediction_coalescer.max_batch_size} rows "
+                f"or {prediction_coalescer.max_wait * 1000:g} ms, "
+                f"{prediction_coalescer.max_concurrent_batches} batches at a time")
+
+
+# Hot reload: a new artifact set is loaded and checked off the event loop, then swapped in as a whole
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+CANARY_ROWS = 64
+model_reload_lock = asyncio.Lock()
+
+
+def canary_applicants(artifacts: ModelArtifacts) -> List[ApplicantData]:
+    """
+    Applicants a new artifact set must score before it goes live
+    Read from MODEL_CANARY_PATH (NDJSON, one applicant per line) if set, otherwise generated
+    deterministically from the categories in the set's own column layout
+    """
+    canary_path = os.getenv("MODEL_CANARY_PATH")
+    if canary_path:
+        with open(canary_path, 'r') as f:
+            return [ApplicantData.model_validate_json(line) for line in f if line.strip()]
     
-    # Merge dictionaries
-    features.update(categorical_mappings)
+    rng = np.random.default_rng(0)
+    tables = artifacts.feature_layout.category_offsets
     
-    # Create a dataframe with all training columns, filled with 0
-    full_df = pd.DataFrame(0, index=[0], columns=train_columns, dtype=float)
+    def category(field, default=None):
+        values = sorted(tables.get(field, {}))
+        return values[int(rng.integers(len(values)))] if values else default
     
-    # Fill in the values we have
-    for col, val in features.items():
-        if col in full_df.columns:
-            full_df.at[0, col] = val
+    def score():
+        return float(rng.random()) if rng.random() < 0.8 else None
     
-    # If imputer/scaler aren't fitted yet, fit them on the current data
-    # (This is a fallback and won't be as good as using training-fitted ones)
-    if not hasattr(imputer, 'statistics_'):
-        imputer.fit(full_df)
-    if not hasattr(scaler, 'scale_'):
-        scaler.fit(full_df)
+    return [
+        ApplicantData(
+            code_gender=str(rng.choice(['M', 'F'])),
+            flag_own_car=str(rng.choice(['Y', 'N'])),
+            flag_own_realty=str(rng.choice(['Y', 'N'])),
+            cnt_children=int(rng.integers(0, 4)),
+            amt_income_total=float(rng.uniform(3e4, 1e6)),
+            amt_credit=float(rng.uniform(4e4, 2e6)),
+            name_income_type=category('NAME_INCOME_TYPE', 'Working'),
+            name_education_type=category('NAME_EDUCATION_TYPE', 'Secondary / secondary special'),
+            name_family_status=category('NAME_FAMILY_STATUS', 'Married'),
+            name_housing_type=category('NAME_HOUSING_TYPE', 'House / apartment'),
+            name_contract_type=category('NAME_CONTRACT_TYPE', 'Cash loans'),
+            occupation_type=category('OCCUPATION_TYPE'),
+            organization_type=category('ORGANIZATION_TYPE'),
+            days_birth=-int(rng.integers(7000, 25000)),
+            days_employed=-int(rng.integers(0, 9000)),
+            ext_source_1=score(),
+            ext_source_2=score(),
+            ext_source_3=score(),
+        )
+        for _ in range(CANARY_ROWS)
+    ]
+
+
+def validate_artifacts(artifacts: ModelArtifacts, policy: ScoringPolicy, current: Optional[ModelArtifacts]) -> dict:
+    """
+    Score the canary batch with a candidate artifact set; raises ValueError if it is unusable
+    Returns a summary, including how far its predictions move from the current set's
+    """
+    applicants = canary_applicants(artifacts)
+    probabilities = np.array([r["probability"] for r in score_applicants(applicants, policy, artifacts)])
+    if len(probabilities) != len(applicants) or not np.all(np.isfinite(probabilities)):
+        raise ValueError("Canary batch produced missing or non-finite probabilities")
+    if probabilities.min() < 0.0 or probabilities.max() > 1.0:
+        raise ValueError("Canary batch produced probabilities outside [0, 1]")
     
-    # Impute missing values using fitted imputer
-    full_df_imputed = imputer.transform(full_df)
+    report = {
+        "rows": len(applicants),
+        "mean_probability": round(float(probabilities.mean()), 6),
+        "positive_rate": round(float(policy.labels(probabilities).mean()), 6),
+    }
+    if current is not None:
+        previous = np.array([r["probability"] for r in score_applicants(applicants, policy, current)])
+        report["max_probability_shift"] = round(float(np.abs(probabilities - previous).max()), 6)
+        report["changed_predictions"] = int((policy.labels(probabilities) != policy.labels(previous)).sum())
+    return report
+
+
+async def reload_model_artifacts(bundle_path: Optional[str] = None) -> dict:
+    """
+    Load, validate and atomically activate a new artifact set
+    Without bundle_path the active bundle is reloaded (ARTIFACT_BUNDLE if none is active).
+    In-flight requests keep the set they started with; the active set is unchanged if loading
+    or validation fails.
+    """
+    global model_artifacts
     
-    # Scale features using fitted scaler
-    full_df_scaled = scaler.transform(full_df_imputed)
+    async with model_reload_lock:
+        current = model_artifacts
+        if bundle_path is None and current is not None:
+            bundle_path = current.bundle_path
+        artifacts = await asyncio.to_thread(load_model_artifacts, bundle_path)
+        if current is not None and artifacts.version == current.version:
+            return {"reloaded": False, **current.info()}
+        canary = await asyncio.to_thread(validate_artifacts, artifacts, scoring_policy, current)
+        
+        model_artifacts = artifacts
+        if inference_executor.mode == "process":
+            # Queued and running calls finish in the old workers; new calls start fresh ones,
+            # which load the bundle that is now active
+            inference_executor.initializer = functools.partial(warm_worker, artifacts.bundle_path)
+            inference_executor.shutdown(wait=False)
+        if prediction_cache is not None:
+            prediction_cache.clear()
     
-    return full_df_scaled
+    logger.info(f"Activated artifact set {artifacts.version} from {artifacts.source} "
+                f"(was {current.version if current else 'none'}, loaded in {artifacts.load_seconds:.2f}s)")
+    return {
+        "reloaded": True,
+        "previous_version": current.version if current else None,
+        **artifacts.info(),
+        "canary": canary,
+    }
+
+
+def artifact_stamp() -> Optional[tuple]:
+    """
+    Size and modification time of the file that changes when a new artifact set is published
+    (the active bundle's manifest, which build_bundle.py writes last, or the pickled model)
+    """
+    artifacts = model_artifacts
+    bundle_path = (artifacts.bundle_path if artifacts is not None and artifacts.bundle_path
+                   else os.getenv(BUNDLE_PATH_ENV_VAR, DEFAULT_BUNDLE_PATH))
+    path = os.path.join(bundle_path, MANIFEST_FILE) if bundle_exists(bundle_path) else MODEL_FILE
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+async def watch_model_artifacts(interval: float):
+    """
+    Poll the published artifacts and reload when they change
+    """
+    stamp = artifact_stamp()
+    logger.info(f"Watching {stamp[0] if stamp else 'model artifacts'} for changes every {interval:g}s")
+    while True:
+        await asyncio.sleep(interval)
+        current = artifact_stamp()
+        if current == stamp or current is None:
+            continue
+        stamp = current
+        try:
+            await reload_model_artifacts()
+        except Exception as e:
+            logger.error(f"Automatic model reload failed, keeping the active artifacts: {e}")
+
+
+# POST /admin/model/reload is disabled unless ADMIN_TOKEN is set, and only loads bundles inside ARTIFACT_DIR
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", ".")
+
+
+class ModelReloadRequest(BaseModel):
+    """
+    Optional body of POST /admin/model/reload
+    """
+    bundle: Optional[str] = Field(None, description="Name of a bundle directory inside ARTIFACT_DIR "
+                                                    "(default: reload the active bundle)")
+
+
+def require_admin(token: Optional[str]):
+    """
+    Reject admin calls without the ADMIN_TOKEN (404 while no token is configured)
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+
+
+def resolve_bundle_name(name: str) -> str:
+    """
+    Directory of a bundle named in a reload request
+    Raises ValueError for absolute paths, '..' components and names resolving outside ARTIFACT_DIR.
+    """
+    parts = name.replace('\\', '/').split('/')
+    if not name.strip() or os.path.isabs(name) or os.path.splitdrive(name)[0] or '..' in parts:
+        raise ValueError(f"Bundle must be a directory name inside ARTIFACT_DIR, got {name!r}")
+    root = os.path.realpath(ARTIFACT_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    # realpath follows symlinks, so a link pointing out of ARTIFACT_DIR is refused too
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Bundle {name!r} is outside ARTIFACT_DIR")
+    return path
 
 
 @app.get("/", tags=["Root"])
@@ -259,6 +909,8 @@ async def root():
             "health": "/health",
             "predict": "/predict",
             "predict_bulk": "/predict/bulk",
+            "predict_stream": "/predict/stream",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -270,12 +922,16 @@ async def health_check():
     Health check endpoint
     """
     return {
-        "status": "healthy" if model is not None else "unhealthy",
-        "model_loaded": model is not None
+        "status": "healthy" if model_artifacts is not None else "unhealthy",
+        "model_loaded": model_artifacts is not None,
+        "pid": os.getpid(),
+        "artifacts_mmap": model_artifacts is not None and model_artifacts.mmap,
+        **process_memory()
     }
 
 
 @app.post("/predict", response_model=PredictionResponse, tags=["Prediction"])
+@timed_handler
 async def predict_credit_risk(data: ApplicantData):
     """
     Predict credit risk for a single applicant
@@ -286,87 +942,108 @@ async def predict_credit_risk(data: ApplicantData):
     - risk_level: Low/Medium/High risk classification
     - message: Human-readable interpretation
     """
-    if model is None:
+    artifacts = model_artifacts
+    if artifacts is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    if prediction_cache is not None:
+        cache_key = prediction_cache_key(data, artifacts)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # A policy or model reload while this request is scoring makes its result stale
+        cache_generation = prediction_cache.generation
+    
     try:
-        # Preprocess input
-        processed_data = preprocess_input(data)
-        
-        # Make prediction
-        prediction = model.predict(processed_data)[0]
-        probability = model.predict_proba(processed_data)[0][1]  # Probability of class 1 (default)
-        
-        # Determine risk level
-        if probability < 0.3:
-            risk_level = "Low"
-            message = "Applicant shows low credit risk. Loan approval recommended."
-        elif probability < 0.6:
-            risk_level = "Medium"
-            message = "Applicant shows moderate credit risk. Additional verification recommended."
+        # Queue for a shared batch when coalescing is enabled
+        if prediction_coalescer is not None:
+            result = await prediction_coalescer.submit(data)
         else:
-            risk_level = "High"
-            message = "Applicant shows high credit risk. Loan approval not recommended."
-        
-        return {
-            "prediction": int(prediction),
-            "probability": float(probability),
-            "risk_level": risk_level,
-            "message": message
-        }
+            # Preprocess and predict in the executor (label and risk level come from one pass over the forest)
+            result = await run_scoring(score_applicant, 1, data, scoring_policy, artifacts=artifacts)
     
+    except ExecutorSaturated as e:
+        raise busy_response(e)
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+    
+    if prediction_cache is not None:
+        prediction_cache.put(cache_key, result, generation=cache_generation)
+    return result
 
 
 @app.post("/predict/bulk", tags=["Prediction"])
+@timed_handler
 async def predict_bulk(request: BulkPredictionRequest):
     """
     Predict credit risk for multiple applicants
     
     Returns a list of predictions for each applicant
     """
-    if model is None:
+    artifacts = model_artifacts
+    if artifacts is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     try:
         results = []
-        for applicant in request.applicants:
-            result = await predict_credit_risk(applicant)
-            results.append(result)
+        if request.applicants:
+            # Build one feature matrix and run the forest once for the whole batch
+            results = await run_scoring(score_applicants, len(request.applicants), request.applicants,
+                                        scoring_policy, artifacts=artifacts)
         
         return {
             "count": len(results),
             "predictions": results
         }
     
+    except ExecutorSaturated as e:
+        raise busy_response(e)
     except Exception as e:
         logger.error(f"Bulk prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Bulk prediction failed: {str(e)}")
 
 
+@app.post("/predict/stream", tags=["Prediction"])
+async def predict_stream(request: Request):
+    """
+    Predict credit risk for a streamed NDJSON or CSV body of applicants
+    
+    - Content-Type application/x-ndjson: one applicant JSON object per line
+    - Content-Type text/csv: header of applicant field names, one applicant per line
+    
+    Records are parsed and scored in fixed-size chunks while the body is still arriving,
+    so memory stays bounded regardless of input size. Results are streamed back as NDJSON,
+    one line per input record in input order: {"line": n, ...prediction} or {"line": n, "error": ...}
+    """
+    if model_artifacts is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        records = iter_ndjson_records(request.stream())
+    elif content_type in CSV_CONTENT_TYPES:
+        records = iter_csv_records(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or text/csv")
+    
+    return BodyStreamingResponse(stream_predictions(records), media_type="application/x-ndjson")
+
+
 @app.get("/model/info", tags=["Model"])
 async def model_info():
     """
     Get information about the loaded model
     """
-    if model is None:
+    artifacts = model_artifacts
+    if artifacts is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     try:
-        model_type = type(model).__name__
-        n_features = model.n_features_in_ if hasattr(model, 'n_features_in_') else "Unknown"
-        
-        info = {
-            "model_type": model_type,
-            "n_features": n_features,
-            "classes": model.classes_.tolist() if hasattr(model, 'classes_') else None
-        }
+        info = dict(artifacts.model_metadata)
+        info["inference_engine"] = artifacts.inference_engine.name
+        info.update(artifacts.info())
         
-        if hasattr(model, 'n_estimators'):
-            info["n_estimators"] = model.n_estimators
-            
         return info
     
     except Exception as e:
@@ -374,6 +1051,110 @@ async def model_info():
         raise HTTPException(status_code=500, detail=f"Failed to get model info: {str(e)}")
 
 
+@app.post("/admin/model/reload", tags=["Model"])
+async def reload_model(request: Optional[ModelReloadRequest] = None,
+                       x_admin_token: Optional[str] = Header(None)):
+    """
+    Load a new artifact set in the background, validate it on a canary batch and swap it in
+    
+    Requires the X-Admin-Token header to match ADMIN_TOKEN. Requests already being scored
+    finish on the previous version. With several uvicorn workers each worker holds its own
+    artifacts; use MODEL_WATCH_INTERVAL to reload them all.
+    """
+    require_admin(x_admin_token)
+    try:
+        bundle_path = resolve_bundle_name(request.bundle) if request and request.bundle else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await reload_model_artifacts(bundle_path)
+    except Exception as e:
+        logger.error(f"Model reload failed: {e}")
+        raise HTTPException(status_code=400, detail=f"Model reload failed: {str(e)}")
+
+
+@app.get("/metrics", tags=["Model"])
+async def prometheus_metrics():
+    """
+    All metrics in the Prometheus text format: request counts and latency per route, per-stage
+    timings (parse, preprocess, transform, inference, serialize), batch sizes and in-flight gauges
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/metrics/coalescer", tags=["Model"])
+async def coalescer_metrics():
+    """
+    Batch size and queueing delay achieved by the /predict coalescer
+    """
+    if prediction_coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_coalescer.stats()}
+
+
+@app.get("/metrics/cache", tags=["Model"])
+async def cache_metrics():
+    """
+    Hit rate and size of the /predict result cache
+    """
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+
+@app.get("/metrics/categories", tags=["Model"])
+async def category_metrics():
+    """
+    Categorical values the active model has no training column for, per field
+    Counted where encoding runs (this process, unless INFERENCE_EXECUTOR=process) since the model was loaded
+    """
+    artifacts = model_artifacts
+    if artifacts is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return {
+        "artifact_version": artifacts.version,
+        "fields": artifacts.feature_layout.unseen_stats(),
+    }
+
+
+@app.get("/metrics/executor", tags=["Model"])
+async def executor_metrics():
+    """
+    Load of the scoring executor (in-flight, completed, failed and rejected calls)
+    """
+    return inference_executor.stats()
+
+
+@app.get("/scoring/policy", response_model=ScoringPolicy, tags=["Model"])
+async def get_scoring_policy():
+    """
+    Get the active decision threshold and risk bands
+    """
+    return scoring_policy
+
+
+@app.post("/scoring/policy/reload", response_model=ScoringPolicy, tags=["Model"])
+async def reload_scoring_policy(x_admin_token: Optional[str] = Header(None)):
+    """
+    Reload the scoring policy file without restarting the server
+    The active policy is kept if the file is invalid. Requires the X-Admin-Token header to match ADMIN_TOKEN.
+    """
+    global scoring_policy
+    
+    require_admin(x_admin_token)
+    try:
+        scoring_policy = load_scoring_policy()
+    except Exception as e:
+        logger.error(f"Error reloading scoring policy: {e}")
+        raise HTTPException(status_code=400, detail=f"Invalid scoring policy: {str(e)}")
+    
+    # Cached results carry the old threshold and risk bands
+    if prediction_cache is not None:
+        prediction_cache.clear()
+    logger.info(f"Reloaded scoring policy: {scoring_policy.version}")
+    return scoring_policy
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
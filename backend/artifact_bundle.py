@@ -0,0 +1,169 @@
+"""
+Versioned artifact bundle for the credit risk API
+A directory holding everything app.py needs to score, so startup never touches the
+training CSV or unpickles sklearn objects:
+
+    manifest.json                      format version, artifact version, column layout, model metadata
+    imputer_statistics.npy             per-column fill values
+    scaler_scale.npy, scaler_min.npy   per-column affine transform
+    forest_<name>.npy                  CompiledForest node arrays
+
+Arrays are plain uncompressed .npy files, so they can be loaded with mmap_mode='r'.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from forest_engine import CompiledForest
+from fused_transform import FusedTransform
+
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Bundle directory read by app.py at startup
+BUNDLE_PATH_ENV_VAR = "ARTIFACT_BUNDLE"
+DEFAULT_BUNDLE_PATH = "artifacts"
+
+
+class ArtifactBundle:
+    """
+    A loaded bundle: column layout, fused preprocessing kernel and compiled forest
+    """
+
+    def __init__(self, path: str, manifest: dict, transform: FusedTransform, forest: CompiledForest):
+        self.path = path
+        self.manifest = manifest
+        self.transform = transform
+        self.forest = forest
+
+    @property
+    def version(self) -> str:
+        return self.manifest['version']
+
+    @property
+    def columns(self) -> List[str]:
+        return self.manifest['columns']
+
+    @property
+    def model_info(self) -> dict:
+        return self.manifest['model']
+
+
+def bundle_exists(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def _content_version(columns: List[str], arrays: dict) -> str:
+    """
+    Artifact version derived from the bundle contents (columns + every array)
+    """
+    digest = hashlib.sha256(json.dumps(columns).encode())
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(name.encode())
+        digest.update(str(array.dtype).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _write_atomically(path: str, write):
+    """
+    Write a file via a temporary name and rename it into place
+    Readers that memory-mapped the previous file keep the old contents instead of seeing a torn write.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def save_bundle(path: str, columns: List[str], transform: FusedTransform, forest: CompiledForest,
+                model_info: dict, source: str, extra: Optional[dict] = None) -> dict:
+    """
+    Write a bundle directory and return its manifest
+
+    model_info describes the original estimator (type, n_estimators, classes) for /model/info,
+    source records how the bundle was produced, extra is stored as-is in the manifest.
+    """
+    if len(columns) != transform.n_features or len(columns) != forest.n_features:
+        raise ValueError("Columns, preprocessing parameters and forest disagree on the number of features")
+
+    arrays = {
+        'imputer_statistics': transform.fill_values,
+        'scaler_scale': transform.scale,
+        'scaler_min': transform.offset,
+    }
+    for name, array in forest.to_arrays().items():
+        arrays[f'forest_{name}'] = array
+
+    os.makedirs(path, exist_ok=True)
+    array_files = {}
+    for name, array in arrays.items():
+        filename = f'{name}.npy'
+        _write_atomically(os.path.join(path, filename),
+                          lambda f: np.save(f, np.ascontiguousarray(array), allow_pickle=False))
+        array_files[name] = {'file': filename, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'version': _content_version(columns, arrays),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'source': source,
+        'n_features': len(columns),
+        'columns': list(columns),
+        'transform': {
+            'clip_range': list(transform.clip_range) if transform.clip_range is not None else None,
+        },
+        'forest': {
+            'max_depth': forest.max_depth,
+            'n_estimators': forest.n_estimators,
+            'n_nodes': int(len(forest.feature)),
+        },
+        'model': model_info,
+        'arrays': array_files,
+    }
+    if extra:
+        manifest.update(extra)
+
+    # Manifest last, so a half-written bundle is never picked up (and file watchers fire once it is complete)
+    _write_atomically(os.path.join(path, MANIFEST_FILE), lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+    return manifest
+
+
+def load_bundle(path: str, mmap_mode: Optional[str] = None) -> ArtifactBundle:
+    """
+    Load a bundle directory; with mmap_mode='r' arrays are mapped rather than read
+    """
+    with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format_version') != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format {manifest.get('format_version')} "
+                         f"(expected {BUNDLE_FORMAT_VERSION})")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        array = np.load(os.path.join(path, spec['file']), mmap_mode=mmap_mode, allow_pickle=False)
+        if list(array.shape) != spec['shape'] or str(array.dtype) != spec['dtype']:
+            raise ValueError(f"Bundle array {name} does not match the manifest")
+        arrays[name] = array
+
+    clip_range = manifest['transform']['clip_range']
+    transform = FusedTransform(
+        arrays['imputer_statistics'], arrays['scaler_scale'], arrays['scaler_min'],
+        tuple(clip_range) if clip_range is not None else None,
+    )
+    forest = CompiledForest.from_arrays(
+        {name[len('forest_'):]: array for name, array in arrays.items() if name.startswith('forest_')},
+        max_depth=manifest['forest']['max_depth'],
+        n_features=manifest['n_features'],
+    )
+    if transform.n_features != manifest['n_features'] or len(manifest['columns']) != manifest['n_features']:
+        raise ValueError("Bundle columns and preprocessing parameters disagree on the number of features")
+
+    return ArtifactBundle(path, manifest, transform, forest)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Offline batch scoring with the credit risk model
+
+Reads application files (CSV or Parquet, application_train.csv schema) in chunks, scores the
+chunks in a pool of worker processes that load the same artifacts as app.py, and writes one
+row per applicant (id, prediction, probability, risk_level) to a Parquet or CSV file:
+
+  python batch_score.py applications.parquet --output scores.parquet --workers 4
+
+Parquet input and output need pyarrow.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_layout import FrameEncoder
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_ID_COLUMN = 'SK_ID_CURR'
+
+# Per-worker encoder, built by init_worker once app.py has loaded the artifacts
+_encoder = None
+
+
+def init_worker():
+    """
+    Process pool initializer: import app.py (loading the model and preprocessing) once per worker
+    """
+    global _encoder
+    import app
+    if app.model_artifacts is None:
+        raise RuntimeError("Model artifacts could not be loaded")
+    _encoder = FrameEncoder(app.model_artifacts.feature_layout, app.model_artifacts.binary_encodings)
+
+
+def score_frame(frame: pd.DataFrame, id_column: str, policy) -> pd.DataFrame:
+    """
+    Encode, transform and score one chunk; runs in a pool worker
+    """
+    import app
+    artifacts = app.model_artifacts
+    matrix = _encoder.encode(frame)
+    probabilities = artifacts.inference_engine.predict_proba(app.transform_features(matrix, artifacts))[:, 1]
+    levels = np.array([band.level for band in policy.risk_bands], dtype=object)
+
+    result = {}
+    if id_column in frame.columns:
+        result[id_column] = frame[id_column].to_numpy()
+    result['prediction'] = policy.labels(probabilities).astype(np.int8)
+    result['probability'] = probabilities
+    result['risk_level'] = levels[policy.band_indices(probabilities)]
+    return pd.DataFrame(result)
+
+
+def is_parquet(path: str) -> bool:
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def iter_chunks(path: str, chunk_size: int, usecols):
+    """
+    Yield DataFrame chunks of an input file, reading only the columns `usecols` accepts
+    """
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(path)
+        columns = [name for name in parquet_file.schema_arrow.names if usecols(name)]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=usecols)
+
+
+class ScoreWriter:
+    """
+    Appends scored chunks to a Parquet file (one row group per chunk) or a CSV file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, scores: pd.DataFrame):
+        if is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(scores, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            scores.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(scores)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _worker_pid(_):
+    return os.getpid()
+
+
+def score_files(inputs, output, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, id_column=DEFAULT_ID_COLUMN) -> dict:
+    """
+    Score every input file into `output`, keeping at most two chunks per worker in flight
+    Returns row count and timings; `startup_seconds` is the time to bring the pool up.
+    """
+    import app
+    artifacts = app.model_artifacts
+    if artifacts is None:
+        raise RuntimeError("Model artifacts could not be loaded")
+
+    workers = workers or os.cpu_count() or 1
+    encoder = FrameEncoder(artifacts.feature_layout, artifacts.binary_encodings)
+    usecols = lambda column: column == id_column or encoder.wants(column)
+    policy = app.scoring_policy
+
+    start = time.perf_counter()
+    # spawn: workers start from a clean interpreter and load the artifacts in init_worker
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=init_worker)
+    writer = ScoreWriter(output)
+    try:
+        list(pool.map(_worker_pid, range(workers)))
+        startup = time.perf_counter() - start
+
+        pending = deque()
+        for path in inputs:
+            for frame in iter_chunks(path, chunk_size, usecols):
+                pending.append(pool.submit(score_frame, frame, id_column, policy))
+                if len(pending) >= 2 * workers:
+                    writer.write(pending.popleft().result())
+        while pending:
+            writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+        pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    scoring = elapsed - startup
+    return {
+        'rows': writer.rows,
+        'workers': workers,
+        'startup_seconds': round(startup, 3),
+        'scoring_seconds': round(scoring, 3),
+        'rows_per_sec': round(writer.rows / scoring, 1) if scoring > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score application files with the credit risk model")
+    parser.add_argument('inputs', nargs='+', help="CSV or Parquet files in the application_train.csv schema")
+    parser.add_argument('--output', required=True, help="Output file (.parquet or .csv)")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument('--id-column', default=DEFAULT_ID_COLUMN, help="Input column copied to the output")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = score_files(args.inputs, args.output, args.workers, args.chunk_size, args.id_column)
+    except (RuntimeError, ImportError, OSError) as e:
+        print(f"✗ Batch scoring failed: {e}")
+        return 1
+
+    print(f"✓ Scored {stats['rows']} rows into {args.output} with {stats['workers']} workers "
+          f"in {stats['scoring_seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec, "
+          f"pool startup {stats['startup_seconds']:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Throughput of batch_score.py at different worker counts
+
+Builds a synthetic artifact bundle (or uses --bundle) and a synthetic input file, then scores
+the file with 1, 2, 4 and 8 worker processes and reports rows/sec for each:
+
+  python benchmarks/bench_batch_score.py --rows 200000
+  python benchmarks/bench_batch_score.py --bundle artifacts --format csv --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import build_synthetic_bundle, synthetic_applications  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline batch scoring")
+    parser.add_argument('--rows', type=int, default=200000, help="Rows in the synthetic input file")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help="Worker counts to run")
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet', help="Input and output format")
+    parser.add_argument('--bundle', help="Existing artifact bundle (default: build a synthetic one)")
+    parser.add_argument('--n-estimators', type=int, default=100, help="Trees in the synthetic model")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = args.bundle
+        if bundle_path is None:
+            bundle_path = os.path.join(tmp, 'artifacts')
+            print("Building synthetic bundle...")
+            build_synthetic_bundle(bundle_path, n_estimators=args.n_estimators)
+        # Read by app.py in this process and inherited by the spawned workers
+        os.environ['ARTIFACT_BUNDLE'] = bundle_path
+        os.environ['ARTIFACT_MMAP'] = 'true'
+        import batch_score
+
+        input_path = os.path.join(tmp, f'applications.{args.format}')
+        frame = synthetic_applications(args.rows, seed=1).drop(columns=['TARGET'])
+        if args.format == 'parquet':
+            frame.to_parquet(input_path, index=False)
+        else:
+            frame.to_csv(input_path, index=False)
+        del frame
+
+        results = []
+        for workers in args.workers:
+            output_path = os.path.join(tmp, f'scores_{workers}.{args.format}')
+            stats = batch_score.score_files([input_path], output_path, workers=workers, chunk_size=args.chunk_size)
+            results.append(stats)
+            print(f"{workers:>3} workers: {stats['rows_per_sec']:>10.0f} rows/sec "
+                  f"({stats['scoring_seconds']:.2f}s scoring, {stats['startup_seconds']:.2f}s pool startup)")
+
+    baseline = results[0]['rows_per_sec']
+    for stats in results:
+        stats['speedup'] = round(stats['rows_per_sec'] / baseline, 2) if baseline else 0.0
+    print("Speedup vs first run: " + ", ".join(f"{s['workers']}w x{s['speedup']}" for s in results))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'rows': args.rows, 'format': args.format, 'cpu_count': os.cpu_count(), 'results': results},
+                      f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
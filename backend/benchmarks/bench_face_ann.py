@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Recall vs latency of the face index modes on synthetic encodings
+
+Builds an exact FaceIndex and IVF / IVF-PQ indexes over the same synthetic citizens, then
+for each mode and probe count measures per-query latency, recall against the exact top-k,
+and how often the citizen a query photo was taken from comes back first (the duplicate
+check at registration):
+
+  python benchmarks/bench_face_ann.py --citizens 1000000 --nprobe 1 4 8 16 32
+  python benchmarks/bench_face_ann.py --pq-m 16 32 --json ann.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+from face_ann import IVFFaceIndex  # noqa: E402
+from face_index import FaceIndex  # noqa: E402
+from synthetic import synthetic_face_encodings  # noqa: E402
+
+
+def percentiles(seconds: list) -> dict:
+    ordered = sorted(seconds)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'p50_ms': round(pick(0.50), 4),
+        'p99_ms': round(pick(0.99), 4),
+    }
+
+
+def index_memory_mb(index) -> float:
+    n = len(index)
+    total = index._vectors[:n].nbytes + index._norms[:n].nbytes
+    if isinstance(index, IVFFaceIndex) and index.trained:
+        total += index._assignments[:n].nbytes + index._codes[:n].nbytes + index.centroids.nbytes
+    return round(total / (1024 * 1024), 1)
+
+
+def evaluate(index, queries: np.ndarray, sources: np.ndarray, keys: list, truth: list, k: int) -> dict:
+    """
+    Latency of single-query searches, recall@1/@k against the exact results and source hit rate
+    """
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(index.search(query, k))
+        timings.append(time.perf_counter() - start)
+    found = [[key for key, _ in result] for result in results]
+    return {
+        **percentiles(timings),
+        'recall_at_1': round(float(np.mean([f[:1] == t[:1] for f, t in zip(found, truth)])), 4),
+        f'recall_at_{k}': round(float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])), 4),
+        'source_hit_rate': round(float(np.mean([f[:1] == [keys[s]] for f, s in zip(found, sources)])), 4),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall vs latency of the approximate face index")
+    parser.add_argument('--citizens', type=int, default=200_000, help="Encodings in the index")
+    parser.add_argument('--queries', type=int, default=500, help="Query photos (timed one at a time)")
+    parser.add_argument('--k', type=int, default=10, help="Neighbours per query for recall@k")
+    parser.add_argument('--nlist', type=int, default=0, help="Partitions (default: about sqrt(citizens))")
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--pq-m', type=int, nargs='*', default=[16], help="PQ subquantizers to try (none: IVF only)")
+    parser.add_argument('--rerank', type=int, default=64, help="IVF-PQ candidates re-scored exactly")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    print(f"Generating {args.citizens} citizens...")
+    encodings, queries, sources = synthetic_face_encodings(args.citizens, args.queries, seed=args.seed)
+    keys = [f"P{i:09d}" for i in range(args.citizens)]
+
+    exact = FaceIndex(capacity=args.citizens)
+    exact.add_many(keys, encodings)
+    truth = [[key for key, _ in result] for result in exact.search_batch(queries, args.k)]
+    results = {
+        'citizens': args.citizens,
+        'queries': args.queries,
+        'k': args.k,
+        'exact': {**evaluate(exact, queries, sources, keys, truth, args.k), 'memory_mb': index_memory_mb(exact)},
+        'approximate': [],
+    }
+
+    for pq_m in [0] + list(args.pq_m):
+        mode = f"ivfpq{pq_m}" if pq_m else "ivf"
+        index = IVFFaceIndex(capacity=args.citizens, nlist=args.nlist, pq_m=pq_m, rerank=args.rerank, seed=args.seed)
+        index.add_many(keys, encodings)
+        start = time.perf_counter()
+        index.train(force=True)
+        train_seconds = time.perf_counter() - start
+        print(f"{mode}: trained {len(index.centroids)} partitions in {train_seconds:.1f}s")
+        for nprobe in args.nprobe:
+            index.nprobe = nprobe
+            results['approximate'].append({
+                'mode': mode,
+                'nlist': len(index.centroids),
+                'nprobe': nprobe,
+                'train_seconds': round(train_seconds, 2),
+                'memory_mb': index_memory_mb(index),
+                **evaluate(index, queries, sources, keys, truth, args.k),
+            })
+
+    exact = results['exact']
+    print(f"\n{args.citizens} citizens, {args.queries} queries, k={args.k}")
+    print(f"{'mode':<10} {'nprobe':>6} {'p50 ms':>9} {'p99 ms':>9} {'speedup':>8} "
+          f"{'recall@1':>9} {f'recall@{args.k}':>10} {'source':>7} {'MB':>7}")
+    print(f"{'exact':<10} {'-':>6} {exact['p50_ms']:>9.3f} {exact['p99_ms']:>9.3f} {1:>7.1f}x "
+          f"{1:>9.3f} {1:>10.3f} {exact['source_hit_rate']:>7.3f} {exact['memory_mb']:>7.1f}")
+    for row in results['approximate']:
+        print(f"{row['mode']:<10} {row['nprobe']:>6} {row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f} "
+              f"{exact['p50_ms'] / row['p50_ms']:>7.1f}x {row['recall_at_1']:>9.3f} "
+              f"{row[f'recall_at_{args.k}']:>10.3f} {row['source_hit_rate']:>7.3f} {row['memory_mb']:>7.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+Stored size and read cost of face encodings as JSON text vs the binary face_codec format
+
+Decodes synthetic encodings both ways in-process, then (unless --no-db) loads them into two
+temporary tables, one per format, and measures the bytes per row and the latency of the
+verify path: fetch one citizen's encoding by PAN and turn it into an array:
+
+  python benchmarks/bench_face_codec.py --citizens 100000
+  python benchmarks/bench_face_codec.py --no-db --json codec.json
+
+Connects with DB_USER/DB_PASSWORD/DB_HOST like setup_db.py; the tables are temporary.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+import psycopg2  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from psycopg2.extras import execute_values  # noqa: E402
+
+from face_codec import encode_face, read_face  # noqa: E402
+from synthetic import synthetic_face_encodings  # noqa: E402
+
+# format -> (column definition, value for an encoding, decode of a fetched value)
+FORMATS = {
+    "json": ("face_encoding_json TEXT", lambda e: json.dumps(e.tolist()), lambda v: read_face(None, v)),
+    "binary": ("face_encoding BYTEA", encode_face, lambda v: read_face(v)),
+}
+
+
+def percentiles(seconds: list) -> dict:
+    ordered = sorted(seconds)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'p50_ms': round(pick(0.50), 4),
+        'p99_ms': round(pick(0.99), 4),
+    }
+
+
+def time_decode(values: list, decode, repeat: int) -> float:
+    """
+    Best of `repeat` passes, in microseconds per encoding
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            decode(value)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(values) * 1e6, 3)
+
+
+def bench_db(conn, encodings: np.ndarray, lookups: int, seed: int) -> dict:
+    """
+    Bytes per row (heap and TOAST) and fetch-and-decode latency by PAN for each format
+    """
+    rng = np.random.default_rng(seed)
+    pans = [f"P{i:09d}" for i in range(len(encodings))]
+    results = {}
+    with conn.cursor() as cursor:
+        for name, (column, encode, decode) in FORMATS.items():
+            table = f"bench_face_{name}"
+            cursor.execute(f"CREATE TEMP TABLE {table} (id SERIAL PRIMARY KEY, pan_number TEXT UNIQUE, {column})")
+            execute_values(cursor, f"INSERT INTO {table} (pan_number, {column.split()[0]}) VALUES %s",
+                           [(pan, encode(e)) for pan, e in zip(pans, encodings)], page_size=1000)
+            cursor.execute(f"ANALYZE {table}")
+            cursor.execute(f"SELECT pg_total_relation_size('{table}') - pg_indexes_size('{table}'), "
+                           f"avg(pg_column_size({column.split()[0]})) FROM {table}")
+            table_bytes, column_bytes = cursor.fetchone()
+
+            query = f"SELECT {column.split()[0]} FROM {table} WHERE pan_number = %s"
+            timings = []
+            for i in rng.integers(0, len(pans), lookups):
+                start = time.perf_counter()
+                cursor.execute(query, (pans[i],))
+                decode(cursor.fetchone()[0])
+                timings.append(time.perf_counter() - start)
+            results[name] = {
+                'bytes_per_row': round(table_bytes / len(pans), 1),
+                'column_bytes': round(float(column_bytes), 1),
+                **percentiles(timings),
+            }
+    conn.rollback()
+    return results
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Compare JSON and binary face encoding storage")
+    parser.add_argument('--citizens', type=int, default=50_000, help="Encodings stored")
+    parser.add_argument('--lookups', type=int, default=2000, help="Timed fetches by PAN per format")
+    parser.add_argument('--repeat', type=int, default=5, help="Passes of the in-process decode timing")
+    parser.add_argument('--database', default="postgres", help="Database for the temporary tables")
+    parser.add_argument('--no-db', action='store_true', help="Only time the in-process decoding")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    encodings, _, _ = synthetic_face_encodings(args.citizens, 0, seed=args.seed)
+    encodings = encodings.astype(np.float64)  # as face_recognition returns them
+    sample = encodings[:min(len(encodings), 10_000)]
+    results = {'citizens': args.citizens, 'decode_us': {}, 'stored_bytes': {}}
+    for name, (_, encode, decode) in FORMATS.items():
+        values = [encode(e) for e in sample]
+        results['stored_bytes'][name] = round(statistics.fmean(len(v) for v in values), 1)
+        results['decode_us'][name] = time_decode(values, decode, args.repeat)
+
+    print(f"{'format':<8} {'bytes':>7} {'decode us':>10}")
+    for name in FORMATS:
+        print(f"{name:<8} {results['stored_bytes'][name]:>7.0f} {results['decode_us'][name]:>10.2f}")
+
+    if not args.no_db:
+        print(f"\nLoading {args.citizens} citizens per format into {args.database}...")
+        conn = psycopg2.connect(
+            dbname=args.database,
+            user=os.getenv("DB_USER", "postgres"),
+            password=os.getenv("DB_PASSWORD", "postgres"),
+            host=os.getenv("DB_HOST", "localhost"),
+        )
+        try:
+            results['db'] = bench_db(conn, encodings, args.lookups, args.seed)
+        finally:
+            conn.close()
+        print(f"{'format':<8} {'row bytes':>10} {'column':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, row in results['db'].items():
+            print(f"{name:<8} {row['bytes_per_row']:>10.0f} {row['column_bytes']:>8.0f} "
+                  f"{row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+"""
+Query plans of the registry lookups before and after the schema migrations
+
+Creates two scratch databases with the original schema (migration 0001), fills them with
+synthetic citizens, verification logs and blocks, and runs each lookup under
+EXPLAIN (ANALYZE, BUFFERS). It then applies the remaining migrations and runs them again:
+
+  python benchmarks/bench_migrations.py --citizens 200000 --logs 1000000
+  python benchmarks/bench_migrations.py --json plans.json
+
+Connects with DB_USER/DB_PASSWORD/DB_HOST like setup_db.py. The scratch databases are
+dropped at the end unless --keep is given.
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import psycopg2  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+
+from migrate import MIGRATIONS_DIR, migrate  # noqa: E402
+
+SCRATCH_PREFIX = "bench_migrations_"
+
+# Synthetic rows, generated server side. Logs and blocks arrive in time order, as in production;
+# blocks use the pre-migration payload encoding (a JSON string holding the payload's JSON).
+SEED_SQL = {
+    "central_identity_db": [
+        """
+        INSERT INTO citizen_registry (full_name, pan_number, aadhaar_number_hash, dob, face_encoding_json)
+        SELECT 'Citizen ' || g, 'PAN' || lpad(g::text, 7, '0'), encode(sha256(g::text::bytea), 'hex'),
+               DATE '1960-01-01' + (g %% 15000), '[0.0]'
+        FROM generate_series(1, %(citizens)s) AS g
+        """,
+        """
+        INSERT INTO verification_logs (claimed_pan, name_match_score, biometric_status, final_status, created_at)
+        SELECT 'PAN' || lpad((1 + (g::bigint * 7919) %% %(citizens)s)::text, 7, '0'), 90, 'PASSED', 'VERIFIED',
+               TIMESTAMP '2024-01-01' + g * interval '10 seconds'
+        FROM generate_series(1, %(logs)s) AS g
+        """,
+    ],
+    "verify_db": [
+        """
+        INSERT INTO blockchain_blocks (block_index, previous_hash, data, timestamp, nonce, block_hash)
+        SELECT g, md5((g - 1)::text), to_json(json_build_object('pan', 'PAN' || g, 'full_name', 'Citizen ' || g)::text)::text,
+               (1704067200 + g * 60)::text || '.5', g, md5(g::text)
+        FROM generate_series(0, %(blocks)s - 1) AS g
+        """,
+    ],
+}
+
+# name -> (database, SQL before the migrations, SQL after if it changes)
+QUERIES = {
+    "verify_lookup": (
+        "central_identity_db",
+        "SELECT * FROM citizen_registry WHERE pan_number = %(pan)s AND aadhaar_number_hash = %(aadhaar)s",
+        None,
+    ),
+    "aadhaar_lookup": (
+        "central_identity_db",
+        "SELECT citizen_id, pan_number FROM citizen_registry WHERE aadhaar_number_hash = %(aadhaar)s",
+        None,
+    ),
+    "pan_history": (
+        "central_identity_db",
+        "SELECT * FROM verification_logs WHERE claimed_pan = %(pan)s ORDER BY created_at DESC LIMIT 20",
+        None,
+    ),
+    "logs_last_day": (
+        "central_identity_db",
+        "SELECT count(*) FROM verification_logs WHERE created_at >= %(log_since)s",
+        None,
+    ),
+    "blocks_last_day": (
+        "verify_db",
+        "SELECT count(*) FROM blockchain_blocks WHERE to_timestamp(timestamp::double precision) >= %(block_since)s",
+        "SELECT count(*) FROM blockchain_blocks WHERE mined_at >= %(block_since)s",
+    ),
+}
+
+
+def connect(dbname: str):
+    return psycopg2.connect(
+        dbname=dbname,
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD", "postgres"),
+        host=os.getenv("DB_HOST", "localhost"),
+    )
+
+
+def recreate_database(dbname: str):
+    conn = connect("postgres")
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {dbname}")
+        cursor.execute(f"CREATE DATABASE {dbname}")
+    conn.close()
+
+
+def drop_database(dbname: str):
+    conn = connect("postgres")
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {dbname}")
+    conn.close()
+
+
+def plan_nodes(plan: dict) -> list:
+    """
+    Node types of a JSON plan, depth first, with the index each scan used
+    """
+    node = plan["Node Type"]
+    if "Index Name" in plan:
+        node += f" using {plan['Index Name']}"
+    nodes = [node]
+    for child in plan.get("Plans", []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def explain(conn, sql: str, params: dict, repeat: int) -> dict:
+    """
+    Plan shape, buffers and median execution time of `repeat` EXPLAIN ANALYZE runs
+    """
+    timings = []
+    with conn.cursor() as cursor:
+        for _ in range(repeat):
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+            result = cursor.fetchone()[0][0]
+            timings.append(result["Execution Time"])
+    conn.rollback()
+    plan = result["Plan"]
+    return {
+        "plan": " -> ".join(plan_nodes(plan)),
+        "execution_ms": round(statistics.median(timings), 4),
+        "shared_buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+    }
+
+
+def run_queries(conns: dict, params: dict, phase: str, repeat: int) -> dict:
+    results = {}
+    for name, (dbname, before_sql, after_sql) in QUERIES.items():
+        sql = after_sql if phase == "after" and after_sql else before_sql
+        results[name] = explain(conns[dbname], sql, params, repeat)
+    return results
+
+
+def analyze(conn):
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Compare registry query plans before and after the migrations")
+    parser.add_argument("--citizens", type=int, default=100_000, help="Rows in citizen_registry")
+    parser.add_argument("--logs", type=int, default=500_000, help="Rows in verification_logs")
+    parser.add_argument("--blocks", type=int, default=50_000, help="Rows in blockchain_blocks")
+    parser.add_argument("--repeat", type=int, default=20, help="EXPLAIN ANALYZE runs per query")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch databases")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    sizes = {"citizens": args.citizens, "logs": args.logs, "blocks": args.blocks}
+    citizen = args.citizens // 2
+    params = {
+        "pan": f"PAN{citizen:07d}",
+        "aadhaar": hashlib.sha256(str(citizen).encode()).hexdigest(),
+    }
+
+    conns = {}
+    results = {"sizes": sizes, "migrations": {}}
+    try:
+        for dbname, statements in SEED_SQL.items():
+            scratch = SCRATCH_PREFIX + dbname
+            print(f"Creating {scratch}...")
+            recreate_database(scratch)
+            conn = conns[dbname] = connect(scratch)
+            migrate(conn, os.path.join(MIGRATIONS_DIR, dbname), target=1, log=lambda message: None)
+            start = time.perf_counter()
+            with conn.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement, sizes)
+            conn.commit()
+            print(f"  loaded in {time.perf_counter() - start:.1f}s")
+            analyze(conn)
+
+        # Time-range queries cover the last day of data
+        with conns["central_identity_db"].cursor() as cursor:
+            cursor.execute("SELECT max(created_at) - interval '1 day' FROM verification_logs")
+            params["log_since"] = cursor.fetchone()[0]
+        conns["central_identity_db"].rollback()
+        with conns["verify_db"].cursor() as cursor:
+            cursor.execute("SELECT max(to_timestamp(timestamp::double precision)) - interval '1 day' "
+                           "FROM blockchain_blocks")
+            params["block_since"] = cursor.fetchone()[0]
+        conns["verify_db"].rollback()
+
+        print("Before migrations...")
+        results["before"] = run_queries(conns, params, "before", args.repeat)
+
+        for dbname, conn in conns.items():
+            applied = migrate(conn, os.path.join(MIGRATIONS_DIR, dbname), log=print)
+            results["migrations"][dbname] = [str(migration) for migration in applied]
+            analyze(conn)
+
+        print("After migrations...")
+        results["after"] = run_queries(conns, params, "after", args.repeat)
+    finally:
+        for conn in conns.values():
+            conn.close()
+        if not args.keep:
+            for dbname in SEED_SQL:
+                drop_database(SCRATCH_PREFIX + dbname)
+
+    print(f"\n{sizes['citizens']} citizens, {sizes['logs']} logs, {sizes['blocks']} blocks")
+    for name in QUERIES:
+        before, after = results["before"][name], results["after"][name]
+        print(f"\n{name}: {before['execution_ms']:.3f} ms -> {after['execution_ms']:.3f} ms "
+              f"({before['shared_buffers']} -> {after['shared_buffers']} buffers)")
+        print(f"  before: {before['plan']}")
+        print(f"  after:  {after['plan']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""
+Benchmark suite for the credit risk scoring path
+
+Builds a synthetic artifact bundle (or uses --bundle) and measures, without a running server:
+
+- cold start: a fresh interpreter importing app.py (artifact load) and scoring its first applicant
+- functions: preprocess_input, preprocess_batch and score_applicant called directly
+- single: /predict latency through an in-process ASGI client (HTTP parsing and validation included)
+- bulk: /predict/bulk throughput at several batch sizes
+- peak memory of the benchmark process and of the cold-start interpreter
+
+Results are printed and, with --json, written for comparison across commits:
+
+  python benchmarks/bench_scoring.py --json before.json
+  python benchmarks/bench_scoring.py --json after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import build_synthetic_bundle  # noqa: E402
+
+# Runs in a fresh interpreter; prints one JSON line
+COLD_START_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {backend_dir!r})
+import app
+imported = time.perf_counter()
+app.score_applicant(app.canary_applicants(app.model_artifacts)[0])
+scored = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - start,
+    "artifact_load_seconds": app.model_artifacts.load_seconds,
+    "first_score_seconds": scored - imported,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident memory of this process (ru_maxrss is KB on Linux, bytes on macOS)
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def percentiles(seconds: list) -> dict:
+    """
+    Mean and p50/p90/p99 of a list of durations, in milliseconds
+    """
+    ordered = sorted(seconds)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        'n': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'p50_ms': round(pick(0.50), 4),
+        'p90_ms': round(pick(0.90), 4),
+        'p99_ms': round(pick(0.99), 4),
+    }
+
+
+def time_calls(fn, repeat: int, warmup: int) -> list:
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_cold_start(env: dict, runs: int, cwd: str) -> dict:
+    """
+    Median over `runs` fresh interpreters of the time to import app.py and score one applicant
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', COLD_START_SCRIPT.format(backend_dir=BACKEND_DIR)],
+                                env=env, cwd=cwd, capture_output=True, text=True, check=True).stdout
+        wall = time.perf_counter() - start
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['wall_seconds'] = wall
+        samples.append(sample)
+    return {key: round(statistics.median(s[key] for s in samples), 4) for key in samples[0]} | {'runs': runs}
+
+
+def bench_functions(app, applicants: list, repeat: int, warmup: int) -> dict:
+    """
+    Scoring functions called directly, without HTTP or the executor
+    """
+    artifacts = app.model_artifacts
+    rows = iter(range(10 ** 9))
+    pick = lambda: applicants[next(rows) % len(applicants)]
+    return {
+        'preprocess_input': percentiles(time_calls(lambda: app.preprocess_input(pick(), artifacts), repeat, warmup)),
+        'score_applicant': percentiles(time_calls(lambda: app.score_applicant(pick(), None, artifacts), repeat, warmup)),
+        'preprocess_batch_100': percentiles(
+            time_calls(lambda: app.preprocess_batch(applicants[:100], artifacts), max(repeat // 10, 10), warmup)
+        ),
+    }
+
+
+async def bench_http(app, payloads: list, repeat: int, warmup: int, batch_sizes: list, min_seconds: float) -> dict:
+    """
+    /predict latency and /predict/bulk throughput through an in-process ASGI client
+    """
+    import httpx
+
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def predict(i):
+            response = await client.post('/predict', json=payloads[i % len(payloads)])
+            response.raise_for_status()
+
+        for i in range(warmup):
+            await predict(i)
+        single = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            await predict(i)
+            single.append(time.perf_counter() - start)
+
+        bulk = []
+        for batch_size in batch_sizes:
+            body = {'applicants': [payloads[i % len(payloads)] for i in range(batch_size)]}
+            (await client.post('/predict/bulk', json=body)).raise_for_status()
+            timings = []
+            deadline = time.perf_counter() + min_seconds
+            while len(timings) < 5 or time.perf_counter() < deadline:
+                start = time.perf_counter()
+                (await client.post('/predict/bulk', json=body)).raise_for_status()
+                timings.append(time.perf_counter() - start)
+            bulk.append({
+                'batch_size': batch_size,
+                'rows_per_sec': round(batch_size * len(timings) / sum(timings), 1),
+                **percentiles(timings),
+            })
+    return {'single': percentiles(single), 'bulk': bulk}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def headline(results: dict) -> dict:
+    """
+    Metrics compared by --compare (lower is better except rows/sec)
+    """
+    metrics = {
+        'cold_start.wall_seconds': results['cold_start']['wall_seconds'],
+        'functions.preprocess_input.p50_ms': results['functions']['preprocess_input']['p50_ms'],
+        'functions.score_applicant.p50_ms': results['functions']['score_applicant']['p50_ms'],
+        'single.p50_ms': results['single']['p50_ms'],
+        'single.p99_ms': results['single']['p99_ms'],
+        'peak_rss_mb': results['peak_rss_mb'],
+    }
+    for bulk in results['bulk']:
+        metrics[f"bulk.{bulk['batch_size']}.rows_per_sec"] = bulk['rows_per_sec']
+    return metrics
+
+
+def print_comparison(current: dict, baseline: dict):
+    print(f"\nvs {baseline.get('commit', 'baseline')}:")
+    before = headline(baseline)
+    for name, value in headline(current).items():
+        if name not in before or not before[name]:
+            continue
+        change = (value - before[name]) / before[name] * 100
+        print(f"  {name:<40} {before[name]:>12.4g} -> {value:>12.4g}  ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the credit risk scoring path")
+    parser.add_argument('--bundle', help="Existing artifact bundle (default: build a synthetic one)")
+    parser.add_argument('--n-estimators', type=int, default=100, help="Trees in the synthetic model")
+    parser.add_argument('--executor', choices=['inline', 'thread', 'process'], default='thread',
+                        help="INFERENCE_EXECUTOR for the HTTP benchmarks")
+    parser.add_argument('--repeat', type=int, default=500, help="Timed calls per latency benchmark")
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="Minimum time per bulk batch size")
+    parser.add_argument('--cold-starts', type=int, default=3, help="Fresh interpreters for the cold-start median")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="Earlier --json output to compare against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = args.bundle
+        if bundle_path is None:
+            bundle_path = os.path.join(tmp, 'artifacts')
+            print("Building synthetic bundle...")
+            build_synthetic_bundle(bundle_path, n_estimators=args.n_estimators)
+        bundle_path = os.path.abspath(bundle_path)
+
+        # Every request is scored: the result cache and coalescing would hide the scoring path
+        os.environ.update({
+            'ARTIFACT_BUNDLE': bundle_path,
+            'INFERENCE_EXECUTOR': args.executor,
+            'PREDICTION_CACHE_SIZE': '0',
+            'PREDICT_COALESCE': 'false',
+            'MODEL_WATCH_INTERVAL': '0',
+        })
+
+        print("Cold start...")
+        cold_start = bench_cold_start(dict(os.environ), args.cold_starts, cwd=tmp)
+
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            import app
+        finally:
+            os.chdir(cwd)
+        applicants = app.canary_applicants(app.model_artifacts)
+        payloads = [applicant.model_dump() for applicant in applicants]
+
+        print("Scoring functions...")
+        functions = bench_functions(app, applicants, args.repeat, args.warmup)
+        print("HTTP endpoints...")
+        http = asyncio.run(bench_http(app, payloads, args.repeat, args.warmup, args.batch_sizes, args.min_seconds))
+        app.inference_executor.shutdown()
+
+        results = {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'executor': args.executor,
+            'model': app.model_artifacts.model_metadata,
+            'n_features': len(app.model_artifacts.train_columns),
+            'cold_start': cold_start,
+            'functions': functions,
+            **http,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+
+    print(f"\nCold start: {cold_start['wall_seconds']:.2f}s wall "
+          f"({cold_start['artifact_load_seconds'] * 1000:.1f} ms artifact load, "
+          f"{cold_start['peak_rss_mb']:.0f} MB peak)")
+    for name, stats in functions.items():
+        print(f"{name:<22} p50 {stats['p50_ms']:.3f} ms  p99 {stats['p99_ms']:.3f} ms")
+    print(f"{'POST /predict':<22} p50 {results['single']['p50_ms']:.3f} ms  p99 {results['single']['p99_ms']:.3f} ms")
+    for bulk in results['bulk']:
+        print(f"POST /predict/bulk x{bulk['batch_size']:<5} {bulk['rows_per_sec']:>10.0f} rows/sec  "
+              f"p50 {bulk['p50_ms']:.2f} ms")
+    print(f"Peak RSS: {results['peak_rss_mb']:.0f} MB")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            print_comparison(results, json.load(f))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+"""
+asyncio load generator for the FastAPI apps (app.py, central.py, verifier.py)
+
+Targets an app in-process (httpx ASGI transport, no server needed) or a running server with --url,
+sends a weighted mix of request kinds and reports throughput, latency percentiles and error rates:
+
+  # Closed loop: N clients each sending back-to-back, swept over concurrency levels
+  python benchmarks/loadgen.py app --concurrency 1 10 50 200 --duration 10
+
+  # Open loop: Poisson arrivals at a fixed rate, whether or not earlier requests have finished
+  python benchmarks/loadgen.py app --url http://localhost:8000 --rate 100 200 400 --mix predict=9,bulk=1
+
+  python benchmarks/loadgen.py central --url http://localhost:8001 --mix verify=9,register=1 --photo face.jpg
+
+Request kinds: app predict/bulk; central and verifier verify/register. verify requests use citizens
+registered during setup (--seed-citizens) or by earlier register requests. Without --photo the
+uploaded images are placeholders, which only pass with MOCK_BIOMETRICS=true.
+
+Open-loop latency is measured from each request's scheduled arrival time, so queueing delay in the
+client is counted instead of hidden; arrivals beyond --max-in-flight are dropped and reported.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+INCOME_TYPES = ['Working', 'Commercial associate', 'Pensioner', 'State servant']
+EDUCATION_TYPES = ['Secondary / secondary special', 'Higher education', 'Incomplete higher', 'Lower secondary']
+FAMILY_STATUSES = ['Married', 'Single / not married', 'Civil marriage', 'Separated', 'Widow']
+HOUSING_TYPES = ['House / apartment', 'With parents', 'Municipal apartment', 'Rented apartment']
+OCCUPATION_TYPES = [None, 'Laborers', 'Sales staff', 'Core staff', 'Managers', 'Drivers']
+ORGANIZATION_TYPES = [None, 'Business Entity Type 3', 'XNA', 'Self-employed', 'Other', 'Medicine']
+
+PLACEHOLDER_PHOTO = b"\xff\xd8\xff\xe0loadgen placeholder\xff\xd9"
+
+
+class LoadContext:
+    """
+    State shared by the request builders of one run: random source, uploads and known citizens
+    """
+
+    def __init__(self, seed: int, photo: bytes, bulk_size: int):
+        self.rng = random.Random(seed)
+        self.photo = photo
+        self.bulk_size = bulk_size
+        self.run_id = f"{int(time.time()) % 100000:05d}"
+        self.citizens: List[dict] = []
+        self._next_citizen = 0
+
+    def applicant(self) -> dict:
+        rng = self.rng
+        score = lambda: round(rng.random(), 4) if rng.random() < 0.8 else None
+        return {
+            "code_gender": rng.choice(['M', 'F']),
+            "flag_own_car": rng.choice(['Y', 'N']),
+            "flag_own_realty": rng.choice(['Y', 'N']),
+            "cnt_children": rng.randint(0, 3),
+            "amt_income_total": round(rng.uniform(3e4, 1e6), 2),
+            "amt_credit": round(rng.uniform(4e4, 2e6), 2),
+            "amt_annuity": round(rng.uniform(2e3, 1e5), 2),
+            "name_income_type": rng.choice(INCOME_TYPES),
+            "name_education_type": rng.choice(EDUCATION_TYPES),
+            "name_family_status": rng.choice(FAMILY_STATUSES),
+            "name_housing_type": rng.choice(HOUSING_TYPES),
+            "occupation_type": rng.choice(OCCUPATION_TYPES),
+            "organization_type": rng.choice(ORGANIZATION_TYPES),
+            "days_birth": -rng.randint(7000, 25000),
+            "days_employed": -rng.randint(0, 9000),
+            "ext_source_1": score(),
+            "ext_source_2": score(),
+            "ext_source_3": score(),
+        }
+
+    def new_citizen(self) -> dict:
+        """
+        Citizen with a PAN and Aadhaar number unique to this run
+        """
+        self._next_citizen += 1
+        n = self._next_citizen
+        return {
+            "full_name": f"Load Test {self.run_id} {n}",
+            "pan_number": f"LG{self.run_id}{n:07d}",
+            "aadhaar_number": f"{self.run_id}{n:07d}".rjust(12, '9'),
+        }
+
+    def known_citizen(self) -> Optional[dict]:
+        return self.rng.choice(self.citizens) if self.citizens else None
+
+
+# Request builders: (client, context) -> response. A builder returning None had nothing to send.
+
+async def app_predict(client, ctx: LoadContext):
+    return await client.post('/predict', json=ctx.applicant())
+
+
+async def app_bulk(client, ctx: LoadContext):
+    return await client.post('/predict/bulk', json={"applicants": [ctx.applicant() for _ in range(ctx.bulk_size)]})
+
+
+async def central_register(client, ctx: LoadContext):
+    citizen = ctx.new_citizen()
+    response = await client.post('/api/v1/register-citizen', data=citizen,
+                                 files={"id_photo": ("id_photo.jpg", ctx.photo, "image/jpeg")})
+    if response.status_code == 200:
+        ctx.citizens.append(citizen)
+    return response
+
+
+async def central_verify(client, ctx: LoadContext):
+    citizen = ctx.known_citizen()
+    if citizen is None:
+        return None
+    return await client.post('/api/v1/verify-citizen', data=citizen,
+                             files={"selfie": ("selfie.jpg", ctx.photo, "image/jpeg")})
+
+
+async def verifier_register(client, ctx: LoadContext):
+    citizen = ctx.new_citizen()
+    form = {
+        **citizen,
+        "dob": "1990-01-01",
+        "gender": ctx.rng.choice(['M', 'F']),
+        "phone_number": f"9{ctx.rng.randint(0, 999999999):09d}",
+        "aadhaar_card_path": f"docs/{citizen['pan_number']}_aadhaar.jpg",
+        "pan_card_path": f"docs/{citizen['pan_number']}_pan.jpg",
+    }
+    response = await client.post('/api/v1/register-citizen-on-chain', data=form,
+                                 files={"id_photo": ("id_photo.jpg", ctx.photo, "image/jpeg")})
+    if response.status_code == 200:
+        ctx.citizens.append(citizen)
+    return response
+
+
+async def verifier_verify(client, ctx: LoadContext):
+    citizen = ctx.known_citizen()
+    if citizen is None:
+        return None
+    return await client.post('/api/v1/verify-with-integrity-check', data={"pan_number": citizen['pan_number']},
+                             files={"live_selfie": ("selfie.jpg", ctx.photo, "image/jpeg")})
+
+
+class Target:
+    def __init__(self, module: str, kinds: Dict[str, Callable], default_mix: Dict[str, float],
+                 register: Optional[str] = None):
+        self.module = module
+        self.kinds = kinds
+        self.default_mix = default_mix
+        self.register = register  # kind used to seed citizens before the run
+
+
+TARGETS = {
+    'app': Target('app', {'predict': app_predict, 'bulk': app_bulk}, {'predict': 9, 'bulk': 1}),
+    'central': Target('central', {'verify': central_verify, 'register': central_register},
+                      {'verify': 9, 'register': 1}, register='register'),
+    'verifier': Target('verifier', {'verify': verifier_verify, 'register': verifier_register},
+                       {'verify': 9, 'register': 1}, register='register'),
+}
+
+
+def parse_mix(text: str, target: Target) -> Dict[str, float]:
+    """
+    'predict=9,bulk=1' -> {'predict': 9.0, 'bulk': 1.0}
+    """
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in target.kinds:
+            raise ValueError(f"Unknown request kind {kind!r} for {target.module}, expected one of {list(target.kinds)}")
+        mix[kind] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Request mix needs at least one positive weight")
+    return mix
+
+
+class Recorder:
+    """
+    Latency and outcome of every request in one load step
+    """
+
+    def __init__(self):
+        self.latencies = defaultdict(list)  # kind -> seconds, successful or not
+        self.statuses = defaultdict(Counter)  # kind -> status code (0: transport error, -1: dropped)
+        self.skipped = 0
+
+    def record(self, kind: str, status: int, latency: float):
+        self.latencies[kind].append(latency)
+        self.statuses[kind][status] += 1
+
+    def drop(self, kind: str):
+        self.statuses[kind][-1] += 1
+
+
+def latency_summary(seconds: List[float]) -> dict:
+    if not seconds:
+        return {}
+    ordered = sorted(seconds)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': pick(0.50),
+        'p90_ms': pick(0.90),
+        'p99_ms': pick(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    def outcome(statuses: Counter, latencies: List[float]) -> dict:
+        total = sum(statuses.values())
+        errors = sum(count for status, count in statuses.items() if not 200 <= status < 400)
+        return {
+            'requests': total,
+            'errors': errors,
+            'error_rate': round(errors / total, 4) if total else 0.0,
+            'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+            'latency': latency_summary(latencies),
+        }
+
+    all_statuses = sum(recorder.statuses.values(), Counter())
+    all_latencies = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    completed = sum(count for status, count in all_statuses.items() if status != -1)
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(completed / elapsed, 2) if elapsed else 0.0,
+        **outcome(all_statuses, all_latencies),
+        'skipped': recorder.skipped,
+        'by_kind': {kind: outcome(recorder.statuses[kind], recorder.latencies[kind]) for kind in recorder.statuses},
+    }
+
+
+def choose_kind(ctx: LoadContext, mix: Dict[str, float]) -> str:
+    return ctx.rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+async def send(client, target: Target, kind: str, ctx: LoadContext, recorder: Recorder, scheduled: float):
+    try:
+        response = await target.kinds[kind](client, ctx)
+    except Exception:
+        recorder.record(kind, 0, time.perf_counter() - scheduled)
+        return
+    if response is None:
+        recorder.skipped += 1
+        return
+    recorder.record(kind, response.status_code, time.perf_counter() - scheduled)
+
+
+async def run_closed_loop(client, target: Target, mix, ctx: LoadContext, concurrency: int, duration: float) -> dict:
+    """
+    `concurrency` clients, each sending its next request as soon as the previous one completes
+    """
+    recorder = Recorder()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            await send(client, target, choose_kind(ctx, mix), ctx, recorder, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {'mode': 'closed', 'concurrency': concurrency, **summarize(recorder, time.perf_counter() - start)}
+
+
+async def run_open_loop(client, target: Target, mix, ctx: LoadContext, rate: float, duration: float,
+                        max_in_flight: int) -> dict:
+    """
+    Poisson arrivals at `rate` requests/sec for `duration` seconds, independent of response times
+    """
+    recorder = Recorder()
+    tasks = set()
+    start = time.perf_counter()
+    scheduled = start
+    while True:
+        scheduled += ctx.rng.expovariate(rate)
+        if scheduled >= start + duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind = choose_kind(ctx, mix)
+        if len(tasks) >= max_in_flight:
+            recorder.drop(kind)
+            continue
+        task = asyncio.create_task(send(client, target, kind, ctx, recorder, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return {'mode': 'open', 'rate': rate, **summarize(recorder, time.perf_counter() - start)}
+
+
+async def seed_citizens(client, target: Target, ctx: LoadContext, count: int):
+    register = target.kinds[target.register]
+    for _ in range(count):
+        try:
+            response = await register(client, ctx)
+        except Exception as e:
+            raise RuntimeError(f"Seeding citizens failed: {e}") from e
+        if response.status_code != 200:
+            raise RuntimeError(f"Seeding citizens failed with {response.status_code}: {response.text[:200]}")
+
+
+def make_client(target: Target, url: Optional[str], timeout: float, max_connections: int):
+    import httpx
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits)
+    module = importlib.import_module(target.module)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=module.app), base_url="http://loadgen",
+                             timeout=timeout)
+
+
+def print_step(step: dict):
+    label = f"c={step['concurrency']}" if step['mode'] == 'closed' else f"rate={step['rate']:g}/s"
+    latency = step['latency']
+    print(f"{label:>12}  {step['throughput_rps']:>9.1f} req/s  "
+          f"p50 {latency.get('p50_ms', 0):>8.2f} ms  p90 {latency.get('p90_ms', 0):>8.2f} ms  "
+          f"p99 {latency.get('p99_ms', 0):>8.2f} ms  errors {step['error_rate'] * 100:5.1f}%  "
+          f"{step['status_codes']}")
+
+
+async def run(args) -> dict:
+    target = TARGETS[args.target]
+    mix = parse_mix(args.mix, target) if args.mix else target.default_mix
+    photo = PLACEHOLDER_PHOTO
+    if args.photo:
+        with open(args.photo, 'rb') as f:
+            photo = f.read()
+    elif target.register:
+        print("No --photo given: uploads are placeholders and only pass with MOCK_BIOMETRICS=true")
+    ctx = LoadContext(args.seed, photo, args.bulk_size)
+
+    max_connections = max((args.concurrency or []) + ([args.max_in_flight] if args.rate else []) + [1])
+    steps = []
+    async with make_client(target, args.url, args.timeout, max_connections) as client:
+        if target.register and args.seed_citizens:
+            await seed_citizens(client, target, ctx, args.seed_citizens)
+        if args.warmup > 0:
+            await run_closed_loop(client, target, mix, ctx, min(args.concurrency or [10]), args.warmup)
+
+        for concurrency in args.concurrency or []:
+            steps.append(await run_closed_loop(client, target, mix, ctx, concurrency, args.duration))
+            print_step(steps[-1])
+        for rate in args.rate or []:
+            steps.append(await run_open_loop(client, target, mix, ctx, rate, args.duration, args.max_in_flight))
+            print_step(steps[-1])
+
+    return {
+        'target': args.target,
+        'url': args.url or 'in-process',
+        'mix': mix,
+        'duration_seconds': args.duration,
+        'steps': steps,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for the FastAPI apps")
+    parser.add_argument('target', choices=sorted(TARGETS), help="App module to load")
+    parser.add_argument('--url', help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument('--mix', help="Weighted request kinds, e.g. predict=9,bulk=1")
+    parser.add_argument('--concurrency', type=int, nargs='+', help="Closed-loop client counts to sweep")
+    parser.add_argument('--rate', type=float, nargs='+', help="Open-loop arrival rates (requests/sec) to sweep")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per sweep step")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Seconds of unrecorded load before the sweep")
+    parser.add_argument('--max-in-flight', type=int, default=1000, help="Open-loop cap on outstanding requests")
+    parser.add_argument('--bulk-size', type=int, default=100, help="Applicants per bulk request")
+    parser.add_argument('--seed-citizens', type=int, default=20, help="Citizens registered before verify load")
+    parser.add_argument('--photo', help="Face image uploaded by register and verify requests")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for payloads and arrivals")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    args = parser.parse_args(argv)
+    if not args.concurrency and not args.rate:
+        args.concurrency = [1, 10, 50, 200]
+
+    try:
+        results = asyncio.run(run(args))
+    except (ValueError, RuntimeError) as e:
+        print(f"✗ {e}")
+        return 1
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Synthetic data and artifacts for the benchmarks
+Generates application_train.csv-style frames and a matching artifact bundle, so the
+benchmarks run without the real training data or model, and face encodings shaped like
+face_recognition's for the face index benchmarks.
+"""
+import os
+import sys
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_bundle import build_bundle, fused_from_fitted  # noqa: E402
+from utils import encode_training_data  # noqa: E402
+
+CATEGORIES = {
+    'NAME_CONTRACT_TYPE': ['Cash loans', 'Revolving loans'],
+    'CODE_GENDER': ['F', 'M', 'XNA'],
+    'FLAG_OWN_CAR': ['N', 'Y'],
+    'FLAG_OWN_REALTY': ['N', 'Y'],
+    'NAME_INCOME_TYPE': ['Working', 'Commercial associate', 'Pensioner', 'State servant', 'Unemployed',
+                         'Student', 'Businessman', 'Maternity leave'],
+    'NAME_EDUCATION_TYPE': ['Secondary / secondary special', 'Higher education', 'Incomplete higher',
+                            'Lower secondary', 'Academic degree'],
+    'NAME_FAMILY_STATUS': ['Married', 'Single / not married', 'Civil marriage', 'Separated', 'Widow', 'Unknown'],
+    'NAME_HOUSING_TYPE': ['House / apartment', 'With parents', 'Municipal apartment', 'Rented apartment',
+                          'Office apartment', 'Co-op apartment'],
+    'OCCUPATION_TYPE': ['Laborers', 'Sales staff', 'Core staff', 'Managers', 'Drivers', 'High skill tech staff',
+                        'Accountants', 'Medicine staff', 'Security staff', 'Cooking staff', None],
+    'ORGANIZATION_TYPE': ['Business Entity Type 3', 'XNA', 'Self-employed', 'Other', 'Medicine', 'Government',
+                          'School', 'Trade: type 7', 'Construction', 'Transport: type 4'],
+}
+
+
+def synthetic_applications(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Random applications in the application_train.csv schema (subset of columns), with TARGET
+    """
+    rng = np.random.default_rng(seed)
+    frame = {'SK_ID_CURR': np.arange(100000, 100000 + n_rows)}
+    for column, values in CATEGORIES.items():
+        frame[column] = rng.choice(np.array(values, dtype=object), n_rows)
+    frame.update({
+        'CNT_CHILDREN': rng.integers(0, 4, n_rows),
+        'AMT_INCOME_TOTAL': rng.uniform(3e4, 1e6, n_rows).round(1),
+        'AMT_CREDIT': rng.uniform(4e4, 2e6, n_rows).round(1),
+        'AMT_ANNUITY': rng.uniform(2e3, 9e4, n_rows).round(1),
+        'AMT_GOODS_PRICE': rng.uniform(4e4, 2e6, n_rows).round(1),
+        'REGION_POPULATION_RELATIVE': rng.uniform(0.0, 0.07, n_rows).round(6),
+        'DAYS_BIRTH': -rng.integers(7000, 25000, n_rows),
+        'DAYS_EMPLOYED': -rng.integers(0, 9000, n_rows),
+        'FLAG_MOBIL': np.ones(n_rows, dtype=int),
+        'FLAG_WORK_PHONE': rng.integers(0, 2, n_rows),
+        'FLAG_PHONE': rng.integers(0, 2, n_rows),
+        'FLAG_EMAIL': rng.integers(0, 2, n_rows),
+        'EXT_SOURCE_1': np.where(rng.random(n_rows) < 0.5, np.nan, rng.random(n_rows)),
+        'EXT_SOURCE_2': rng.random(n_rows),
+        'EXT_SOURCE_3': np.where(rng.random(n_rows) < 0.2, np.nan, rng.random(n_rows)),
+    })
+    frame = pd.DataFrame(frame)
+    risk = 2.0 - 3.0 * frame['EXT_SOURCE_2'] - 2.0 * frame['EXT_SOURCE_3'].fillna(0.5)
+    frame.insert(1, 'TARGET', (rng.random(n_rows) < 1.0 / (1.0 + np.exp(-risk))).astype(int))
+    return frame
+
+
+def build_synthetic_bundle(path: str, n_rows: int = 5000, n_estimators: int = 100, seed: int = 0) -> dict:
+    """
+    Fit preprocessing and a RandomForest on synthetic applications and write an artifact bundle
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import MinMaxScaler
+
+    train = synthetic_applications(n_rows, seed)
+    target = train['TARGET'].to_numpy()
+    X, binary_encodings = encode_training_data(train)
+    columns = X.columns.tolist()
+    imputer = SimpleImputer(strategy='median')
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    X_scaled = scaler.fit_transform(imputer.fit_transform(X.to_numpy(dtype=float)))
+
+    model = RandomForestClassifier(n_estimators=n_estimators, min_samples_leaf=5, n_jobs=-1, random_state=seed)
+    model.fit(X_scaled, target)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, 'model.pkl')
+        joblib.dump(model, model_path)
+        return build_bundle(path, model_path, columns, fused_from_fitted(columns, imputer, scaler), f"synthetic:{n_rows}",
+                            {'binary_encodings': binary_encodings})
+
+
+def synthetic_face_encodings(n_citizens: int, n_queries: int, dim: int = 128, n_groups: int = 64,
+                             seed: int = 0) -> tuple:
+    """
+    (encodings, queries, source rows) at face_recognition's scale
+    Citizens are spread around `n_groups` centres (faces are not uniformly distributed), about
+    0.9 apart from each other; each query is a new photo of a random citizen, about 0.35 from
+    the stored encoding (face_recognition treats < 0.6 as the same person).
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(0, 0.6 / np.sqrt(2 * dim), size=(n_groups, dim))
+    encodings = centres[rng.integers(0, n_groups, n_citizens)]
+    encodings += rng.normal(0, 0.65 / np.sqrt(2 * dim), size=(n_citizens, dim))
+    sources = rng.integers(0, n_citizens, n_queries)
+    queries = encodings[sources] + rng.normal(0, 0.35 / np.sqrt(dim), size=(n_queries, dim))
+    return encodings.astype(np.float32), queries.astype(np.float32), sources
@@ -0,0 +1,219 @@
+"""
+Face encoding off the event loop for central.py and verifier.py
+Decoding an upload, detecting the face (HOG or CNN) and computing its 128-d embedding takes
+hundreds of milliseconds of CPU. BiometricPool runs that in worker processes that load the
+dlib models once at startup, so a large upload no longer stalls every other request:
+
+  biometric_pool = biometric_pool_from_env(MOCK_BIOMETRICS)
+  encodings = await biometric_pool.encode(image_bytes)   # [array(128), ...], one per face
+
+- backends: "face_recognition" (dlib) or "mock" (MOCK_BIOMETRICS: one all-zero encoding per
+  image, the image is not read)
+- admission is bounded by InferenceExecutor: beyond `max_pending` calls running or queued,
+  callers get ExecutorSaturated immediately
+- a call that has not finished within `timeout` seconds raises BiometricTimeout; the work still
+  completes in its worker and keeps counting against `max_pending` until it does
+- queue wait and the decode / detect / embed stages are timed in the worker and aggregated in
+  stats()
+"""
+
+import asyncio
+import functools
+import io
+import logging
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from face_codec import FACE_ENCODING_DIM
+from inference_executor import InferenceExecutor
+from metrics import collect_stages, record_stage
+
+logger = logging.getLogger(__name__)
+
+BIOMETRIC_BACKENDS = ("face_recognition", "mock")
+DETECTION_MODELS = ("hog", "cnn")
+STAGES = ("queue", "decode", "detect", "embed")
+
+MOCK_ENCODING = np.zeros(FACE_ENCODING_DIM)
+
+
+class BiometricTimeout(Exception):
+    pass
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+# --- Worker side (module level so process pool workers can import it) ---
+def load_backend(backend: str):
+    """
+    Pool initializer: import face_recognition, which loads the dlib models, and run one detection
+    so the first request does not pay for it
+    """
+    if backend == "mock":
+        return
+    import face_recognition
+    face_recognition.face_locations(np.zeros((64, 64, 3), dtype=np.uint8))
+    logger.info(f"Biometric worker {os.getpid()} loaded the face_recognition models")
+
+
+def encode_image(image_bytes: bytes, backend: str, detection_model: str = "hog",
+                 num_jitters: int = 1) -> List[np.ndarray]:
+    """
+    128-d encodings of the faces in an image (JPEG/PNG bytes); empty if no face was found
+    Raises InvalidImage if the bytes are not a readable image.
+    """
+    if backend == "mock":
+        return [MOCK_ENCODING.copy()]
+
+    import face_recognition
+    start = time.perf_counter()
+    try:
+        image = face_recognition.load_image_file(io.BytesIO(image_bytes))
+    except (OSError, ValueError) as e:
+        raise InvalidImage(f"Could not read the image: {e}")
+    start = record_stage("decode", start)
+    locations = face_recognition.face_locations(image, model=detection_model)
+    start = record_stage("detect", start)
+    encodings = face_recognition.face_encodings(image, known_face_locations=locations, num_jitters=num_jitters)
+    record_stage("embed", start)
+    return encodings
+
+
+def encode_in_worker(submitted_at: float, *args):
+    """
+    (encode_image(*args), stage timings), with the time the call waited for a worker as "queue"
+    """
+    queued = max(0.0, time.time() - submitted_at)
+    encodings, stages = collect_stages(encode_image, *args)
+    return encodings, [("queue", queued)] + stages
+
+
+# --- Caller side ---
+class BiometricPool:
+    """
+    Bounded, timed dispatcher of face encoding work
+
+    `mode` is an InferenceExecutor mode: "process" for production (dlib holds the GIL), "thread"
+    or "inline" for the mock backend and tests.
+    """
+
+    def __init__(self, backend: str = "face_recognition", mode: str = "process", max_workers: Optional[int] = None,
+                 max_pending: int = 32, timeout: float = 10.0, detection_model: str = "hog", num_jitters: int = 1):
+        if backend not in BIOMETRIC_BACKENDS:
+            raise ValueError(f"Unknown biometric backend {backend!r}, expected one of {BIOMETRIC_BACKENDS}")
+        if detection_model not in DETECTION_MODELS:
+            raise ValueError(f"Unknown face detection model {detection_model!r}, expected one of {DETECTION_MODELS}")
+        if timeout <= 0:
+            raise ValueError("timeout must be positive")
+        self.backend = backend
+        self.timeout = timeout
+        self.detection_model = detection_model
+        self.num_jitters = num_jitters
+        self.executor = InferenceExecutor(mode=mode, max_workers=max_workers, max_pending=max_pending,
+                                          initializer=functools.partial(load_backend, backend))
+
+        # Metrics
+        self.timeouts = 0
+        self.invalid_images = 0
+        self._abandoned = set()  # timed-out calls still running in a worker
+        self._stage_counts = dict.fromkeys(STAGES, 0)
+        self._stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self._stage_max = dict.fromkeys(STAGES, 0.0)
+
+    def start(self):
+        """
+        Start the workers and load the models before the first request (blocking; run in a thread)
+        """
+        if self.executor.mode == "inline":
+            load_backend(self.backend)
+            return
+        pool = self.executor._get_pool()
+        # One call per worker: submitted together, each starts its own worker process
+        for future in [pool.submit(os.getpid) for _ in range(self.executor.max_workers)]:
+            future.result()
+        logger.info(f"Biometric pool ready: {self.executor.max_workers} {self.executor.mode} workers, "
+                    f"{self.backend} backend")
+
+    async def encode(self, image_bytes: bytes) -> List[np.ndarray]:
+        """
+        Encodings of the faces in an image, computed by a worker
+        Raises ExecutorSaturated when the pool is full, BiometricTimeout after `timeout` seconds
+        and InvalidImage for unreadable bytes.
+        """
+        call = asyncio.ensure_future(self.executor.run(encode_in_worker, time.time(), image_bytes, self.backend,
+                                                       self.detection_model, self.num_jitters))
+        try:
+            # Shielded: giving up on the call must not cancel executor.run, which would release the
+            # admission slot while the worker is still busy
+            encodings, stages = await asyncio.wait_for(asyncio.shield(call), self.timeout)
+        except asyncio.CancelledError:
+            self._abandon(call)
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._abandon(call)
+            raise BiometricTimeout(f"Face encoding did not finish within {self.timeout:g}s")
+        except InvalidImage:
+            self.invalid_images += 1
+            raise
+        for stage, seconds in stages:
+            self._stage_counts[stage] += 1
+            self._stage_seconds[stage] += seconds
+            self._stage_max[stage] = max(self._stage_max[stage], seconds)
+        return encodings
+
+    def _abandon(self, call: asyncio.Future):
+        """
+        Keep a call nobody waits for any more referenced until its worker is done with it
+        """
+        self._abandoned.add(call)
+        call.add_done_callback(self._abandoned_done)
+
+    def _abandoned_done(self, call: asyncio.Future):
+        self._abandoned.discard(call)
+        if not call.cancelled():
+            call.exception()  # retrieved, so a late failure is not reported as never retrieved
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "detection_model": self.detection_model,
+            **self.executor.stats(),
+            "timeout_seconds": self.timeout,
+            "timeouts": self.timeouts,
+            "timed_out_running": len(self._abandoned),
+            "invalid_images": self.invalid_images,
+            "stages": {
+                stage: {
+                    "count": self._stage_counts[stage],
+                    "avg_ms": round(self._stage_seconds[stage] / self._stage_counts[stage] * 1000, 3)
+                    if self._stage_counts[stage] else 0.0,
+                    "max_ms": round(self._stage_max[stage] * 1000, 3),
+                }
+                for stage in STAGES
+            },
+        }
+
+
+def biometric_pool_from_env(mock: bool = False) -> BiometricPool:
+    """
+    Pool configured by BIOMETRIC_EXECUTOR/WORKERS/MAX_PENDING/TIMEOUT and FACE_DETECTION_MODEL
+    The mock backend (MOCK_BIOMETRICS) runs inline unless BIOMETRIC_EXECUTOR says otherwise.
+    """
+    return BiometricPool(
+        backend="mock" if mock else "face_recognition",
+        mode=os.getenv("BIOMETRIC_EXECUTOR", "inline" if mock else "process").lower(),
+        max_workers=int(os.getenv("BIOMETRIC_WORKERS", "0")) or None,
+        max_pending=int(os.getenv("BIOMETRIC_MAX_PENDING", "32")),
+        timeout=float(os.getenv("BIOMETRIC_TIMEOUT", "10")),
+        detection_model=os.getenv("FACE_DETECTION_MODEL", "hog").lower(),
+        num_jitters=int(os.getenv("FACE_ENCODING_JITTERS", "1")),
+    )
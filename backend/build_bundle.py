@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Build the artifact bundle loaded by app.py at startup.
+
+From the objects dumped by save_preprocessing.py:
+  python build_bundle.py --model random_forest_model.pkl \
+      --feature-info feature_info.json --imputer fitted_imputer.pkl --scaler fitted_scaler.pkl
+
+From the training CSV (median imputer and MinMax scaler statistics, streamed in chunks by
+reference_stats.py so the file never has to fit in memory):
+  python build_bundle.py --model random_forest_model.pkl --from-csv credit_risk_data/application_train.csv
+"""
+import argparse
+import json
+import sys
+import time
+
+import joblib
+
+from artifact_bundle import DEFAULT_BUNDLE_PATH, load_bundle, save_bundle
+from forest_engine import CompiledForest, synthetic_holdout
+from fused_transform import FusedTransform
+from reference_stats import DEFAULT_CHUNK_SIZE, build_reference_stats
+
+
+def fused_from_fitted(columns, imputer, scaler):
+    """Fused transform from a fitted imputer and scaler, checked against sklearn."""
+    # Feature names are not kept: the bundle's column list fixes the order
+    for estimator in (imputer, scaler):
+        if hasattr(estimator, 'feature_names_in_'):
+            if list(estimator.feature_names_in_) != list(columns):
+                raise ValueError(f"{type(estimator).__name__} was fitted on different columns")
+            del estimator.feature_names_in_
+
+    transform = FusedTransform.from_fitted(imputer, scaler)
+    transform_diff = transform.validate(imputer, scaler)
+    print(f"✓ Transform matches sklearn (max deviation {transform_diff:.1e})")
+    return transform
+
+
+def preprocessing_from_artifacts(feature_info_path, imputer_path, scaler_path):
+    """Columns and transform from save_preprocessing.py output."""
+    with open(feature_info_path, 'r') as f:
+        columns = json.load(f)['feature_columns']
+    imputer = joblib.load(imputer_path)
+    scaler = joblib.load(scaler_path)
+    return columns, fused_from_fitted(columns, imputer, scaler), {}
+
+
+def preprocessing_from_csv(csv_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Columns and transform from reference statistics streamed out of the training CSV."""
+    stats = build_reference_stats(csv_path, chunk_size)
+    summary = stats.summary()
+    print(f"✓ Reference statistics over {summary['rows']} rows, {summary['columns']} columns "
+          f"({summary['exact_medians']} exact medians)")
+    extra = {'binary_encodings': stats.binary_encodings, 'reference_stats': summary}
+    return stats.columns, stats.to_transform(), extra
+
+
+def model_metadata(model):
+    """What /model/info reports about the original estimator."""
+    info = {
+        'model_type': type(model).__name__,
+        'n_features': int(model.n_features_in_),
+        'classes': model.classes_.tolist(),
+    }
+    if hasattr(model, 'n_estimators'):
+        info['n_estimators'] = model.n_estimators
+    return info
+
+
+def build_bundle(output, model_path, columns, transform, source, extra):
+    model = joblib.load(model_path)
+    if model.n_features_in_ != len(columns):
+        raise ValueError(f"Model expects {model.n_features_in_} features, preprocessing has {len(columns)}")
+
+    forest = CompiledForest.from_sklearn(model)
+    forest_diff = forest.check_exactness(model, synthetic_holdout(forest))
+
+    manifest = save_bundle(output, columns, transform, forest, model_metadata(model), source, extra)
+    print(f"✓ Forest matches sklearn (max deviation {forest_diff:.1e})")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the credit risk artifact bundle")
+    parser.add_argument('--output', default=DEFAULT_BUNDLE_PATH, help="Bundle directory to write")
+    parser.add_argument('--model', default='random_forest_model.pkl', help="Fitted RandomForest pickle")
+    parser.add_argument('--from-csv', metavar='CSV', help="Fit preprocessing on application_train.csv")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk with --from-csv")
+    parser.add_argument('--feature-info', default='feature_info.json')
+    parser.add_argument('--imputer', default='fitted_imputer.pkl')
+    parser.add_argument('--scaler', default='fitted_scaler.pkl')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.from_csv:
+            print(f"Computing reference statistics from {args.from_csv}...")
+            columns, transform, extra = preprocessing_from_csv(args.from_csv, args.chunk_size)
+            source = f"csv:{args.from_csv}"
+        else:
+            columns, transform, extra = preprocessing_from_artifacts(args.feature_info, args.imputer, args.scaler)
+            source = f"artifacts:{args.feature_info}"
+        manifest = build_bundle(args.output, args.model, columns, transform, source, extra)
+    except ValueError as e:
+        print(f"✗ Could not build bundle: {e}")
+        return 1
+
+    start = time.perf_counter()
+    load_bundle(args.output, mmap_mode='r')
+    print(f"✓ Wrote bundle {manifest['version']} to {args.output}/ "
+          f"({manifest['n_features']} features, {manifest['forest']['n_nodes']} nodes, "
+          f"loads in {(time.perf_counter() - start) * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
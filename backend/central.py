@@ -1,11 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
 from pydantic import BaseModel
-import psycopg2
 from psycopg2.extras import RealDictCursor
+import asyncio
+import functools
 import json
 import hashlib
+import logging
 import os
+import time
 from dotenv import load_dotenv
+from biometric_pool import BiometricTimeout, InvalidImage, biometric_pool_from_env
+from db_pool import PoolTimeout, pool_from_env
+from face_ann import create_face_index
+from face_codec import FaceCodecError, encode_face, read_face
+from face_index import SYNC_OVERLAP_ROWS, sync_from_db
+from inference_executor import ExecutorSaturated
+from ttl_cache import TTLCache
 from verifier import BiometricEngine
 
 # Load environment variables from .env file
@@ -14,22 +25,218 @@ load_dotenv()
 # Load environment for mock biometrics (set MOCK_BIOMETRICS=true to skip face_recognition)
 MOCK_BIOMETRICS = os.getenv("MOCK_BIOMETRICS", "false").lower() == "true"
 
-if not MOCK_BIOMETRICS:
-    import face_recognition
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# --- Database Connection Pool ---
+# Connections are reused across requests; queries run on the pool's threads, off the event loop
+db_pool = pool_from_env("central_identity_db")
+
+# --- Biometric Worker Pool ---
+# Photos are decoded and encoded by worker processes with the dlib models preloaded (mock backend
+# with MOCK_BIOMETRICS), so face_recognition never blocks the event loop
+biometric_pool = biometric_pool_from_env(MOCK_BIOMETRICS)
+
+# --- Face Index (1:N duplicate identity check at registration) ---
+FACE_INDEX_PATH = os.getenv("FACE_INDEX_PATH")  # Snapshot directory for fast restarts (unset: rebuilt from the DB)
+FACE_DEDUP_DISTANCE = float(os.getenv("FACE_DEDUP_DISTANCE", "0.5"))
+# Mock encodings are all identical, so every registration would look like a duplicate
+FACE_DEDUP = os.getenv("FACE_DEDUP", "true").lower() == "true" and not MOCK_BIOMETRICS
+# Registrations made by other workers and replicas are read from the database before a duplicate
+# check once the last read is this many seconds old (0: before every check)
+FACE_INDEX_SYNC_INTERVAL = float(os.getenv("FACE_INDEX_SYNC_INTERVAL", "0"))
+# Catch-up syncs re-check the last SYNC_OVERLAP_ROWS ids for rows that committed late; every this many
+# seconds (and at startup) a sync checks every id instead
+FACE_INDEX_FULL_SYNC_INTERVAL = float(os.getenv("FACE_INDEX_FULL_SYNC_INTERVAL", "3600"))
+
+# Encodings are stored in the binary face_encoding column. Keep also writing the legacy JSON column
+# while instances that only read JSON are still running.
+FACE_ENCODING_WRITE_JSON = os.getenv("FACE_ENCODING_WRITE_JSON", "false").lower() == "true"
+
+face_index = create_face_index()  # FACE_INDEX_MODE picks exact or approximate search
+face_index_synced = False
+face_index_synced_at = 0.0  # time.monotonic() at the start of the last sync
+face_index_full_synced_at = None  # same, for the last sync that checked every id
+face_index_lock = asyncio.Lock()
+face_index_training = None  # background face_index.train() task
+duplicates_rejected = 0
+
+# --- Citizen Cache (repeat verifications from KYC retry flows) ---
+# Registry rows with their decoded face encoding, keyed by (PAN, Aadhaar hash). Entries expire after
+# CITIZEN_CACHE_TTL seconds, which bounds how stale a row changed outside this instance can be;
+# 0 entries disables the cache.
+CITIZEN_CACHE_SIZE = int(os.getenv("CITIZEN_CACHE_SIZE", "10000"))
+citizen_cache = (
+    TTLCache(maxsize=CITIZEN_CACHE_SIZE, ttl=float(os.getenv("CITIZEN_CACHE_TTL", "300")))
+    if CITIZEN_CACHE_SIZE > 0 else None
+)
+
+async def sync_face_index(max_age: float = 0.0):
+    """
+    Add the citizens registered since the last sync, by any instance, to the face index
+    The first sync reads everything after the snapshot (the whole registry without one), later
+    ones the rows above the index watermark and any late commits below it (see sync_from_db).
+    Skipped when a sync started within the last max_age seconds, or while the caller waited for
+    the lock.
+    """
+    global face_index_synced, face_index_synced_at, face_index_full_synced_at
+    requested = time.monotonic()
+    async with face_index_lock:
+        if face_index_synced and face_index_synced_at >= requested - max_age:
+            return
+        started = time.monotonic()
+        full = face_index_full_synced_at is None or started - face_index_full_synced_at >= FACE_INDEX_FULL_SYNC_INTERVAL
+        sync = functools.partial(sync_from_db, overlap=None if full else SYNC_OVERLAP_ROWS)
+        added = await db_pool.run(sync, face_index, "citizen_registry", "citizen_id")
+        face_index_synced_at = started
+        if full:
+            face_index_full_synced_at = started
+        if not face_index_synced:
+            face_index_synced = True
+            logger.info(f"Face index loaded {added} encodings from the database ({len(face_index)} total)")
+    schedule_face_index_training()
+
+def schedule_face_index_training():
+    """
+    Start training the approximate index in the background once it has enough encodings, and
+    again each time it has doubled since; searches use the previous partitions meanwhile
+    """
+    global face_index_training
+    if face_index.needs_training() and (face_index_training is None or face_index_training.done()):
+        face_index_training = asyncio.create_task(train_face_index(face_index))
+
+async def train_face_index(index):
+    try:
+        await asyncio.to_thread(index.train)
+    except Exception as e:
+        logger.error(f"Face index training failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global face_index
+    try:
+        await asyncio.to_thread(db_pool.open)
+    except Exception as e:
+        # Connections are opened on demand once the database is reachable
+        logger.warning(f"Could not pre-open database connections: {e}")
+    await asyncio.to_thread(biometric_pool.start)
+    if FACE_INDEX_PATH:
+        face_index = await asyncio.to_thread(create_face_index, FACE_INDEX_PATH)
+    try:
+        await sync_face_index()
+    except Exception as e:
+        # Retried by the first registration
+        logger.warning(f"Could not load the face index: {e}")
+    yield
+    if face_index_training is not None:
+        await face_index_training
+    if FACE_INDEX_PATH and face_index_synced:
+        await asyncio.to_thread(face_index.save, FACE_INDEX_PATH)
+    biometric_pool.shutdown()
+    db_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 biometric_engine = BiometricEngine()
 
-# --- Database Connection ---
-def get_db_connection():
-    db_config = {
-        "dbname": os.getenv("DB_NAME", "central_identity_db"),
-        "user": os.getenv("DB_USER", "postgres"),
-        "password": os.getenv("DB_PASSWORD", "postgres"),  # Change this to your actual password
-        "host": os.getenv("DB_HOST", "localhost"),
+def db_unavailable(e: PoolTimeout) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def encode_photo(photo: UploadFile, reject_unreadable: bool = True) -> list:
+    """
+    Encodings of the faces in an uploaded photo, computed by the biometric pool
+    A full pool or a timeout answers 503 with Retry-After. An unreadable image answers 400,
+    or raises InvalidImage to the caller with reject_unreadable=False.
+    """
+    image_bytes = await photo.read()
+    try:
+        return await biometric_pool.encode(image_bytes)
+    except (ExecutorSaturated, BiometricTimeout) as e:
+        logger.warning(f"Rejected face encoding: {e}")
+        raise HTTPException(status_code=503, detail=f"Biometric processing unavailable: {e}",
+                            headers={"Retry-After": "1"})
+    except InvalidImage as e:
+        if not reject_unreadable:
+            raise
+        raise HTTPException(status_code=400, detail=str(e))
+
+# --- Database Queries (called with a pooled connection by db_pool.run) ---
+def find_citizen(conn, pan_number: str, aadhaar_hash: str):
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        # The JSON encoding is only fetched for rows that have no binary one yet
+        cursor.execute("""
+            SELECT citizen_id, full_name, face_encoding,
+                   CASE WHEN face_encoding IS NULL THEN face_encoding_json END AS face_encoding_json
+            FROM citizen_registry 
+            WHERE pan_number = %s AND aadhaar_number_hash = %s
+        """, (pan_number, aadhaar_hash))
+        return cursor.fetchone()
+
+def log_verification(conn, pan_number: str, name_score: int):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO verification_logs 
+            (claimed_pan, name_match_score, biometric_status, final_status)
+            VALUES (%s, %s, 'PASSED', 'VERIFIED')
+        """, (pan_number, name_score))
+    conn.commit()
+
+def insert_citizen(conn, full_name: str, pan_number: str, aadhaar_hash: str, encoding: bytes, encoding_json):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO citizen_registry 
+            (full_name, pan_number, aadhaar_number_hash, dob, face_encoding, face_encoding_json)
+            VALUES (%s, %s, %s, '2000-01-01', %s, %s)
+        """, (full_name, pan_number, aadhaar_hash, encoding, encoding_json))
+    conn.commit()
+
+async def lookup_citizen(pan_number: str, aadhaar_hash: str):
+    """
+    Citizen id, name and decoded face encoding (None if missing), from the cache or the registry
+    Returns None if no citizen matches; raises FaceCodecError if the stored encoding is unreadable.
+    """
+    key = (pan_number, aadhaar_hash)
+    if citizen_cache is not None:
+        citizen = citizen_cache.get(key)
+        if citizen is not None:
+            return citizen
+    
+    row = await db_pool.run(find_citizen, pan_number, aadhaar_hash)
+    if not row:
+        return None
+    citizen = {
+        "citizen_id": row['citizen_id'],
+        "full_name": row['full_name'],
+        "face_encoding": read_face(row['face_encoding'], row['face_encoding_json']),
     }
-    conn = psycopg2.connect(**db_config)
-    return conn
+    if citizen_cache is not None:
+        citizen_cache.put(key, citizen)
+    return citizen
+
+async def reserve_face(pan_number: str, encoding) -> bool:
+    """
+    Add a new registration's face to the index, or reject it with 409 if another PAN has it
+    Returns whether the face was added (and must be removed again if registration fails).
+    """
+    global duplicates_rejected
+    if not FACE_DEDUP:
+        return False
+    try:
+        # Catch up on other instances' registrations; the PAN unique constraint still decides
+        # between two instances registering at the same moment
+        await sync_face_index(FACE_INDEX_SYNC_INTERVAL)
+    except PoolTimeout as e:
+        raise db_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Face index unavailable: {e}")
+    
+    # Check and add are atomic, so two concurrent registrations of one face cannot both pass
+    match, reserved = await asyncio.to_thread(face_index.add_if_unique, pan_number, encoding, FACE_DEDUP_DISTANCE)
+    if match:
+        duplicates_rejected += 1
+        raise HTTPException(
+            status_code=409,
+            detail=f"Face already registered under another identity (distance {match[1]:.3f})"
+        )
+    return reserved
 
 # --- API Endpoints ---
 
@@ -50,17 +257,12 @@ async def verify_citizen(
     # 1. Hash Aadhaar for lookup (Security Best Practice)
     aadhaar_hash = hashlib.sha256(aadhaar_number.encode()).hexdigest()
     
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
     try:
-        # 2. Database Lookup
-        query = """
-            SELECT * FROM citizen_registry 
-            WHERE pan_number = %s AND aadhaar_number_hash = %s
-        """
-        cursor.execute(query, (pan_number, aadhaar_hash))
-        citizen = cursor.fetchone()
+        # 2. Database Lookup (served from memory when the citizen verified recently)
+        try:
+            citizen = await lookup_citizen(pan_number, aadhaar_hash)
+        except FaceCodecError:
+            return {"status": "ERROR", "reason": "Stored biometric data is unreadable."}
         
         if not citizen:
             return {"status": "REJECTED", "reason": "Identity not found in Central Registry"}
@@ -75,10 +277,15 @@ async def verify_citizen(
             
         # 4. Biometric Face Verification
         # specific logic: Match uploaded selfie against the face_encoding stored in DB
-        if citizen['face_encoding_json']:
+        if citizen['face_encoding'] is not None:
+            try:
+                live_encodings = await encode_photo(selfie, reject_unreadable=False)
+            except InvalidImage:
+                # An unreadable selfie does not match, like a selfie without a face
+                live_encodings = []
             is_match, distance = biometric_engine.verify_face(
-                citizen['face_encoding_json'], 
-                selfie.file
+                citizen['face_encoding'], 
+                live_encodings
             )
             
             if not is_match:
@@ -90,13 +297,7 @@ async def verify_citizen(
             return {"status": "ERROR", "reason": "No biometric data registered for this citizen."}
 
         # 5. Log the Success
-        log_query = """
-            INSERT INTO verification_logs 
-            (claimed_pan, name_match_score, biometric_status, final_status)
-            VALUES (%s, %s, 'PASSED', 'VERIFIED')
-        """
-        cursor.execute(log_query, (pan_number, name_score))
-        conn.commit()
+        await db_pool.run(log_verification, pan_number, name_score)
 
         return {
             "status": "VERIFIED",
@@ -106,12 +307,12 @@ async def verify_citizen(
             "message": "Citizen identity and biometrics confirmed."
         }
 
+    except HTTPException:
+        raise
+    except PoolTimeout as e:
+        raise db_unavailable(e)
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cursor.close()
-        conn.close()
 
 # --- Helper Endpoint: Register Citizen (To populate your Central DB) ---
 @app.post("/api/v1/register-citizen")
@@ -125,39 +326,73 @@ async def register_citizen(
     This endpoint is for YOU to populate the database.
     It takes the ID photo, encodes the face, and saves it.
     """
-    # Generate Face Encoding for storage
-    if MOCK_BIOMETRICS:
-        # Mock mode: generate a dummy 128-d encoding
-        encoding_list = [0.0] * 128
-    else:
-        id_photo.file.seek(0)
-        image = face_recognition.load_image_file(id_photo.file)
-        try:
-            encs = face_recognition.face_encodings(image)
-            if not encs:
-                raise IndexError()
-            encoding_list = encs[0].tolist() # Convert to JSON-able list
-        except IndexError:
-            raise HTTPException(status_code=400, detail="No face detected in ID photo")
+    # Generate Face Encoding for storage (mock mode: a dummy 128-d encoding)
+    encs = await encode_photo(id_photo)
+    if not encs:
+        raise HTTPException(status_code=400, detail="No face detected in ID photo")
+    encoding_list = encs[0].tolist() # Convert to JSON-able list
     
     aadhaar_hash = hashlib.sha256(aadhaar_number.encode()).hexdigest()
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Duplicate identity check: is this face already registered under another PAN?
+    reserved = await reserve_face(pan_number, encoding_list)
     
     try:
-        insert_query = """
-            INSERT INTO citizen_registry 
-            (full_name, pan_number, aadhaar_number_hash, dob, face_encoding_json)
-            VALUES (%s, %s, %s, '2000-01-01', %s)
-        """
-        cursor.execute(insert_query, (full_name, pan_number, aadhaar_hash, json.dumps(encoding_list)))
-        conn.commit()
-        
-        return {"status": "REGISTERED", "message": "Citizen added to Central DB with Biometrics"}
+        await db_pool.run(
+            insert_citizen, full_name, pan_number, aadhaar_hash, encode_face(encoding_list),
+            json.dumps(encoding_list) if FACE_ENCODING_WRITE_JSON else None,
+        )
     except Exception as e:
-        conn.rollback()
+        if reserved:
+            # Release the face so a corrected registration is not rejected as a duplicate
+            face_index.remove(pan_number)
+        if isinstance(e, PoolTimeout):
+            raise db_unavailable(e)
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+    
+    face_index.add(pan_number, encoding_list)
+    schedule_face_index_training()
+    if citizen_cache is not None:
+        citizen_cache.invalidate((pan_number, aadhaar_hash))
+    return {"status": "REGISTERED", "message": "Citizen added to Central DB with Biometrics"}
+
+# --- Pool Metrics ---
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """
+    Size, usage, waits and timeouts of the database connection pool
+    """
+    return db_pool.stats()
+
+# --- Face Index Metrics ---
+@app.get("/metrics/face-index")
+async def face_index_metrics():
+    """
+    Size and search timings of the face index, and registrations rejected as duplicates
+    """
+    return {
+        **face_index.stats(),
+        "synced": face_index_synced,
+        "sync_age_seconds": round(time.monotonic() - face_index_synced_at, 3) if face_index_synced else None,
+        "dedup_enabled": FACE_DEDUP,
+        "dedup_distance": FACE_DEDUP_DISTANCE,
+        "duplicates_rejected": duplicates_rejected,
+    }
+
+# --- Citizen Cache Metrics ---
+@app.get("/metrics/citizen-cache")
+async def citizen_cache_metrics():
+    """
+    Hit rate and size of the cache of citizens looked up by verifications
+    """
+    if citizen_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **citizen_cache.stats()}
+
+# --- Biometric Pool Metrics ---
+@app.get("/metrics/biometrics")
+async def biometric_metrics():
+    """
+    Load, timeouts and per-stage timings (queue, decode, detect, embed) of the biometric pool
+    """
+    return biometric_pool.stats()
@@ -0,0 +1,169 @@
+"""
+Micro-batching request coalescer
+Concurrent single predictions are queued for up to `max_wait_ms` or `max_batch_size` rows,
+scored together as one matrix, and each caller's future is resolved with its own row.
+Up to `max_concurrent_batches` batches are scored at once (the executor's worker count), and
+at most `max_queue` items wait; beyond that submit() raises ExecutorSaturated.
+"""
+
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, List
+
+from inference_executor import ExecutorSaturated
+
+# Upper bounds (rows) of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, float('inf'))
+
+
+class PredictionCoalescer:
+    """
+    Collects items submitted from request handlers and scores them in batches
+
+    score_batch receives a list of items and must return (or resolve to) one result per item, in order.
+    The background task is started on first use, on the running event loop.
+    """
+
+    def __init__(self, score_batch: Callable[[List[Any]], List[Any]], max_wait_ms: float = 2.0,
+                 max_batch_size: int = 64, max_concurrent_batches: int = 1, max_queue: int = 1024):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_concurrent_batches < 1:
+            raise ValueError("max_concurrent_batches must be at least 1")
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        self.score_batch = score_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_concurrent_batches = max_concurrent_batches
+        self.max_queue = max_queue
+
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._slots = None
+        self._scoring = set()  # batch tasks being scored
+
+        # Metrics
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_seen = 0
+        self.batch_size_counts = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._task = loop.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one item and wait for its result (or the exception raised while scoring its batch)
+        Raises ExecutorSaturated without queueing when max_queue items are already waiting.
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self._queue.qsize()} predictions already waiting for a batch")
+        return await future
+
+    async def _collect(self) -> list:
+        """
+        Wait for the first item, then gather more until the batch is full or the window closes
+        """
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        # Anything already queued joins this batch without waiting
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            # Wait for a free slot first: while every slot is busy, arrivals pile up into the next batch
+            await self._slots.acquire()
+            batch = await self._collect()
+            # Callers that gave up (e.g. client disconnect) are not scored
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                self._slots.release()
+                continue
+
+            started = time.perf_counter()
+            self._record(len(batch), [started - enqueued for _, _, enqueued in batch])
+            task = self._loop.create_task(self._score_batch(batch))
+            self._scoring.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task):
+        self._scoring.discard(task)
+        self._slots.release()
+
+    async def _score_batch(self, batch: list):
+        """
+        Score one batch and resolve its callers' futures
+        """
+        try:
+            results = await self._score([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _score(self, items: list) -> list:
+        # score_batch may return the results or an awaitable (e.g. dispatch to an executor)
+        results = self.score_batch(items)
+        if inspect.isawaitable(results):
+            results = await results
+        return results
+
+    def _record(self, batch_size: int, delays: List[float]):
+        self.batches += 1
+        self.rows += batch_size
+        self.max_batch_seen = max(self.max_batch_seen, batch_size)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if batch_size <= bucket:
+                self.batch_size_counts[bucket] += 1
+                break
+        self.queue_delay_total += sum(delays)
+        self.queue_delay_max = max(self.queue_delay_max, max(delays))
+
+    def stats(self) -> dict:
+        return {
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "max_queue": self.max_queue,
+            "batches": self.batches,
+            "batches_in_flight": len(self._scoring),
+            "rows": self.rows,
+            "mean_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size_seen": self.max_batch_seen,
+            "batch_size_histogram": {f"le_{bucket:g}": count for bucket, count in self.batch_size_counts.items()},
+            "mean_queue_delay_ms": round(self.queue_delay_total / self.rows * 1000.0, 3) if self.rows else 0.0,
+            "max_queue_delay_ms": round(self.queue_delay_max * 1000.0, 3),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,279 @@
+"""
+Shared PostgreSQL connection pool for central.py and verifier.py
+Connections are opened once and reused instead of paying a psycopg2.connect (TCP + auth
+handshake) per request, and database work runs on the pool's own threads so async handlers
+never block the event loop:
+
+  db_pool = pool_from_env("central_identity_db")
+  citizen = await db_pool.run(find_citizen, pan_number, aadhaar_hash)  # find_citizen(conn, ...)
+
+- open() creates `minconn` connections up front; up to `maxconn` are opened on demand
+- acquiring waits at most `acquire_timeout` seconds from the call, then raises PoolTimeout
+- a connection idle for more than `health_check_after` seconds is pinged before reuse; broken
+  connections are closed and replaced, and a returned connection's open transaction is rolled back
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    """
+    No connection became available within the acquire timeout
+    """
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections with bounded waits and usage metrics
+
+    `connect` opens one new connection. Connections are handed out most recently returned first,
+    so idle ones beyond the current load age out of use and get health-checked before reuse.
+    """
+
+    def __init__(self, connect: Callable[[], Any], minconn: int = 1, maxconn: int = 10,
+                 acquire_timeout: float = 5.0, health_check_after: float = 30.0, name: str = "db"):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool sizes must satisfy 0 <= minconn <= maxconn and maxconn >= 1")
+        if acquire_timeout <= 0:
+            raise ValueError("acquire_timeout must be positive")
+        self.name = name
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.acquire_timeout = acquire_timeout
+        self.health_check_after = health_check_after
+        self._connect = connect
+
+        self._idle = deque()  # (connection, returned_at)
+        self._size = 0  # open connections, idle or in use (including ones being opened)
+        self._cond = threading.Condition()
+        self._closed = False
+        # One thread per connection: run() calls queue here rather than in acquire
+        self._executor = ThreadPoolExecutor(max_workers=maxconn, thread_name_prefix=f"{name}-pool")
+
+        # Metrics
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.failed_health_checks = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def open(self):
+        """
+        Open connections up to `minconn`
+        """
+        for _ in range(self.minconn):
+            with self._cond:
+                if self._size >= self.minconn:
+                    return
+                self._size += 1
+            self._release_to_idle(self._new_connection())
+
+    def _new_connection(self):
+        """
+        Open a connection for a slot already counted in _size
+        """
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self.failed_health_checks += 1
+            return False
+
+    def _acquire(self, deadline: float, requested_at: Optional[float] = None):
+        start = time.monotonic() if requested_at is None else requested_at
+        while True:
+            with self._cond:
+                self.waiting += 1
+                try:
+                    while True:
+                        if self._closed:
+                            raise RuntimeError(f"Connection pool {self.name} is closed")
+                        if self._idle:
+                            conn, returned_at = self._idle.pop()
+                            break
+                        if self._size < self.maxconn:
+                            self._size += 1
+                            conn, returned_at = None, None
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeout(f"No {self.name} connection available within "
+                                              f"{self.acquire_timeout:g}s ({self.maxconn} in use)")
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+            if conn is None:
+                conn = self._new_connection()
+            elif not self._healthy(conn, returned_at):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self.acquired += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            return conn
+
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Check out a connection, waiting up to `timeout` (default: acquire_timeout) seconds
+        Must be given back with release(); prefer connection() or run().
+        """
+        return self._acquire(time.monotonic() + (self.acquire_timeout if timeout is None else timeout))
+
+    def release(self, conn, discard: bool = False):
+        """
+        Return a connection; an open transaction is rolled back, a broken connection is closed
+        """
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+        else:
+            self._release_to_idle(conn)
+
+    def _release_to_idle(self, conn):
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    @contextmanager
+    def _checkout(self, deadline: float, requested_at: Optional[float] = None):
+        conn = self._acquire(deadline, requested_at)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard)
+
+    def connection(self, timeout: Optional[float] = None):
+        """
+        Context manager checking out a connection for the duration of the block (blocking)
+        """
+        return self._checkout(time.monotonic() + (self.acquire_timeout if timeout is None else timeout))
+
+    def _run(self, deadline: float, fn: Callable, args: tuple):
+        if time.monotonic() >= deadline:
+            # Spent the whole timeout queued behind other calls
+            with self._cond:
+                self.timeouts += 1
+            raise PoolTimeout(f"No {self.name} connection available within {self.acquire_timeout:g}s "
+                              f"({self.maxconn} in use)")
+        # Wait metrics include the time queued for a pool thread
+        with self._checkout(deadline, requested_at=deadline - self.acquire_timeout) as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Call fn(connection, *args) on a pool thread and return its result
+        fn commits its own writes; anything left uncommitted is rolled back. The acquire timeout
+        counts from this call, so time queued behind other calls is included.
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._run, deadline, fn, args)
+
+    def close(self):
+        """
+        Close idle connections now and in-use ones as they are returned
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self.waiting,
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "failed_health_checks": self.failed_health_checks,
+                "wait_ms_avg": round(self.wait_seconds_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+            }
+
+
+def pool_from_env(default_dbname: str) -> ConnectionPool:
+    """
+    Pool for the database configured by DB_NAME/DB_USER/DB_PASSWORD/DB_HOST, sized by DB_POOL_*
+    """
+    db_config = {
+        "dbname": os.getenv("DB_NAME", default_dbname),
+        "user": os.getenv("DB_USER", "postgres"),
+        "password": os.getenv("DB_PASSWORD", "postgres"),
+        "host": os.getenv("DB_HOST", "localhost"),
+        "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+    }
+    return ConnectionPool(
+        lambda: psycopg2.connect(**db_config),
+        minconn=int(os.getenv("DB_POOL_MIN", "1")),
+        maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+        acquire_timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        health_check_after=float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30")),
+        name=db_config["dbname"],
+    )
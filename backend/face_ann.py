@@ -0,0 +1,505 @@
+"""
+Approximate nearest-neighbour search for the face index (NumPy only)
+An exact scan reads every stored encoding per query, which is fine at 100k citizens but
+not at tens of millions. IVFFaceIndex partitions the encodings with k-means and a query
+scans only the `nprobe` partitions whose centroids are nearest (IVF). With `pq_m`
+subquantizers, candidates are first ranked from 1-byte-per-subspace product-quantized codes
+of their residuals (IVF-PQ), and only the best `rerank` are compared exactly.
+
+Same API as FaceIndex; the services pick the implementation with FACE_INDEX_MODE:
+
+  exact     FaceIndex (default)
+  ivf       IVFFaceIndex, exact distances within the probed partitions
+  ivfpq     IVFFaceIndex with product quantization
+
+Until train() has run on enough encodings, IVFFaceIndex answers with an exact scan. Training
+and rebuilding the inverted lists run outside the index lock, so searches (and registrations)
+keep using the previous partitions meanwhile; removals patch the lists in place.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+from face_index import FACE_ENCODING_DIM, MANIFEST_FILE, FaceIndex, index_exists
+
+logger = logging.getLogger(__name__)
+
+FACE_INDEX_MODES = ("exact", "ivf", "ivfpq")
+
+# Training points per partition (and per PQ centroid) needed for useful centroids
+MIN_POINTS_PER_CENTROID = 39
+PQ_CENTROIDS = 256
+# Rows outside the inverted lists (added since they were built, moved or reassigned) plus removed
+# entries, beyond which needs_training() asks for the lists to be rebuilt
+MAX_UNLISTED_ROWS = 16384
+# Encodings assigned to partitions per lock acquisition while training
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def _nearest_centroid(data: np.ndarray, centroids: np.ndarray, block: int = 16384) -> np.ndarray:
+    """
+    Index of the nearest centroid per row, in blocks to bound the distance matrix
+    """
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), block):
+        scores = data[start:start + block] @ centroids.T
+        scores *= -2
+        scores += centroid_norms
+        labels[start:start + block] = scores.argmin(axis=1)
+    return labels
+
+
+def _inverted_lists(assignments: np.ndarray, nlist: int):
+    """
+    (rows grouped by partition, partition offsets into them, position of each row) for CSR lists
+    """
+    list_rows = np.argsort(assignments, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))])
+    positions = np.empty(len(assignments), dtype=np.int64)
+    positions[list_rows] = np.arange(len(assignments))
+    return list_rows, offsets, positions
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Lloyd's k-means from k distinct random points; empty clusters are reseeded from random points
+    """
+    rng = np.random.default_rng(seed)
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    if len(data) < k:
+        raise ValueError(f"k-means needs at least {k} points, got {len(data)}")
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest_centroid(data, centroids)
+        counts = np.bincount(labels, minlength=k)
+        order = np.argsort(labels, kind='stable')
+        present = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+        centroids[present] = np.add.reduceat(data[order], starts, axis=0) / counts[present, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Splits vectors into m subvectors and codes each as the nearest of 256 centroids (one byte)
+    Distances to a query are then sums of m table lookups (asymmetric distance computation).
+    """
+
+    def __init__(self, codebooks: np.ndarray):
+        self.codebooks = np.ascontiguousarray(codebooks, dtype=np.float32)  # (m, 256, dim / m)
+        self.m, _, self.sub_dim = self.codebooks.shape
+        self._codebook_norms = np.einsum('mkd,mkd->mk', self.codebooks, self.codebooks)
+
+    @classmethod
+    def train(cls, data: np.ndarray, m: int, iterations: int = 20, seed: int = 0) -> 'ProductQuantizer':
+        if data.shape[1] % m:
+            raise ValueError(f"PQ subquantizers ({m}) must divide the dimension ({data.shape[1]})")
+        sub_dim = data.shape[1] // m
+        return cls(np.stack([
+            kmeans(data[:, j * sub_dim:(j + 1) * sub_dim], PQ_CENTROIDS, iterations, seed + j) for j in range(m)
+        ]))
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(data), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest_centroid(data[:, j * self.sub_dim:(j + 1) * self.sub_dim], self.codebooks[j])
+        return codes
+
+    def distance_tables(self, residuals: np.ndarray) -> np.ndarray:
+        """
+        (n, m * 256) squared distances from each residual's subvectors to every centroid
+        """
+        # |r - c|^2 = |r|^2 - 2 r.c + |c|^2, as one batched product per subspace
+        sub = residuals.reshape(len(residuals), self.m, self.sub_dim).transpose(1, 0, 2)
+        tables = sub @ self.codebooks.transpose(0, 2, 1)
+        tables *= -2
+        tables += self._codebook_norms[:, None, :]
+        tables += np.einsum('mnd,mnd->mn', sub, sub)[:, :, None]
+        return tables.transpose(1, 0, 2).reshape(len(residuals), -1)
+
+
+class IVFFaceIndex(FaceIndex):
+    """
+    Approximate face index: k-means partitions (inverted lists), optionally product-quantized
+
+    nlist partitions (default: about sqrt(size) at training time), nprobe of them scanned per
+    query. With pq_m > 0, the `rerank` best candidates by PQ distance are re-scored exactly.
+    Full encodings are kept either way, for re-scoring, retraining and snapshots.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, dim: int = FACE_ENCODING_DIM, capacity: int = 1024, nlist: int = 0, nprobe: int = 16,
+                 pq_m: int = 0, rerank: int = 64, seed: int = 0):
+        if nprobe < 1 or rerank < 1 or pq_m < 0:
+            raise ValueError("nprobe and rerank must be positive and pq_m non-negative")
+        if pq_m and dim % pq_m:
+            raise ValueError(f"pq_m ({pq_m}) must divide the dimension ({dim})")
+        super().__init__(dim, capacity)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.rerank = rerank
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None
+        self.pq: Optional[ProductQuantizer] = None
+        self.trained_size = 0
+        self._train_lock = threading.Lock()
+        self._assignments = np.full(capacity, -1, dtype=np.int32)
+        self._codes = np.zeros((capacity, pq_m), dtype=np.uint8)
+        # Inverted lists: rows [0, _listed) grouped by partition (-1: removed entry). Rows after that,
+        # and _detached rows below it (moved by a removal or reassigned), are scanned exhaustively.
+        self._list_rows = np.empty(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+        self._list_pos = np.empty(0, dtype=np.int64)  # row -> position in _list_rows
+        self._listed = 0
+        self._detached = set()
+        self._tombstones = 0
+        self._dirty = None  # rows changed while train() assigns partitions outside the lock
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def params(self) -> dict:
+        return {"nlist": self.nlist, "nprobe": self.nprobe, "pq_m": self.pq_m, "rerank": self.rerank, "seed": self.seed}
+
+    def _reserve(self, size: int):
+        super()._reserve(size)
+        capacity = len(self._vectors)
+        if len(self._assignments) < capacity or not self._assignments.flags.writeable:
+            n = len(self._keys)
+            assignments = np.full(capacity, -1, dtype=np.int32)
+            codes = np.zeros((capacity, self.pq_m), dtype=np.uint8)
+            assignments[:n] = self._assignments[:n]
+            codes[:n] = self._codes[:n]
+            self._assignments, self._codes = assignments, codes
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray, pq: Optional['ProductQuantizer']):
+        assignments = _nearest_centroid(vectors, centroids)
+        codes = pq.encode(vectors - centroids[assignments]) if pq is not None else None
+        return assignments, codes
+
+    def _encode_rows(self, rows: np.ndarray):
+        """
+        Assign rows to partitions (and PQ codes); listed rows that change partition leave their list
+        """
+        if not len(rows):
+            return
+        assignments, codes = self._assign(self._vectors[rows], self.centroids, self.pq)
+        if codes is not None:
+            self._codes[rows] = codes
+        listed = rows < self._listed
+        for row in rows[listed][self._assignments[rows[listed]] != assignments[listed]]:
+            self._detach(int(row))
+        self._assignments[rows] = assignments
+
+    def _detach(self, row: int):
+        """
+        Remove a listed row's entry from its list; the row is scanned exhaustively until the next rebuild
+        """
+        if row in self._detached:
+            return
+        self._list_rows[self._list_pos[row]] = -1
+        self._tombstones += 1
+        self._detached.add(row)
+
+    def _rows_changed(self, rows: np.ndarray):
+        if self._dirty is not None:
+            self._dirty.update(rows.tolist())
+        if self.trained:
+            self._encode_rows(rows)
+
+    def _row_removed(self, row: int, last: int):
+        self._assignments[row] = self._assignments[last]
+        self._codes[row] = self._codes[last]
+        if self._dirty is not None:
+            self._dirty.add(row)
+        if row < self._listed:
+            self._detach(row)  # drops the removed encoding's entry
+            self._detached.discard(row)
+        if last != row:
+            if last < self._listed and last not in self._detached:
+                # The moved encoding keeps its list entry under its new row
+                position = self._list_pos[last]
+                self._list_rows[position] = row
+                self._list_pos[row] = position
+            elif row < self._listed:
+                self._detached.add(row)
+            self._detached.discard(last)
+        self._listed = min(self._listed, last)
+
+    def _partitions(self, size: int) -> int:
+        return self.nlist or max(1, int(round(np.sqrt(size))))
+
+    def _min_training_size(self, nlist: int) -> int:
+        return max(nlist, PQ_CENTROIDS if self.pq_m else 1) * MIN_POINTS_PER_CENTROID
+
+    def needs_training(self) -> bool:
+        """
+        Whether train() has work: fitting partitions (untrained with enough encodings, or doubled
+        since training) or rebuilding inverted lists that fell behind
+        """
+        size = len(self)
+        if self.trained:
+            return size >= 2 * self.trained_size or self._lists_behind()
+        return size >= self._min_training_size(self._partitions(size))
+
+    def train(self, force: bool = False, sample_size: int = 0, iterations: int = 20) -> bool:
+        """
+        Fit partitions (and PQ codebooks) if untrained or the index doubled since; returns whether it trained
+        Runs k-means on a sample (default: 256 points per partition) and assigns every encoding.
+        Searches keep working meanwhile, on the previous partitions or an exact scan. When no
+        training is due, inverted lists that fell behind are rebuilt instead.
+        """
+        with self._train_lock:
+            size = len(self)
+            if not force and self.trained and size < 2 * self.trained_size:
+                if self._lists_behind():
+                    self.rebuild_lists()
+                return False
+            nlist = self._partitions(size)
+            min_size = self._min_training_size(nlist)
+            if size < min_size:
+                if force:
+                    raise ValueError(f"Training {nlist} partitions needs at least {min_size} encodings, have {size}")
+                return False
+
+            rng = np.random.default_rng(self.seed)
+            with self._lock:
+                sample_rows = np.sort(rng.choice(size, size=min(size, sample_size or nlist * 256), replace=False))
+                sample = np.array(self._vectors[sample_rows])
+            centroids = kmeans(sample, nlist, iterations, self.seed)
+            pq = None
+            if self.pq_m:
+                residuals = sample - centroids[_nearest_centroid(sample, centroids)]
+                pq = ProductQuantizer.train(residuals, self.pq_m, iterations, self.seed)
+
+            # Assign every encoding outside the lock; rows changed meanwhile are redone below
+            with self._lock:
+                self._dirty = set()
+                assigned = len(self)
+            try:
+                assignments = np.empty(assigned, dtype=np.int32)
+                codes = np.empty((assigned, self.pq_m), dtype=np.uint8) if pq is not None else None
+                for start in range(0, assigned, ASSIGN_BLOCK_ROWS):
+                    stop = min(start + ASSIGN_BLOCK_ROWS, assigned)
+                    with self._lock:
+                        block = np.array(self._vectors[start:stop])
+                    assignments[start:stop], block_codes = self._assign(block, centroids, pq)
+                    if codes is not None:
+                        codes[start:stop] = block_codes
+                lists = _inverted_lists(assignments, len(centroids))
+            except BaseException:
+                with self._lock:
+                    self._dirty = None
+                raise
+
+            with self._lock:
+                dirty, self._dirty = self._dirty, None
+                n = len(self)
+                self._reserve(n)
+                listed = min(assigned, n)
+                self.centroids, self.pq = centroids, pq
+                self._assignments[:listed] = assignments[:listed]
+                if codes is not None:
+                    self._codes[:listed] = codes[:listed]
+                # Rows removed meanwhile no longer exist; their entries are dropped
+                gone = lists[0] >= listed
+                lists[0][gone] = -1
+                self._install_lists(lists, listed, int(gone.sum()))
+                redo = np.array(sorted(row for row in dirty if row < listed), dtype=np.int64)
+                self._encode_rows(np.concatenate([redo, np.arange(listed, n)]))
+                self.trained_size = n
+            logger.info(f"Trained {nlist} face index partitions on {len(sample)} of {size} encodings"
+                        + (f" with {self.pq_m}-byte PQ codes" if pq is not None else ""))
+            return True
+
+    def _install_lists(self, lists: tuple, listed: int, tombstones: int = 0):
+        self._list_rows, self._list_offsets, self._list_pos = lists
+        self._listed = listed
+        self._detached = set()
+        self._tombstones = tombstones
+
+    def _build_lists(self):
+        n = len(self._keys)
+        self._install_lists(_inverted_lists(self._assignments[:n], len(self.centroids)), n)
+
+    def _lists_behind(self) -> bool:
+        return self.trained and len(self) - self._listed + self._tombstones > MAX_UNLISTED_ROWS
+
+    def rebuild_lists(self) -> bool:
+        """
+        Regroup all rows into the inverted lists, sorting outside the lock; returns whether they were replaced
+        Searches use the current lists meanwhile. If rows were removed or changed partition during
+        the sort, the new lists are dropped and the next call tries again.
+        """
+        with self._lock:
+            if not self.trained:
+                return False
+            n = len(self._keys)
+            assignments = np.array(self._assignments[:n])
+        lists = _inverted_lists(assignments, len(self.centroids))
+        with self._lock:
+            if len(self._keys) < n or not np.array_equal(self._assignments[:n], assignments):
+                return False
+            self._install_lists(lists, n)
+        return True
+
+    def _nearest(self, queries: np.ndarray, k: int) -> np.ndarray:
+        if not self.trained:
+            return super()._nearest(queries, k)
+        n = len(self._keys)
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        coarse = queries @ self.centroids.T
+        coarse *= -2
+        coarse += np.einsum('ij,ij->i', self.centroids, self.centroids)
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe] if nprobe < len(self.centroids) \
+            else np.broadcast_to(np.arange(nprobe), (len(queries), nprobe))
+        unlisted = np.concatenate([np.fromiter(self._detached, dtype=np.int64, count=len(self._detached)),
+                                   np.arange(self._listed, n)])
+
+        best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            segments = [self._list_rows[self._list_offsets[j]:self._list_offsets[j + 1]] for j in lists]
+            if self._tombstones:
+                segments = [segment[segment >= 0] for segment in segments]
+            if self.pq is not None:
+                candidates = self._pq_candidates(query, lists, segments)
+            else:
+                candidates = np.concatenate(segments)
+            rows = np.concatenate([candidates, unlisted])
+            if not len(rows):
+                continue
+            scores = self._norms[rows] - 2 * (self._vectors[rows] @ query)
+            if len(rows) > k:
+                keep = np.argpartition(scores, k - 1)[:k]
+                rows = rows[keep]
+            best_rows[i, :len(rows)] = rows
+        return best_rows
+
+    def _pq_candidates(self, query: np.ndarray, lists: np.ndarray, segments: list) -> np.ndarray:
+        """
+        The `rerank` rows of the probed lists nearest to the query by PQ distance
+        """
+        rows = np.concatenate(segments)
+        if len(rows) <= self.rerank:
+            return rows
+        # One gather over all probed lists: row r of list i reads tables[i, j * 256 + code[r, j]]
+        tables = self.pq.distance_tables(query - self.centroids[lists])
+        table_offsets = np.repeat(np.arange(len(lists)) * tables.shape[1], [len(segment) for segment in segments])
+        lookup = self._codes[rows].astype(np.intp)
+        lookup += np.arange(self.pq.m) * PQ_CENTROIDS
+        lookup += table_offsets[:, None]
+        scores = tables.ravel()[lookup].sum(axis=1)
+        if len(rows) > self.rerank:
+            rows = rows[np.argpartition(scores, self.rerank - 1)[:self.rerank]]
+        return rows
+
+    def _snapshot_arrays(self) -> dict:
+        arrays = super()._snapshot_arrays()
+        if self.trained:
+            n = len(self._keys)
+            arrays['centroids'] = self.centroids
+            arrays['assignments'] = self._assignments[:n]
+            if self.pq is not None:
+                arrays['pq_codebooks'] = self.pq.codebooks
+                arrays['pq_codes'] = self._codes[:n]
+        return arrays
+
+    def _restore_arrays(self, arrays: dict, writable: bool):
+        super()._restore_arrays(arrays, writable)
+        n = len(self._keys)
+        if 'centroids' in arrays:
+            self.centroids = np.array(arrays['centroids'])
+            self._assignments = arrays['assignments']
+            if 'pq_codebooks' in arrays:
+                self.pq = ProductQuantizer(arrays['pq_codebooks'])
+                self._codes = arrays['pq_codes']
+            else:
+                self._codes = np.zeros((n, self.pq_m), dtype=np.uint8)
+            self.trained_size = n
+            self._build_lists()
+        else:
+            self._assignments = np.full(n, -1, dtype=np.int32)
+            self._codes = np.zeros((n, self.pq_m), dtype=np.uint8)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats.update({
+                "trained": self.trained,
+                "trained_size": self.trained_size,
+                "unlisted_rows": len(self._keys) - self._listed + len(self._detached),
+                "removed_entries": self._tombstones,
+                "nlist": len(self.centroids) if self.trained else self.nlist,
+                "nprobe": self.nprobe,
+                "pq_m": self.pq_m,
+                "rerank": self.rerank,
+            })
+        return stats
+
+
+def _layout(index: FaceIndex) -> dict:
+    """
+    Parameters that shape the stored partitions and codes (not the per-search ones)
+    """
+    return {name: value for name, value in index.params().items() if name not in ("nprobe", "rerank")}
+
+
+def create_face_index(snapshot_path: Optional[str] = None) -> FaceIndex:
+    """
+    Face index configured by FACE_INDEX_MODE/NLIST/NPROBE/PQ_M/RERANK, restored from a snapshot if present
+    A snapshot of another kind or with other partitioning still provides the encodings; the
+    partitions are then rebuilt by train().
+    """
+    mode = os.getenv("FACE_INDEX_MODE", "exact").lower()
+    if mode not in FACE_INDEX_MODES:
+        raise ValueError(f"FACE_INDEX_MODE must be one of {', '.join(FACE_INDEX_MODES)}, got {mode!r}")
+    if mode == "exact":
+        index = FaceIndex()
+    else:
+        index = IVFFaceIndex(
+            nlist=int(os.getenv("FACE_INDEX_NLIST", "0")),
+            nprobe=int(os.getenv("FACE_INDEX_NPROBE", "16")),
+            pq_m=int(os.getenv("FACE_INDEX_PQ_M", "16")) if mode == "ivfpq" else 0,
+            rerank=int(os.getenv("FACE_INDEX_RERANK", "64")),
+        )
+    if not snapshot_path or not index_exists(snapshot_path):
+        return index
+
+    try:
+        snapshot = load_snapshot(snapshot_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable face index snapshot {snapshot_path}: {e}")
+        return index
+    if type(snapshot) is type(index) and _layout(snapshot) == _layout(index):
+        if isinstance(index, IVFFaceIndex):
+            snapshot.nprobe, snapshot.rerank = index.nprobe, index.rerank
+        return snapshot
+    index.add_many(snapshot.keys(), snapshot._vectors[:len(snapshot)])
+    index.watermark = snapshot.watermark
+    return index
+
+
+def load_snapshot(path: str, mmap: bool = True) -> FaceIndex:
+    """
+    Load a snapshot saved by any face index kind
+    """
+    with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+        kind = json.load(f).get('kind', 'exact')
+    classes = {cls.kind: cls for cls in (FaceIndex, IVFFaceIndex)}
+    if kind not in classes:
+        raise ValueError(f"Unknown face index kind {kind!r}")
+    return classes[kind].load(path, mmap)
@@ -0,0 +1,398 @@
+"""
+In-memory 1:N search over registered face encodings
+All encodings live in one contiguous float32 matrix, so "is this face already registered?"
+is a few matrix products instead of a JSON parse and a norm per stored row:
+
+  index = FaceIndex()
+  sync_from_db(conn, index, "citizen_registry", "citizen_id")   # load existing citizens
+  index.search(encoding, k=3)                                   # [(pan, distance), ...]
+
+A snapshot directory saved with save() loads memory-mapped, so a restart only reads the
+rows registered since (see sync_from_db):
+
+    face_index.json     format version, dimension, size, sync watermark
+    vectors.npy         (size, dim) float32 encodings
+    norms.npy           (size,) float32 squared norms
+    keys.npy            (size,) keys (PANs)
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from psycopg2 import sql
+
+from face_codec import FACE_ENCODING_DIM, FaceCodecError, read_face
+
+INDEX_FORMAT_VERSION = 1
+MANIFEST_FILE = "face_index.json"
+
+# Rows scored per matrix product; bounds the distance matrix to block x queries floats
+SEARCH_BLOCK_ROWS = 65536
+
+# Ids below the watermark that sync_from_db checks again, for rows whose insert committed late
+SYNC_OVERLAP_ROWS = 1000
+
+
+def _write_atomically(path: str, write):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def index_exists(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+class FaceIndex:
+    """
+    Exact nearest-neighbour index of face encodings keyed by PAN
+
+    Distances are Euclidean, like face_recognition.face_distance. Adding an existing key
+    replaces its encoding; removing moves the last row into the gap, so rows stay dense.
+    All methods are thread-safe. Subclasses (face_ann.IVFFaceIndex) keep per-row search data
+    in step through _rows_changed/_row_removed and replace _nearest.
+    """
+
+    kind = "exact"
+
+    def __init__(self, dim: int = FACE_ENCODING_DIM, capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._norms = np.zeros(capacity, dtype=np.float32)
+        self._keys: List[str] = []
+        self._rows = {}  # key -> row
+        self._writable = True  # False while the arrays are a read-only snapshot mapping
+        self._lock = threading.RLock()
+        # Highest database row id loaded by sync_from_db
+        self.watermark = 0
+
+        # Metrics
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._keys)
+
+    def _as_matrix(self, encodings) -> np.ndarray:
+        matrix = np.ascontiguousarray(encodings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        if matrix.ndim != 2 or matrix.shape[1] != self.dim:
+            raise ValueError(f"Face encodings must have {self.dim} values, got shape {matrix.shape}")
+        if not np.isfinite(matrix).all():
+            raise ValueError("Face encodings must be finite")
+        return matrix
+
+    def _reserve(self, size: int):
+        """
+        Make the arrays writable with room for `size` rows
+        """
+        capacity = len(self._vectors)
+        if self._writable and size <= capacity:
+            return
+        if size > capacity:
+            capacity = max(size, capacity * 2, 1024)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        n = len(self._keys)
+        vectors[:n] = self._vectors[:n]
+        norms[:n] = self._norms[:n]
+        self._vectors, self._norms, self._writable = vectors, norms, True
+
+    def add(self, key: str, encoding: Sequence[float]):
+        self.add_many([key], [encoding])
+
+    def add_many(self, keys: Sequence[str], encodings):
+        """
+        Add or replace encodings; the last one wins if a key repeats
+        """
+        matrix = self._as_matrix(encodings) if len(keys) else np.empty((0, self.dim), np.float32)
+        if len(keys) != len(matrix):
+            raise ValueError(f"Got {len(keys)} keys for {len(matrix)} encodings")
+        latest = {key: i for i, key in enumerate(keys)}
+        with self._lock:
+            new_keys = [key for key in latest if key not in self._rows]
+            self._reserve(len(self._keys) + len(new_keys))
+            for key in new_keys:
+                self._rows[key] = len(self._keys)
+                self._keys.append(key)
+            rows = np.fromiter((self._rows[key] for key in latest), dtype=np.int64, count=len(latest))
+            source = np.fromiter(latest.values(), dtype=np.int64, count=len(latest))
+            self._vectors[rows] = matrix[source]
+            self._norms[rows] = np.einsum('ij,ij->i', matrix[source], matrix[source])
+            self._rows_changed(rows)
+
+    def _rows_changed(self, rows: np.ndarray):
+        """
+        Called with the lock held after the encodings at `rows` were written
+        """
+
+    def _row_removed(self, row: int, last: int):
+        """
+        Called with the lock held after a removal moved row `last` into `row`
+        """
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return False
+            self._reserve(len(self._keys))
+            last = len(self._keys) - 1
+            if row != last:
+                moved = self._keys[last]
+                self._keys[row] = moved
+                self._rows[moved] = row
+                self._vectors[row] = self._vectors[last]
+                self._norms[row] = self._norms[last]
+            self._keys.pop()
+            self._row_removed(row, last)
+            return True
+
+    def needs_training(self) -> bool:
+        """
+        Whether train() has something to fit; exact search never does
+        """
+        return False
+
+    def train(self, force: bool = False) -> bool:
+        """
+        Fit search structures to the current encodings; exact search has none to fit
+        """
+        return False
+
+    def _nearest(self, queries: np.ndarray, k: int) -> np.ndarray:
+        """
+        Rows of the k nearest encodings per query, unordered; -1 where the index has fewer than k rows
+        """
+        n_queries, size = len(queries), len(self._keys)
+        best_rows = np.full((n_queries, k), -1, dtype=np.int64)
+        best_score = np.full((n_queries, k), np.inf, dtype=np.float32)
+        for start in range(0, size, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, size)
+            # |q - x|^2 = |q|^2 - 2 q.x + |x|^2; |q|^2 is the same for every row, so ranking skips it
+            score = queries @ self._vectors[start:stop].T
+            score *= -2
+            score += self._norms[start:stop]
+            if stop - start > k:
+                rows = np.argpartition(score, k - 1, axis=1)[:, :k]
+                score = np.take_along_axis(score, rows, axis=1)
+                rows += start
+            else:
+                rows = np.broadcast_to(np.arange(start, stop), score.shape)
+            score = np.concatenate([best_score, score], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            keep = np.argpartition(score, k - 1, axis=1)[:, :k]
+            best_score = np.take_along_axis(score, keep, axis=1)
+            best_rows = np.take_along_axis(rows, keep, axis=1)
+        return best_rows
+
+    def search_batch(self, queries, k: int = 1, max_distance: Optional[float] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Up to k (key, distance) pairs per query, nearest first, optionally within max_distance
+        """
+        queries = self._as_matrix(queries)
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        start = time.perf_counter()
+        with self._lock:
+            rows = self._nearest(queries, k)
+            results = []
+            for query, query_rows in zip(queries, rows):
+                query_rows = query_rows[query_rows >= 0]
+                # Exact distances for the few candidates (the expanded form loses precision near 0)
+                distances = np.linalg.norm(self._vectors[query_rows] - query, axis=1)
+                order = np.argsort(distances, kind='stable')
+                results.append([
+                    (self._keys[query_rows[i]], float(distances[i])) for i in order
+                    if max_distance is None or distances[i] <= max_distance
+                ])
+            self.searches += len(queries)
+            self.search_seconds += time.perf_counter() - start
+        return results
+
+    def search(self, encoding, k: int = 1, max_distance: Optional[float] = None) -> List[Tuple[str, float]]:
+        return self.search_batch(self._as_matrix(encoding), k, max_distance)[0]
+
+    def add_if_unique(self, key: str, encoding, max_distance: float) -> Tuple[Optional[Tuple[str, float]], bool]:
+        """
+        Add `key` unless another key's encoding lies within max_distance
+        Returns (nearest other (key, distance) within max_distance or None, whether key was added).
+        Check and add happen under one lock, so two concurrent registrations of the same face
+        cannot both pass. An existing key is left unchanged.
+        """
+        with self._lock:
+            matches = [match for match in self.search(encoding, k=2, max_distance=max_distance) if match[0] != key]
+            if matches:
+                return matches[0], False
+            if key in self._rows:
+                return None, False
+            self.add(key, encoding)
+            return None, True
+
+    def params(self) -> dict:
+        """
+        Constructor arguments beyond dim and capacity, stored in snapshots
+        """
+        return {}
+
+    def _snapshot_arrays(self) -> dict:
+        n = len(self._keys)
+        return {
+            'vectors': self._vectors[:n],
+            'norms': self._norms[:n],
+            'keys': np.array(self._keys, dtype=str) if n else np.array([], dtype='<U1'),
+        }
+
+    def _restore_arrays(self, arrays: dict, writable: bool):
+        size = len(arrays['keys'])
+        if arrays['vectors'].shape != (size, self.dim) or arrays['norms'].shape != (size,):
+            raise ValueError("Face index arrays do not match the manifest")
+        self._vectors, self._norms, self._writable = arrays['vectors'], arrays['norms'], writable
+        self._keys = arrays['keys'].tolist()
+        self._rows = {key: row for row, key in enumerate(self._keys)}
+
+    def save(self, path: str):
+        """
+        Write a snapshot directory; the manifest goes last, so a partial snapshot is never loaded
+        """
+        with self._lock:
+            arrays = self._snapshot_arrays()
+            manifest = {
+                'format_version': INDEX_FORMAT_VERSION,
+                'kind': self.kind,
+                'dim': self.dim,
+                'size': len(self._keys),
+                'watermark': self.watermark,
+                'params': self.params(),
+                'arrays': sorted(arrays),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            }
+            os.makedirs(path, exist_ok=True)
+            for name, array in arrays.items():
+                _write_atomically(os.path.join(path, f'{name}.npy'),
+                                  lambda f: np.save(f, np.ascontiguousarray(array), allow_pickle=False))
+        _write_atomically(os.path.join(path, MANIFEST_FILE), lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'FaceIndex':
+        """
+        Load a snapshot; with mmap the encodings are mapped read-only and copied on the first change
+        """
+        with open(os.path.join(path, MANIFEST_FILE), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported face index format {manifest.get('format_version')} "
+                             f"(expected {INDEX_FORMAT_VERSION})")
+
+        if manifest.get('kind', 'exact') != cls.kind:
+            raise ValueError(f"Face index snapshot holds a {manifest.get('kind')} index, not {cls.kind}")
+
+        arrays = {}
+        for name in manifest.get('arrays', ['vectors', 'norms', 'keys']):
+            # Keys become a dict anyway; everything else can stay mapped
+            mmap_mode = 'r' if mmap and name != 'keys' else None
+            arrays[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        if len(arrays['keys']) != manifest['size']:
+            raise ValueError("Face index arrays do not match the manifest")
+
+        index = cls(dim=manifest['dim'], capacity=0, **manifest.get('params', {}))
+        index._restore_arrays(arrays, writable=not mmap)
+        index.watermark = manifest['watermark']
+        return index
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "size": len(self._keys),
+                "capacity": len(self._vectors),
+                "dim": self.dim,
+                "memory_mb": round((self._vectors.nbytes + self._norms.nbytes) / (1024 * 1024), 2),
+                "watermark": self.watermark,
+                "searches": self.searches,
+                "search_ms_avg": round(self.search_seconds / self.searches * 1000, 3) if self.searches else 0.0,
+            }
+
+
+def decode_encodings(values: Iterable[tuple], dim: int = FACE_ENCODING_DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (float32 matrix, mask of the values kept) from stored (binary, JSON) encoding pairs
+    Each pair is decoded with read_face, so rows not yet backfilled fall back to their JSON;
+    missing and malformed encodings are skipped.
+    """
+    decoded, kept = [], []
+    for binary, encoding_json in values:
+        try:
+            encoding = read_face(binary, encoding_json, dim)
+        except FaceCodecError:
+            encoding = None
+        kept.append(encoding is not None)
+        if encoding is not None:
+            decoded.append(encoding)
+    matrix = np.stack(decoded) if decoded else np.empty((0, dim), dtype=np.float32)
+    return matrix, np.array(kept, dtype=bool)
+
+
+def sync_from_db(conn, index: FaceIndex, table: str, id_column: str, key_column: str = "pan_number",
+                 encoding_column: str = "face_encoding", json_column: str = "face_encoding_json",
+                 batch_size: int = 10000, overlap: Optional[int] = SYNC_OVERLAP_ROWS) -> int:
+    """
+    Add rows with an id above index.watermark, streamed in batches; returns the number added
+    Called with a pooled connection (db_pool.run): from scratch this loads the whole table, after
+    FaceIndex.load or an earlier sync only the rows added since.
+
+    Ids are assigned at insert, not at commit, so a row can become visible after rows with higher
+    ids were already read. The `overlap` ids below the watermark (all of them with None) are
+    therefore re-checked by key, and the encodings of rows whose key is not in the index are read
+    too. The JSON column is only fetched for rows without a binary encoding.
+    """
+    identifiers = dict(
+        id=sql.Identifier(id_column), key=sql.Identifier(key_column), encoding=sql.Identifier(encoding_column),
+        json=sql.Identifier(json_column), table=sql.Identifier(table),
+    )
+    window_query = sql.SQL("SELECT {id}, {key} FROM {table} WHERE {id} > %s AND {id} <= %s").format(**identifiers)
+    query = sql.SQL(
+        "SELECT {id}, {key}, {encoding}, CASE WHEN {encoding} IS NULL THEN {json} END "
+        "FROM {table} WHERE {id} > %s OR {id} = ANY(%s) ORDER BY {id}"
+    ).format(**identifiers)
+    added = 0
+    watermark = index.watermark
+    low = 0 if overlap is None else max(0, watermark - overlap)
+    try:
+        # Named cursors: rows stream from the server instead of being fetched all at once
+        missing = []
+        if watermark > low:
+            with conn.cursor(name=f"face_index_window_{table}") as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(window_query, (low, watermark))
+                for row_id, key in cursor:
+                    if key not in index:
+                        missing.append(row_id)
+        with conn.cursor(name=f"face_index_sync_{table}") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(query, (watermark, missing))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                matrix, kept = decode_encodings([(row[2], row[3]) for row in rows], index.dim)
+                index.add_many([row[1] for row, ok in zip(rows, kept) if ok], matrix)
+                added += len(matrix)
+                watermark = max(watermark, rows[-1][0])
+    finally:
+        conn.rollback()
+    index.watermark = max(index.watermark, watermark)
+    return added
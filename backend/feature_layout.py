@@ -0,0 +1,216 @@
+"""
+Precompiled feature layout for the credit risk model
+Maps raw fields and one-hot categories onto fixed column offsets of the training matrix,
+so requests can be encoded straight into a float64 buffer without building a DataFrame.
+FrameEncoder does the same for whole application_train-schema DataFrames (batch scoring).
+"""
+
+import sys
+import threading
+from itertools import repeat
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Distinct unseen values remembered per field (all of them are still counted)
+MAX_TRACKED_UNSEEN = 100
+
+# Category lookup results that are not column offsets
+NOT_PROVIDED = -1
+UNSEEN = -2
+
+# Two-valued text columns of application_train.csv that training label encodes,
+# with their LabelEncoder classes in code order (used when the artifacts do not record them)
+DEFAULT_BINARY_ENCODINGS = {
+    'NAME_CONTRACT_TYPE': ['Cash loans', 'Revolving loans'],
+    'FLAG_OWN_CAR': ['N', 'Y'],
+    'FLAG_OWN_REALTY': ['N', 'Y'],
+}
+
+
+class FeatureLayout:
+    """
+    Column layout of the model input, built once from `train_columns`
+
+    - raw_fields: training column names filled directly from applicant values
+    - categorical_fields: one-hot prefixes (e.g. 'NAME_INCOME_TYPE'); every training column
+      named '<PREFIX>_<category>' becomes an entry in that field's (interned) category table
+    Fields that are not present in the training columns are skipped, exactly like the
+    `if col in full_df.columns` check they replace. Categories missing from a field's table
+    are counted per field (see unseen_stats) instead of being dropped silently.
+    """
+
+    def __init__(self, columns: Sequence[str], raw_fields: Sequence[str], categorical_fields: Sequence[str]):
+        self.columns = [sys.intern(col) for col in columns]
+        self.n_features = len(self.columns)
+        self.offsets = {col: i for i, col in enumerate(self.columns)}
+
+        self.raw_fields = tuple(raw_fields)
+        self.raw_offsets: Dict[str, Optional[int]] = {field: self.offsets.get(field) for field in self.raw_fields}
+        # Positions in the raw value tuple and the column each one lands in
+        present = [(pos, self.offsets[field]) for pos, field in enumerate(self.raw_fields) if field in self.offsets]
+        self._raw_sources = np.array([pos for pos, _ in present], dtype=np.intp)
+        self._raw_targets = np.array([offset for _, offset in present], dtype=np.intp)
+
+        self.categorical_fields = tuple(categorical_fields)
+        self.category_offsets: Dict[str, Dict[str, int]] = {}
+        for field in self.categorical_fields:
+            prefix = f'{field}_'
+            self.category_offsets[field] = {
+                sys.intern(col[len(prefix):]): i for i, col in enumerate(self.columns) if col.startswith(prefix)
+            }
+        self._category_lookups = [self.category_offsets[field].get for field in self.categorical_fields]
+        # Fields with no one-hot columns in this model (e.g. label encoded at training time) are ignored
+        self._active_fields = [i for i, field in enumerate(self.categorical_fields) if self.category_offsets[field]]
+
+        self._unseen_lock = threading.Lock()
+        self.unseen_counts = [0] * len(self.categorical_fields)
+        self.unseen_values: List[Dict[str, int]] = [{} for _ in self.categorical_fields]
+
+    def category_offset(self, field_index: int, category: Optional[str]) -> int:
+        """
+        Column offset of a category, NOT_PROVIDED for None/empty, or UNSEEN if training never saw it
+        """
+        if not category:
+            return NOT_PROVIDED
+        return self._category_lookups[field_index](category, UNSEEN)
+
+    def _record_unseen(self, field_index: int, category: str, count: int = 1):
+        with self._unseen_lock:
+            self.unseen_counts[field_index] += count
+            values = self.unseen_values[field_index]
+            if category in values or len(values) < MAX_TRACKED_UNSEEN:
+                values[category] = values.get(category, 0) + count
+
+    def unseen_stats(self) -> dict:
+        """
+        Per categorical field: how many encoded values had no training column, and the most frequent ones
+        """
+        with self._unseen_lock:
+            return {
+                self.categorical_fields[i]: {
+                    "unseen": self.unseen_counts[i],
+                    "known_categories": len(self.category_offsets[self.categorical_fields[i]]),
+                    "top_unseen": dict(sorted(self.unseen_values[i].items(), key=lambda item: -item[1])[:10]),
+                }
+                for i in self._active_fields
+            }
+
+    def new_matrix(self, n_rows: int) -> np.ndarray:
+        """
+        Allocate a zero-filled float64 buffer for `n_rows` encoded rows
+        """
+        return np.zeros((n_rows, self.n_features), dtype=np.float64)
+
+    def encode_row(self, raw_values: Sequence[float], categories: Sequence[Optional[str]], out: np.ndarray) -> np.ndarray:
+        """
+        Write one applicant into a zero-filled row buffer
+
+        raw_values follows `raw_fields` order, categories follows `categorical_fields` order
+        (None or empty means the category was not provided).
+        """
+        out[self._raw_targets] = np.asarray(raw_values, dtype=np.float64)[self._raw_sources]
+        for field_index in self._active_fields:
+            category = categories[field_index]
+            offset = self.category_offset(field_index, category)
+            if offset >= 0:
+                out[offset] = 1.0
+            elif offset == UNSEEN:
+                self._record_unseen(field_index, category)
+        return out
+
+    def encode_batch(self, raw_rows: List[Sequence[float]], category_rows: List[Sequence[Optional[str]]]) -> np.ndarray:
+        """
+        Encode many applicants into one (n_rows x n_features) matrix
+        Categories are resolved field by field with C-level dict lookups into an
+        (n_fields x n_rows) offset array, and all one-hot entries are set with one scatter.
+        """
+        n_rows = len(raw_rows)
+        matrix = self.new_matrix(n_rows)
+        if not raw_rows:
+            return matrix
+
+        raw = np.asarray(raw_rows, dtype=np.float64)
+        matrix[:, self._raw_targets] = raw[:, self._raw_sources]
+
+        fields = list(zip(*category_rows))
+        offsets = np.empty((len(self._active_fields), n_rows), dtype=np.intp)
+        for i, field_index in enumerate(self._active_fields):
+            values = fields[field_index]
+            offsets[i] = np.fromiter(map(self._category_lookups[field_index], values, repeat(UNSEEN)),
+                                     dtype=np.intp, count=n_rows)
+            # None and '' mean "not provided", not unseen
+            offsets[i][~np.fromiter(map(bool, values), dtype=bool, count=n_rows)] = NOT_PROVIDED
+        known = offsets >= 0
+        matrix[np.nonzero(known)[1], offsets[known]] = 1.0
+
+        for i, row in zip(*np.nonzero(offsets == UNSEEN)):
+            field_index = self._active_fields[i]
+            self._record_unseen(field_index, category_rows[row][field_index])
+        return matrix
+
+
+class FrameEncoder:
+    """
+    Encodes raw application_train-schema DataFrames onto a layout, one chunk at a time
+
+    Mirrors utils.encode_training_data column by column:
+    - columns in binary_encodings become their label code (unknown values are missing)
+    - other columns with '<COLUMN>_<value>' training columns are one-hot encoded (like pd.get_dummies)
+    - remaining training columns are copied by name as numbers
+    Training columns the frame does not provide are left as NaN for the imputer to fill.
+    """
+
+    def __init__(self, layout: FeatureLayout, binary_encodings: Optional[Dict[str, List[str]]] = None):
+        self.layout = layout
+        if binary_encodings is None:
+            binary_encodings = DEFAULT_BINARY_ENCODINGS
+        self.binary_codes = {
+            column: {value: float(code) for code, value in enumerate(classes)}
+            for column, classes in binary_encodings.items()
+        }
+        self._one_hot_tables: Dict[str, Dict[str, int]] = {}
+
+    def one_hot_table(self, column: str) -> Dict[str, int]:
+        """
+        {category: offset} of the one-hot training columns generated from `column`
+        """
+        table = self._one_hot_tables.get(column)
+        if table is None:
+            prefix = f'{column}_'
+            table = {col[len(prefix):]: i for i, col in enumerate(self.layout.columns) if col.startswith(prefix)}
+            self._one_hot_tables[column] = table
+        return table
+
+    def wants(self, column: str) -> bool:
+        """
+        Whether a raw input column contributes to the model input (lets readers skip the rest)
+        """
+        return column in self.binary_codes or column in self.layout.offsets or bool(self.one_hot_table(column))
+
+    def encode(self, frame: pd.DataFrame) -> np.ndarray:
+        """
+        Encode every row of `frame` into an (n_rows x n_features) float64 matrix
+        """
+        n_rows = len(frame)
+        matrix = np.full((n_rows, self.layout.n_features), np.nan, dtype=np.float64)
+        rows = np.arange(n_rows)
+        for column in frame.columns:
+            values = frame[column]
+            if column in self.binary_codes:
+                offset = self.layout.offsets.get(column)
+                if offset is not None:
+                    matrix[:, offset] = values.map(self.binary_codes[column]).to_numpy(dtype=np.float64)
+            elif column in self.layout.offsets:
+                matrix[:, self.layout.offsets[column]] = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+            else:
+                table = self.one_hot_table(column)
+                if not table:
+                    continue
+                offsets = np.fromiter(table.values(), dtype=np.intp, count=len(table))
+                matrix[:, offsets] = 0.0
+                codes = pd.Categorical(values, categories=list(table)).codes
+                hit = codes >= 0
+                matrix[rows[hit], offsets[codes[hit]]] = 1.0
+        return matrix
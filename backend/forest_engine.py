@@ -0,0 +1,250 @@
+"""
+Inference engines for the RandomForest credit risk model
+
+- SklearnEngine: the fitted estimator's own predict_proba
+- CompiledForest: every tree flattened into shared NumPy node arrays and evaluated with
+  vectorized traversal, avoiding sklearn's per-estimator Python dispatch and joblib threads
+"""
+
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Environment variable selecting the engine: "sklearn" (default) or "compiled"
+ENGINE_ENV_VAR = "INFERENCE_ENGINE"
+
+# Maximum absolute probability difference tolerated by the exactness check
+EXACTNESS_TOLERANCE = 1e-12
+
+# Rows traversed together; bounds the (rows x trees) index arrays for large batches
+CHUNK_ROWS = 4096
+
+
+class SklearnEngine:
+    """
+    Pass-through engine around the fitted sklearn forest
+    """
+
+    name = "sklearn"
+
+    def __init__(self, model):
+        self.model = model
+        self.classes_ = model.classes_
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(X)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.model.predict(X)
+
+
+class CompiledForest:
+    """
+    RandomForestClassifier flattened into contiguous node arrays
+
+    Node ids are global across trees; roots holds the id of each tree's root. Leaves point
+    to themselves so every row can take the same number of steps (max_depth). Leaf values
+    are stored already normalized per tree, as DecisionTreeClassifier.predict_proba does.
+    """
+
+    name = "compiled"
+
+    def __init__(self, feature, threshold, children_left, children_right, missing_left,
+                 values, roots, classes, max_depth, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.missing_left = missing_left
+        self.values = values
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.n_estimators = len(roots)
+        self._check_missing = bool(np.any(missing_left))
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """
+        Flatten a fitted single-output RandomForestClassifier
+        """
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.intp)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+            feature = np.where(is_leaf, 0, tree.feature)
+
+            nodes = tree.__getstate__()['nodes']
+            if 'missing_go_to_left' in nodes.dtype.names:
+                missing_left = nodes['missing_go_to_left'].astype(bool) & ~is_leaf
+            else:
+                missing_left = np.zeros(n_nodes, dtype=bool)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            missing.append(missing_left)
+            values.append(value / normalizer)
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            children_left=np.concatenate(lefts).astype(np.intp),
+            children_right=np.concatenate(rights).astype(np.intp),
+            missing_left=np.concatenate(missing),
+            values=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth,
+            n_features=model.n_features_in_,
+        )
+
+    def to_arrays(self) -> dict:
+        """
+        Node arrays by name, as stored in an artifact bundle
+        """
+        return {
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'children_left': self.children_left,
+            'children_right': self.children_right,
+            'missing_left': self.missing_left,
+            'values': self.values,
+            'roots': self.roots,
+            'classes': self.classes_,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, max_depth: int, n_features: int) -> "CompiledForest":
+        """
+        Rebuild from `to_arrays()` output without copying (arrays may be memory-mapped)
+        """
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            children_left=arrays['children_left'],
+            children_right=arrays['children_right'],
+            missing_left=arrays['missing_left'],
+            values=arrays['values'],
+            roots=arrays['roots'],
+            classes=arrays['classes'],
+            max_depth=max_depth,
+            n_features=n_features,
+        )
+
+    def _leaves(self, X32: np.ndarray) -> np.ndarray:
+        """
+        Leaf node ids reached by each (row, tree) pair, shape (n_trees, n_rows)
+        """
+        n_rows = X32.shape[0]
+        flat = X32.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * self.n_features)[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if self._check_missing:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        # sklearn trees compare float32 features against float64 thresholds
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        if X32.ndim != 2 or X32.shape[1] != self.n_features:
+            raise ValueError(f"Expected a matrix with {self.n_features} columns, got shape {X32.shape}")
+
+        proba = np.empty((X32.shape[0], self.values.shape[1]), dtype=np.float64)
+        for start in range(0, X32.shape[0], CHUNK_ROWS):
+            chunk = X32[start:start + CHUNK_ROWS]
+            leaf_values = self.values[self._leaves(chunk)]
+            # Summed tree by tree, in estimator order, like sklearn's accumulation
+            proba[start:start + CHUNK_ROWS] = np.add.reduce(leaf_values, axis=0) / self.n_estimators
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def check_exactness(self, model, X_holdout: np.ndarray) -> float:
+        """
+        Compare against the sklearn forest on a holdout matrix
+        Returns the maximum absolute probability difference, raising ValueError above
+        EXACTNESS_TOLERANCE or if any predicted label differs.
+        """
+        expected = model.predict_proba(X_holdout)
+        actual = self.predict_proba(X_holdout)
+        max_diff = float(np.max(np.abs(actual - expected))) if actual.size else 0.0
+        if not max_diff <= EXACTNESS_TOLERANCE:
+            raise ValueError(f"Compiled forest differs from sklearn by {max_diff:.3e}")
+        if not np.array_equal(self.predict(X_holdout), model.predict(X_holdout)):
+            raise ValueError("Compiled forest predicts different labels than sklearn")
+        return max_diff
+
+
+def synthetic_holdout(engine: CompiledForest, n_rows: int = 512, seed: int = 0) -> np.ndarray:
+    """
+    Holdout rows in the scaled [0, 1] feature space
+    Half of the rows have features pinned to split thresholds to exercise the <= boundary.
+    If the forest was fitted with missing values, some features are NaN to exercise where they go.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, engine.n_features))
+    if np.any(engine.missing_left):
+        X[rng.random(X.shape) < 0.1] = np.nan
+
+    # Splits that only separate missing values have an infinite threshold; they cannot be pinned
+    internal = np.flatnonzero((engine.children_left != np.arange(len(engine.children_left)))
+                              & np.isfinite(engine.threshold))
+    if internal.size:
+        pinned = rng.choice(internal, size=(n_rows // 2, 16))
+        rows = np.repeat(np.arange(n_rows // 2), 16)
+        X[rows, engine.feature[pinned].ravel()] = engine.threshold[pinned].ravel()
+    return X
+
+
+def load_inference_engine(model, engine_name: str = None):
+    """
+    Build the engine named by `engine_name` (default: $INFERENCE_ENGINE or "sklearn")
+    The compiled engine is only returned after passing the exactness check; otherwise the
+    sklearn engine is used and the failure is logged.
+    """
+    engine_name = (engine_name or os.getenv(ENGINE_ENV_VAR, "sklearn")).lower()
+    if engine_name == "sklearn":
+        return SklearnEngine(model)
+    if engine_name != "compiled":
+        logger.warning(f"Unknown {ENGINE_ENV_VAR}={engine_name!r}, using sklearn")
+        return SklearnEngine(model)
+
+    try:
+        engine = CompiledForest.from_sklearn(model)
+        max_diff = engine.check_exactness(model, synthetic_holdout(engine))
+        logger.info(f"Compiled forest: {engine.n_estimators} trees, {len(engine.feature)} nodes, "
+                    f"max depth {engine.max_depth} (max deviation {max_diff:.1e})")
+        return engine
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Compiled forest unavailable, using sklearn: {e}")
+        return SklearnEngine(model)
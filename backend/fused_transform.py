@@ -0,0 +1,112 @@
+"""
+Fused impute + scale kernel compiled from the fitted SimpleImputer and MinMaxScaler
+Replaces two sklearn transform calls (each with its own validation pass and copy) by
+NaN replacement plus a per-column affine transform over the same buffer.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Maximum absolute difference tolerated against sklearn when validating at load time
+VALIDATION_TOLERANCE = 1e-12
+
+
+class FusedTransform:
+    """
+    Precomputed preprocessing kernel: X[isnan(X)] = fill; X = X * scale + offset
+
+    Mirrors SimpleImputer(missing_values=np.nan).transform followed by MinMaxScaler.transform,
+    including the scaler's optional clipping.
+    """
+
+    def __init__(self, fill_values: np.ndarray, scale: np.ndarray, offset: np.ndarray,
+                 clip_range: Optional[Tuple[float, float]] = None):
+        self.fill_values = np.asarray(fill_values, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.clip_range = clip_range
+        self.n_features = self.fill_values.shape[0]
+
+        if not (self.scale.shape == self.offset.shape == self.fill_values.shape):
+            raise ValueError("Imputer and scaler parameters have mismatched shapes")
+
+    @classmethod
+    def from_fitted(cls, imputer, scaler) -> "FusedTransform":
+        """
+        Fold a fitted SimpleImputer and MinMaxScaler into one kernel
+        Raises ValueError for configurations the kernel cannot reproduce exactly.
+        """
+        if not hasattr(imputer, 'statistics_') or not hasattr(scaler, 'scale_'):
+            raise ValueError("Imputer and scaler must be fitted")
+
+        missing_values = getattr(imputer, 'missing_values', np.nan)
+        if not (isinstance(missing_values, float) and np.isnan(missing_values)):
+            raise ValueError(f"Unsupported imputer missing_values: {missing_values!r}")
+        if getattr(imputer, 'add_indicator', False):
+            raise ValueError("Imputers with add_indicator=True are not supported")
+
+        statistics = np.asarray(imputer.statistics_, dtype=np.float64)
+        if np.isnan(statistics).any() and not getattr(imputer, 'keep_empty_features', False):
+            # sklearn drops all-missing columns in this case, which changes the output width
+            raise ValueError("Imputer has empty features that sklearn would drop")
+        # keep_empty_features imputes empty columns with 0 (median/mean strategies)
+        statistics = np.nan_to_num(statistics, nan=0.0)
+
+        clip_range = tuple(scaler.feature_range) if getattr(scaler, 'clip', False) else None
+        return cls(statistics, scaler.scale_, scaler.min_, clip_range)
+
+    @classmethod
+    def from_statistics(cls, medians: np.ndarray, data_min: np.ndarray, data_max: np.ndarray,
+                        feature_range: Tuple[float, float] = (0.0, 1.0)) -> "FusedTransform":
+        """
+        Kernel for a median imputer and MinMaxScaler given their fitted statistics directly
+        Columns that were entirely missing (NaN statistics) are imputed with 0 and left unscaled,
+        like SimpleImputer(keep_empty_features=True).
+        """
+        fill_values = np.nan_to_num(np.asarray(medians, dtype=np.float64), nan=0.0)
+        data_min = np.nan_to_num(np.asarray(data_min, dtype=np.float64), nan=0.0)
+        data_range = np.nan_to_num(np.asarray(data_max, dtype=np.float64), nan=0.0) - data_min
+        # MinMaxScaler treats constant columns as having unit range
+        data_range[data_range == 0.0] = 1.0
+        scale = (feature_range[1] - feature_range[0]) / data_range
+        return cls(fill_values, scale, feature_range[0] - data_min * scale)
+
+    def transform(self, X: np.ndarray, inplace: bool = False) -> np.ndarray:
+        """
+        Impute and scale a 2-D float64 matrix in a single pass over its columns
+        With inplace=True the caller's buffer is overwritten and returned.
+        """
+        if not inplace or X.dtype != np.float64:
+            X = np.array(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected a matrix with {self.n_features} columns, got shape {X.shape}")
+
+        np.copyto(X, self.fill_values, where=np.isnan(X))
+        X *= self.scale
+        X += self.offset
+        if self.clip_range is not None:
+            np.clip(X, self.clip_range[0], self.clip_range[1], out=X)
+        return X
+
+    def validate(self, imputer, scaler, n_rows: int = 256, seed: int = 0) -> float:
+        """
+        Compare the kernel with sklearn on a synthetic probe batch
+        Rows are drawn from the scaler's fitted data range with ~20% missing values.
+        Returns the maximum absolute difference, raising ValueError above VALIDATION_TOLERANCE.
+        """
+        rng = np.random.default_rng(seed)
+        low = np.nan_to_num(np.asarray(scaler.data_min_, dtype=np.float64))
+        high = np.nan_to_num(np.asarray(scaler.data_max_, dtype=np.float64))
+        probe = rng.uniform(low, high, size=(n_rows, self.n_features))
+        probe[rng.random(probe.shape) < 0.2] = np.nan
+
+        expected = scaler.transform(imputer.transform(probe))
+        actual = self.transform(probe)
+        if actual.shape != expected.shape:
+            raise ValueError(f"Fused transform output {actual.shape} does not match sklearn {expected.shape}")
+
+        max_diff = float(np.max(np.abs(actual - expected))) if actual.size else 0.0
+        if not max_diff <= VALIDATION_TOLERANCE:
+            raise ValueError(f"Fused transform differs from sklearn by {max_diff:.3e}")
+        return max_diff
@@ -0,0 +1,127 @@
+"""
+Executor layer that keeps CPU-bound scoring off the asyncio event loop
+
+- inline: run on the event loop thread (previous behaviour)
+- thread: thread pool; sklearn/NumPy release the GIL in their inner loops
+- process: process pool; each worker imports the app module and so holds its own loaded model
+
+Work is admitted up to `max_pending` calls (running + queued); beyond that callers get
+ExecutorSaturated immediately instead of piling up behind the pool. A pool broken by a worker
+that died (killed, out of memory) is discarded and replaced on the next call.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+class ExecutorSaturated(Exception):
+    """
+    Raised when the executor already has `max_pending` calls in flight
+    """
+
+
+class InferenceExecutor:
+    """
+    Bounded dispatcher for scoring calls
+
+    Functions and arguments sent to a process pool must be picklable, i.e. module-level
+    functions of an importable module. `initializer` runs once in each pool worker.
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: Optional[int] = None, max_pending: int = 64,
+                 initializer: Optional[Callable[[], Any]] = None):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}, expected one of {EXECUTOR_MODES}")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.initializer = initializer
+
+        self._pool = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.broken_pools = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference",
+                                                initializer=self.initializer)
+            elif self.mode == "process":
+                # spawn: workers start from a clean interpreter rather than forking the server's threads
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=self.initializer)
+        return self._pool
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Run fn(*args) according to the executor mode
+        Raises ExecutorSaturated without queueing when max_pending calls are already in flight.
+        """
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorSaturated(f"{self.in_flight} scoring calls already in flight")
+
+        self.in_flight += 1
+        pool = None
+        try:
+            if self.mode == "inline":
+                result = fn(*args)
+            else:
+                pool = self._get_pool()
+                result = await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenExecutor:
+            self.failed += 1
+            self._discard(pool)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        return result
+
+    def _discard(self, pool):
+        """
+        Drop a broken pool (once, however many of its calls failed); the next call starts a new one
+        """
+        if pool is None or pool is not self._pool:
+            return
+        self._pool = None
+        self.broken_pools += 1
+        logger.warning(f"Discarding broken {self.mode} pool; a new one starts with the next call")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the pool; a new one is created on the next call
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers if self.mode != "inline" else 0,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "broken_pools": self.broken_pools,
+        }
@@ -0,0 +1,320 @@
+"""
+Prometheus metrics for the credit risk API
+Counters, gauges and histograms rendered in the Prometheus text exposition format (0.0.4),
+without a client library dependency.
+
+- RequestMetricsMiddleware counts requests and times them per route
+- timed_handler splits a handler's request into parse (before the handler runs) and
+  serialize (after it returns, until the response starts)
+- record_stage / collect_stages time the scoring stages wherever scoring runs (event loop,
+  thread or process worker); the caller observes the returned timings in this process
+"""
+
+import bisect
+import contextvars
+import functools
+import math
+import threading
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class MetricsRegistry:
+    """
+    Ordered set of metrics rendered together by /metrics
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric"):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Metric:
+    """
+    A metric family: one child per combination of label values
+
+    Metrics without labels can be used directly; labelled ones through labels(**values).
+    `function` makes an unlabelled metric report the callable's value at render time instead.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None, registry: MetricsRegistry = REGISTRY):
+        if function is not None and labelnames:
+            raise ValueError("Callback metrics cannot have labels")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **values):
+        key = tuple(str(values[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {_format_value(self.function())}"]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+                for key, child in list(self._children.items())]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count
+    """
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down
+    """
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._children[()].dec(amount)
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * len(upper_bounds)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed buckets (upper bounds, +Inf is added)
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: MetricsRegistry = REGISTRY):
+        self.upper_bounds = tuple(sorted(float(b) for b in buckets if not math.isinf(b))) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry=registry)
+
+    def _new_child(self):
+        return _HistogramValue(self.upper_bounds)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for upper_bound, count in zip(self.upper_bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(upper_bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# Time per processing stage: parse, preprocess, transform, inference, serialize
+STAGE_SECONDS = Histogram("credit_risk_stage_seconds", "Time spent in each request processing stage", ("stage",))
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route, method and status",
+                        ("route", "method", "status"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds",
+                                 "Time from request start until the response is complete", ("route",))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being processed")
+
+
+class RequestTimer:
+    __slots__ = ("start", "handler_finished")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.handler_finished = None
+
+
+_current_request = contextvars.ContextVar("current_request", default=None)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording request counts, durations and in-flight requests
+
+    Routes are labelled by their path template, so label cardinality is bounded by the app's
+    routes; unmatched requests are labelled "other".
+    """
+
+    def __init__(self, app, exclude_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer(time.perf_counter())
+        token = _current_request.set(timer)
+        status = 500
+
+        async def send_with_metrics(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if timer.handler_finished is not None:
+                    STAGE_SECONDS.labels(stage="serialize").observe(time.perf_counter() - timer.handler_finished)
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            _current_request.reset(token)
+            route = getattr(scope.get("route"), "path", "other")
+            HTTP_REQUESTS.labels(route=route, method=scope["method"], status=status).inc()
+            HTTP_REQUEST_SECONDS.labels(route=route).observe(time.perf_counter() - timer.start)
+
+
+def timed_handler(handler):
+    """
+    Endpoint decorator recording the parse stage (request start to handler entry: body read,
+    JSON decoding and validation) and marking the handler's return for the serialize stage
+    """
+    @functools.wraps(handler)
+    async def wrapper(*args, **kwargs):
+        timer = _current_request.get()
+        if timer is not None:
+            STAGE_SECONDS.labels(stage="parse").observe(time.perf_counter() - timer.start)
+        try:
+            return await handler(*args, **kwargs)
+        finally:
+            if timer is not None:
+                timer.handler_finished = time.perf_counter()
+    return wrapper
+
+
+_stage_timings = threading.local()
+
+
+def record_stage(stage: str, start: float) -> float:
+    """
+    Record the time since `start` (a time.perf_counter() value) as one stage of the enclosing
+    collect_stages() call; returns the current time so consecutive stages can be chained
+    """
+    now = time.perf_counter()
+    stages = getattr(_stage_timings, "stages", None)
+    if stages is not None:
+        stages.append((stage, now - start))
+    return now
+
+
+def collect_stages(fn: Callable, *args):
+    """
+    Run fn(*args) and return (result, [(stage, seconds), ...]) for the stages it recorded
+    Module-level so it can be sent to process pool workers.
+    """
+    _stage_timings.stages = stages = []
+    try:
+        return fn(*args), stages
+    finally:
+        _stage_timings.stages = None
+
+
+def observe_stages(stages: List[Tuple[str, float]]):
+    for stage, seconds in stages:
+        STAGE_SECONDS.labels(stage=stage).observe(seconds)
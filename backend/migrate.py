@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+Versioned schema migrations for the SlothX databases.
+
+Each database has a directory under migrations/ holding numbered SQL files
+(0001_initial.sql, 0002_lookup_indexes.sql, ...). Applied versions are recorded in a
+schema_migrations table, so running this again only applies what is new:
+
+  python migrate.py                          # migrate central_identity_db and verify_db
+  python migrate.py --database verify_db     # one database
+  python migrate.py --status                 # list applied and pending migrations
+
+Every migration runs in its own transaction and is recorded in the same one. A migration
+edited after it was applied is reported instead of being re-run.
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass
+
+import psycopg2
+from dotenv import load_dotenv
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+DATABASES = ("central_identity_db", "verify_db")
+
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Serialises concurrent migrators on the same database
+MIGRATION_LOCK_ID = 0x5107_4D16
+
+
+class MigrationError(Exception):
+    """
+    Migration files are inconsistent with each other or with what the database recorded
+    """
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+    def __str__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(directory: str) -> list:
+    """
+    Migrations in a directory, ordered by version
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version} in {directory}")
+        with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+            migrations[version] = Migration(version, match.group(2), f.read())
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def ensure_migrations_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                duration_ms DOUBLE PRECISION
+            )
+        """)
+    conn.commit()
+
+
+def applied_migrations(conn) -> dict:
+    """
+    {version: checksum} of the migrations recorded in the database
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT version, checksum FROM schema_migrations ORDER BY version")
+        return dict(cursor.fetchall())
+
+
+def pending_migrations(conn, migrations: list) -> list:
+    """
+    Migrations not applied yet; fails if an applied one was changed or removed since
+    """
+    applied = applied_migrations(conn)
+    known = {migration.version: migration for migration in migrations}
+    for version, checksum in applied.items():
+        if version not in known:
+            raise MigrationError(f"Database has migration {version}, which no longer exists")
+        if known[version].checksum != checksum:
+            raise MigrationError(f"Migration {known[version]} was modified after it was applied")
+    return [migration for migration in migrations if migration.version not in applied]
+
+
+def migrate(conn, directory: str, target: int = None, log=print) -> list:
+    """
+    Apply pending migrations from `directory` up to `target` (default: all), oldest first
+    Returns the migrations applied.
+    """
+    migrations = [m for m in load_migrations(directory) if target is None or m.version <= target]
+    ensure_migrations_table(conn)
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    conn.commit()
+    try:
+        applied = []
+        for migration in pending_migrations(conn, migrations):
+            start = time.perf_counter()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(migration.sql)
+                    duration_ms = (time.perf_counter() - start) * 1000
+                    cursor.execute("""
+                        INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+                        VALUES (%s, %s, %s, %s)
+                    """, (migration.version, migration.name, migration.checksum, duration_ms))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            log(f"✓ Applied migration {migration} ({duration_ms:.0f} ms)")
+            applied.append(migration)
+        return applied
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
+
+
+def connect(dbname: str):
+    return psycopg2.connect(
+        dbname=dbname,
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD", "postgres"),
+        host=os.getenv("DB_HOST", "localhost"),
+    )
+
+
+def print_status(conn, directory: str):
+    ensure_migrations_table(conn)
+    applied = applied_migrations(conn)
+    for migration in load_migrations(directory):
+        state = "applied" if migration.version in applied else "pending"
+        print(f"  {state:<8} {migration}")
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the SlothX databases")
+    parser.add_argument("--database", choices=DATABASES, action="append",
+                        help="Database to migrate (repeatable; default: all)")
+    parser.add_argument("--target", type=int, help="Stop after this migration version")
+    parser.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    args = parser.parse_args(argv)
+
+    for dbname in args.database or DATABASES:
+        print(f"{dbname}:")
+        try:
+            conn = connect(dbname)
+        except psycopg2.Error as e:
+            print(f"✗ Error connecting to {dbname}: {e}")
+            return 1
+        try:
+            directory = os.path.join(MIGRATIONS_DIR, dbname)
+            if args.status:
+                print_status(conn, directory)
+            elif not migrate(conn, directory, args.target):
+                print("✓ Schema is up to date")
+        except (MigrationError, psycopg2.Error) as e:
+            print(f"✗ Migration failed on {dbname}: {e}")
+            return 1
+        finally:
+            conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+-- Tables as originally created by setup_db.py; a no-op on databases set up before migrations existed
+
+CREATE TABLE IF NOT EXISTS citizen_registry (
+    citizen_id SERIAL PRIMARY KEY,
+    full_name TEXT,
+    pan_number TEXT UNIQUE,
+    aadhaar_number_hash TEXT,
+    dob DATE,
+    face_encoding_json TEXT
+);
+
+CREATE TABLE IF NOT EXISTS verification_logs (
+    id SERIAL PRIMARY KEY,
+    claimed_pan TEXT,
+    name_match_score INTEGER,
+    biometric_status TEXT,
+    final_status TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
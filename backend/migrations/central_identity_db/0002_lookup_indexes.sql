@@ -0,0 +1,25 @@
+-- Identity lookups filter on (pan_number, aadhaar_number_hash). The Aadhaar hash leads so the
+-- index also serves lookups by Aadhaar alone; PAN-only lookups keep the unique index.
+CREATE INDEX IF NOT EXISTS citizen_registry_aadhaar_pan_idx
+    ON citizen_registry (aadhaar_number_hash, pan_number);
+
+-- Log times become timezone-aware; existing values are read in the session time zone,
+-- which is how CURRENT_TIMESTAMP wrote them
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'verification_logs'
+          AND column_name = 'created_at') = 'timestamp without time zone' THEN
+        ALTER TABLE verification_logs ALTER COLUMN created_at TYPE TIMESTAMPTZ;
+    END IF;
+END
+$$;
+
+-- Verification history of one PAN, newest first
+CREATE INDEX IF NOT EXISTS verification_logs_pan_created_idx
+    ON verification_logs (claimed_pan, created_at);
+
+-- Time-range scans over the append-only log: rows arrive in created_at order, so a BRIN
+-- index of a few pages narrows a range to the matching blocks
+CREATE INDEX IF NOT EXISTS verification_logs_created_brin
+    ON verification_logs USING brin (created_at);
@@ -0,0 +1,18 @@
+-- Face encodings move from JSON text to the binary format of face_codec.py: a 4-byte header
+-- (magic "FE", version 1, reserved) and 128 little-endian float32 values, 516 bytes in all.
+-- face_encoding_json stays for rows written by instances that predate the binary column.
+ALTER TABLE citizen_registry ADD COLUMN IF NOT EXISTS face_encoding BYTEA;
+
+-- Backfill: float4send gives each value big-endian, so its bytes are reversed. Rows whose JSON
+-- is not a 128-value array are left for the services to skip, as before.
+UPDATE citizen_registry AS c
+SET face_encoding = '\x46450100'::bytea || (
+    SELECT string_agg(substr(b, 4, 1) || substr(b, 3, 1) || substr(b, 2, 1) || substr(b, 1, 1), ''::bytea
+                      ORDER BY e.i)
+    FROM jsonb_array_elements_text(c.face_encoding_json::jsonb) WITH ORDINALITY AS e(v, i),
+         float4send(e.v::float4) AS b
+)
+WHERE c.face_encoding IS NULL
+  -- CASE, unlike AND, only casts the text once it looks like an array
+  AND CASE WHEN c.face_encoding_json LIKE '[%]'
+           THEN jsonb_array_length(c.face_encoding_json::jsonb) = 128 END;
@@ -0,0 +1,25 @@
+-- Tables as originally created by setup_db.py; a no-op on databases set up before migrations existed
+
+CREATE TABLE IF NOT EXISTS blockchain_blocks (
+    block_index INTEGER PRIMARY KEY,
+    previous_hash TEXT,
+    data TEXT,
+    timestamp TEXT,
+    nonce INTEGER,
+    block_hash TEXT UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS citizen_index (
+    id SERIAL PRIMARY KEY,
+    full_name TEXT,
+    aadhaar_number_hash TEXT,
+    pan_number TEXT UNIQUE,
+    dob DATE,
+    gender TEXT,
+    phone_number TEXT,
+    face_encoding_json TEXT,
+    aadhaar_card_path TEXT,
+    pan_card_path TEXT,
+    latest_block_hash TEXT,
+    is_verified BOOLEAN
+);
@@ -0,0 +1,22 @@
+-- Block payloads become JSONB. Blocks written before this were JSON-encoded twice (a JSON
+-- string holding the payload's JSON); they are unwrapped to the payload the block hash covers.
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'blockchain_blocks'
+          AND column_name = 'data') = 'text' THEN
+        ALTER TABLE blockchain_blocks ALTER COLUMN data TYPE JSONB USING (
+            CASE WHEN jsonb_typeof(data::jsonb) = 'string' THEN (data::jsonb #>> '{}')::jsonb
+                 ELSE data::jsonb END
+        );
+    END IF;
+END
+$$;
+
+-- `timestamp` stays TEXT: its exact string is part of the block hash. mined_at is the same
+-- instant as a TIMESTAMPTZ for range queries.
+ALTER TABLE blockchain_blocks ADD COLUMN IF NOT EXISTS mined_at TIMESTAMPTZ
+    GENERATED ALWAYS AS (to_timestamp(timestamp::double precision)) STORED;
+
+CREATE INDEX IF NOT EXISTS blockchain_blocks_mined_at_brin
+    ON blockchain_blocks USING brin (mined_at);
@@ -0,0 +1,188 @@
+"""
+Streaming reference statistics for the credit risk preprocessing
+Derives the training column layout, per-column medians (imputer) and min/max (scaler) from
+application_train.csv in fixed-size chunks, so memory is bounded by the chunk size and the
+per-column histograms rather than by the size of the file.
+
+- Pass 1 reads the schema: which text columns are label encoded and which are one-hot encoded
+  (same rules as utils.encode_training_data), their categories, and each numeric column's range.
+- Pass 2 encodes every chunk onto the training columns and adds it to one histogram per column.
+  Medians are read from the histograms: exact for integer-valued columns with a range of at most
+  EXACT_INTEGER_RANGE, otherwise interpolated within a bin of width range / HISTOGRAM_BINS.
+  Min/max are exact.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from feature_layout import FeatureLayout, FrameEncoder
+from fused_transform import FusedTransform
+from utils import DROPPED_TRAINING_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 50000
+HISTOGRAM_BINS = 4096
+EXACT_INTEGER_RANGE = 65536
+
+# Text columns with more distinct values than this are rejected rather than one-hot encoded
+MAX_CATEGORIES = 10000
+
+
+class ReferenceStats:
+    """
+    Fitted preprocessing statistics for the training columns, in column order
+    """
+
+    def __init__(self, columns: List[str], binary_encodings: Dict[str, List[str]], n_rows: int,
+                 count: np.ndarray, median: np.ndarray, data_min: np.ndarray, data_max: np.ndarray,
+                 exact_median: np.ndarray):
+        self.columns = columns
+        self.binary_encodings = binary_encodings
+        self.n_rows = n_rows
+        self.count = count
+        self.median = median
+        self.data_min = data_min
+        self.data_max = data_max
+        self.exact_median = exact_median
+
+    def to_transform(self) -> FusedTransform:
+        """
+        Equivalent of SimpleImputer(strategy='median') + MinMaxScaler() fitted on these statistics
+        """
+        return FusedTransform.from_statistics(self.median, self.data_min, self.data_max)
+
+    def summary(self) -> dict:
+        return {
+            'rows': self.n_rows,
+            'columns': len(self.columns),
+            'empty_columns': int((self.count == 0).sum()),
+            'exact_medians': int(self.exact_median.sum()),
+            'histogram_bins': HISTOGRAM_BINS,
+        }
+
+
+def _scan_schema(csv_path: str, chunk_size: int):
+    """
+    Pass 1: column order, text column categories/missingness, numeric ranges and integrality
+    """
+    order: List[str] = []
+    text_values: Dict[str, set] = {}
+    text_missing: Dict[str, bool] = {}
+    numeric_min: Dict[str, float] = {}
+    numeric_max: Dict[str, float] = {}
+    integral: Dict[str, bool] = {}
+    n_rows = 0
+
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        if not order:
+            order = list(chunk.columns)
+        n_rows += len(chunk)
+        for column in chunk.columns:
+            values = chunk[column]
+            if values.dtype == object:
+                text_values.setdefault(column, set()).update(values.dropna().unique())
+                text_missing[column] = text_missing.get(column, False) or bool(values.isna().any())
+                if len(text_values[column]) > MAX_CATEGORIES:
+                    raise ValueError(f"Column {column} has more than {MAX_CATEGORIES} distinct text values")
+                continue
+            numeric = values.to_numpy(dtype=np.float64)
+            numeric = numeric[~np.isnan(numeric)]
+            if not numeric.size:
+                continue
+            numeric_min[column] = min(numeric_min.get(column, np.inf), float(numeric.min()))
+            numeric_max[column] = max(numeric_max.get(column, -np.inf), float(numeric.max()))
+            integral[column] = integral.get(column, True) and bool(np.all(numeric == np.floor(numeric)))
+
+    # A column that is text anywhere in the file is text (pd.read_csv on the whole file agrees)
+    for column in text_values:
+        numeric_min.pop(column, None)
+        numeric_max.pop(column, None)
+        integral.pop(column, None)
+    return order, text_values, text_missing, numeric_min, numeric_max, integral, n_rows
+
+
+def _training_columns(order, text_values, text_missing):
+    """
+    Column list and label encodings produced by utils.encode_training_data + pd.get_dummies
+    Text columns with at most two values and no missing entries are label encoded in place;
+    the others become '<COLUMN>_<value>' dummies, appended after all other columns.
+    """
+    binary_encodings = {}
+    columns, dummies = [], []
+    for column in order:
+        if column not in text_values:
+            columns.append(column)
+        elif len(text_values[column]) <= 2 and not text_missing[column]:
+            binary_encodings[column] = sorted(str(value) for value in text_values[column])
+            columns.append(column)
+        else:
+            dummies.extend(f"{column}_{value}" for value in sorted(text_values[column]))
+    columns = [column for column in columns + dummies if column not in DROPPED_TRAINING_COLUMNS]
+    return columns, binary_encodings
+
+
+def _median_from_histogram(counts: np.ndarray, low: float, width: float, exact: bool) -> float:
+    """
+    np.median-style median (mean of the two middle order statistics) from one column's histogram
+    """
+    n = int(counts.sum())
+    cumulative = np.cumsum(counts)
+
+    def order_statistic(rank: int) -> float:
+        b = int(np.searchsorted(cumulative, rank, side='right'))
+        if exact:
+            return low + b
+        below = cumulative[b - 1] if b > 0 else 0
+        # Assume values are spread evenly within the bin
+        return low + width * (b + (rank - below + 0.5) / counts[b])
+
+    return (order_statistic((n - 1) // 2) + order_statistic(n // 2)) / 2.0
+
+
+def build_reference_stats(csv_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> ReferenceStats:
+    """
+    Stream application_train.csv twice and return the fitted reference statistics
+    """
+    order, text_values, text_missing, numeric_min, numeric_max, integral, n_rows = _scan_schema(csv_path, chunk_size)
+    columns, binary_encodings = _training_columns(order, text_values, text_missing)
+    n_columns = len(columns)
+
+    # Histogram per column: label codes and dummies are whole numbers in [0, 1]; raw numeric columns
+    # use their pass-1 range, with one bin per integer when they are whole-valued and narrow enough
+    low = np.array([numeric_min.get(column, 0.0) for column in columns])
+    high = np.array([numeric_max.get(column, 1.0) for column in columns])
+    exact = np.array([integral.get(column, column not in numeric_min) for column in columns])
+    exact &= (high - low) < EXACT_INTEGER_RANGE
+    n_bins = np.where(exact, (high - low).astype(np.int64) + 1, HISTOGRAM_BINS)
+    width = np.where(exact, 1.0, (high - low) / HISTOGRAM_BINS)
+    width[width == 0] = 1.0
+    bin_offsets = np.concatenate([[0], np.cumsum(n_bins)[:-1]])
+    histogram = np.zeros(int(n_bins.sum()), dtype=np.int64)
+
+    count = np.zeros(n_columns, dtype=np.int64)
+    data_min = np.full(n_columns, np.inf)
+    data_max = np.full(n_columns, -np.inf)
+
+    # Pass 2: encode each chunk onto the training columns and add it to all histograms with one bincount
+    encoder = FrameEncoder(FeatureLayout(columns, [], []), binary_encodings)
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, usecols=encoder.wants):
+        matrix = encoder.encode(chunk)
+        present = ~np.isnan(matrix)
+        count += present.sum(axis=0)
+        data_min = np.minimum(data_min, np.where(present, matrix, np.inf).min(axis=0))
+        data_max = np.maximum(data_max, np.where(present, matrix, -np.inf).max(axis=0))
+        with np.errstate(invalid='ignore'):
+            bins = np.floor((matrix - low) / width)
+        np.clip(bins, 0, n_bins - 1, out=bins)
+        histogram += np.bincount((bins + bin_offsets)[present].astype(np.int64), minlength=histogram.size)
+
+    median = np.full(n_columns, np.nan)
+    for i in np.flatnonzero(count):
+        counts = histogram[bin_offsets[i]:bin_offsets[i] + n_bins[i]]
+        median[i] = np.clip(_median_from_histogram(counts, low[i], width[i], exact[i]), data_min[i], data_max[i])
+    empty = count == 0
+    data_min[empty] = np.nan
+    data_max[empty] = np.nan
+
+    return ReferenceStats(columns, binary_encodings, n_rows, count, median, data_min, data_max, exact & ~empty)
@@ -0,0 +1,85 @@
+"""
+Scoring policy for the credit risk API
+Turns default probabilities into a class label and a Low/Medium/High risk level.
+The thresholds live in a JSON file so they can be tuned and reloaded without a redeploy.
+"""
+
+import json
+import os
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field, model_validator
+
+# Path of the policy file; defaults below are used when it does not exist
+POLICY_PATH_ENV_VAR = "SCORING_POLICY_PATH"
+DEFAULT_POLICY_PATH = "scoring_policy.json"
+
+
+class RiskBand(BaseModel):
+    """
+    A risk level covering probabilities below `upper_bound` (None = no upper bound)
+    """
+    level: str
+    upper_bound: Optional[float] = Field(None, ge=0, le=1)
+    message: str
+
+
+DEFAULT_RISK_BANDS = [
+    RiskBand(level="Low", upper_bound=0.3,
+             message="Applicant shows low credit risk. Loan approval recommended."),
+    RiskBand(level="Medium", upper_bound=0.6,
+             message="Applicant shows moderate credit risk. Additional verification recommended."),
+    RiskBand(level="High", upper_bound=None,
+             message="Applicant shows high credit risk. Loan approval not recommended."),
+]
+
+
+class ScoringPolicy(BaseModel):
+    """
+    Decision threshold and risk bands applied to the probability of default
+
+    An applicant is labelled high risk (1) when the probability exceeds `decision_threshold`;
+    0.5 reproduces the forest's own argmax prediction.
+    """
+    version: str = "default"
+    decision_threshold: float = Field(0.5, ge=0, le=1)
+    risk_bands: List[RiskBand] = Field(default_factory=lambda: list(DEFAULT_RISK_BANDS))
+
+    @model_validator(mode='after')
+    def check_bands(self):
+        bounds = [band.upper_bound for band in self.risk_bands]
+        if not bounds or bounds[-1] is not None:
+            raise ValueError("The last risk band must have no upper bound")
+        finite = bounds[:-1]
+        if any(bound is None for bound in finite) or finite != sorted(finite):
+            raise ValueError("Risk band upper bounds must be ascending")
+        return self
+
+    @property
+    def cutoffs(self) -> np.ndarray:
+        return np.array([band.upper_bound for band in self.risk_bands[:-1]], dtype=np.float64)
+
+    def labels(self, probabilities: np.ndarray) -> np.ndarray:
+        """
+        1 (high risk) where the probability exceeds the decision threshold, else 0
+        """
+        return (np.asarray(probabilities) > self.decision_threshold).astype(int)
+
+    def band_indices(self, probabilities: np.ndarray) -> np.ndarray:
+        """
+        Index into `risk_bands` for every probability (bands are [previous, upper_bound))
+        """
+        return np.searchsorted(self.cutoffs, probabilities, side='right')
+
+
+def load_scoring_policy(path: str = None) -> ScoringPolicy:
+    """
+    Load the policy from `path` (default: $SCORING_POLICY_PATH or scoring_policy.json)
+    Falls back to the built-in 0.5 / 0.3 / 0.6 policy when the file does not exist.
+    """
+    path = path or os.getenv(POLICY_PATH_ENV_VAR, DEFAULT_POLICY_PATH)
+    if not os.path.exists(path):
+        return ScoringPolicy()
+    with open(path, 'r') as f:
+        return ScoringPolicy.model_validate(json.load(f))
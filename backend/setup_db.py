@@ -7,6 +7,7 @@ import psycopg2
 from psycopg2 import sql
 import os
 from dotenv import load_dotenv
+from migrate import DATABASES, MIGRATIONS_DIR, migrate
 
 # Load environment variables
 load_dotenv()
@@ -49,97 +50,23 @@ def setup_databases():
         print(f"✗ Error connecting to postgres DB: {e}")
         return False
     
-    # Create tables in central_identity_db
-    try:
-        conn = psycopg2.connect(
-            dbname="central_identity_db",
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-        )
-        cursor = conn.cursor()
-        
-        # citizen_registry table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS citizen_registry (
-                citizen_id SERIAL PRIMARY KEY,
-                full_name TEXT,
-                pan_number TEXT UNIQUE,
-                aadhaar_number_hash TEXT,
-                dob DATE,
-                face_encoding_json TEXT
-            )
-        """)
-        print("✓ Created table: citizen_registry")
-        
-        # verification_logs table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS verification_logs (
-                id SERIAL PRIMARY KEY,
-                claimed_pan TEXT,
-                name_match_score INTEGER,
-                biometric_status TEXT,
-                final_status TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        print("✓ Created table: verification_logs")
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        print(f"✗ Error setting up central_identity_db: {e}")
-        return False
-    
-    # Create tables in verify_db
-    try:
-        conn = psycopg2.connect(
-            dbname="verify_db",
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-        )
-        cursor = conn.cursor()
-        
-        # blockchain_blocks table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS blockchain_blocks (
-                block_index INTEGER PRIMARY KEY,
-                previous_hash TEXT,
-                data TEXT,
-                timestamp TEXT,
-                nonce INTEGER,
-                block_hash TEXT UNIQUE
-            )
-        """)
-        print("✓ Created table: blockchain_blocks")
-        
-        # citizen_index table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS citizen_index (
-                id SERIAL PRIMARY KEY,
-                full_name TEXT,
-                aadhaar_number_hash TEXT,
-                pan_number TEXT UNIQUE,
-                dob DATE,
-                gender TEXT,
-                phone_number TEXT,
-                face_encoding_json TEXT,
-                aadhaar_card_path TEXT,
-                pan_card_path TEXT,
-                latest_block_hash TEXT,
-                is_verified BOOLEAN
+    # Create and upgrade tables through the versioned migrations in migrations/
+    for dbname in DATABASES:
+        try:
+            conn = psycopg2.connect(
+                dbname=dbname,
+                user=DB_USER,
+                password=DB_PASSWORD,
+                host=DB_HOST,
             )
-        """)
-        print("✓ Created table: citizen_index")
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-    except Exception as e:
-        print(f"✗ Error setting up verify_db: {e}")
-        return False
+            try:
+                if not migrate(conn, os.path.join(MIGRATIONS_DIR, dbname)):
+                    print(f"✓ Schema of {dbname} is up to date")
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"✗ Error setting up {dbname}: {e}")
+            return False
     
     print("\n✓ All databases and tables set up successfully!")
     return True
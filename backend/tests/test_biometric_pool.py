@@ -0,0 +1,44 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import biometric_pool  # noqa: E402
+from biometric_pool import BiometricPool, BiometricTimeout  # noqa: E402
+from inference_executor import ExecutorSaturated  # noqa: E402
+
+
+def test_timed_out_call_keeps_its_slot(monkeypatch):
+    release = threading.Event()
+
+    def stuck_encode(submitted_at, *args):
+        release.wait(5)
+        return [biometric_pool.MOCK_ENCODING.copy()], []
+
+    monkeypatch.setattr(biometric_pool, "encode_in_worker", stuck_encode)
+    pool = BiometricPool(backend="mock", mode="thread", max_workers=1, max_pending=1, timeout=0.05)
+
+    async def scenario():
+        with pytest.raises(BiometricTimeout):
+            await pool.encode(b"photo")
+        # The worker is still busy with the timed-out call, so it still holds the only slot
+        assert pool.executor.in_flight == 1
+        assert pool.stats()["timed_out_running"] == 1
+        with pytest.raises(ExecutorSaturated):
+            await pool.encode(b"photo")
+
+        release.set()
+        while pool.executor.in_flight:
+            await asyncio.sleep(0.01)
+        assert pool.stats()["timed_out_running"] == 0
+        assert len(await pool.encode(b"photo")) == 1
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
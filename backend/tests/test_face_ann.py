@@ -0,0 +1,92 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_ann import IVFFaceIndex  # noqa: E402
+from face_index import FaceIndex  # noqa: E402
+
+SIZE = 12000  # enough for 32 partitions and for PQ codebooks (256 * MIN_POINTS_PER_CENTROID)
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    """
+    Clustered encodings, queries near the first 100 of them, and the exact top 10 per query
+    """
+    rng = np.random.default_rng(0)
+    centers = rng.normal(scale=0.08, size=(64, 128))
+    encodings = (centers[rng.integers(0, 64, SIZE)] + rng.normal(scale=0.05, size=(SIZE, 128))).astype(np.float32)
+    keys = [f"P{i}" for i in range(SIZE)]
+    queries = encodings[:100] + rng.normal(scale=0.01, size=(100, 128)).astype(np.float32)
+    exact = FaceIndex()
+    exact.add_many(keys, encodings)
+    truth = [[key for key, _ in result] for result in exact.search_batch(queries, 10)]
+    return keys, encodings, queries, truth
+
+
+def recall(results, truth):
+    at_1 = np.mean([result[0][0] == expected[0] for result, expected in zip(results, truth)])
+    at_10 = np.mean([len({key for key, _ in result} & set(expected)) / 10 for result, expected in zip(results, truth)])
+    return at_1, at_10
+
+
+@pytest.mark.parametrize("pq_m, min_recall", [(0, 0.95), (16, 0.9)])
+def test_recall_against_exact_search(dataset, pq_m, min_recall):
+    keys, encodings, queries, truth = dataset
+    index = IVFFaceIndex(nlist=32, nprobe=8, pq_m=pq_m, rerank=100)
+    index.add_many(keys, encodings)
+    assert index.needs_training()
+    assert index.train()
+    assert not index.needs_training()
+
+    at_1, at_10 = recall(index.search_batch(queries, 10), truth)
+    assert at_1 == 1.0
+    assert at_10 >= min_recall
+
+    # Searching every partition finds everything the codes rank high enough to rerank
+    index.nprobe = 32
+    assert recall(index.search_batch(queries, 10), truth)[1] >= at_10
+
+
+def test_untrained_index_searches_exactly(dataset):
+    keys, encodings, queries, truth = dataset
+    index = IVFFaceIndex(nlist=32, nprobe=1)
+    index.add_many(keys[:1000], encodings[:1000])
+    assert not index.needs_training() and not index.stats()["trained"]
+
+    exact = FaceIndex()
+    exact.add_many(keys[:1000], encodings[:1000])
+    assert index.search_batch(queries, 5) == exact.search_batch(queries, 5)
+
+
+def test_changes_after_training_are_searchable(dataset, tmp_path):
+    keys, encodings, queries, truth = dataset
+    index = IVFFaceIndex(nlist=32, nprobe=8)
+    index.add_many(keys[:10000], encodings[:10000])
+    assert index.train()
+    # Added after training: not in the inverted lists yet, compared exhaustively
+    index.add_many(keys[10000:], encodings[10000:])
+    assert index.stats()["unlisted_rows"] == 2000
+    assert index.search(encodings[11000], 1)[0][0] == keys[11000]
+
+    # A removal patches the lists in place; the moved last row stays findable
+    assert index.remove(keys[5])
+    assert index.search(encodings[5], 1)[0][0] != keys[5]
+    assert index.search(encodings[-1], 1)[0][0] == keys[-1]
+    assert index.stats()["removed_entries"] >= 1
+
+    # A rebuild folds everything back into the lists; with every partition probed, results stay the same
+    index.nprobe = 32
+    before = index.search_batch(queries, 10)
+    assert index.rebuild_lists()
+    assert index.stats()["unlisted_rows"] == 0 and index.stats()["removed_entries"] == 0
+    assert index.search_batch(queries, 10) == before
+
+    index.save(str(tmp_path))
+    loaded = IVFFaceIndex.load(str(tmp_path))
+    assert loaded.stats()["trained"]
+    assert loaded.search_batch(queries, 10) == before
@@ -0,0 +1,159 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_codec import encode_face  # noqa: E402
+from face_index import FaceIndex, sync_from_db  # noqa: E402
+
+
+def random_encodings(n, seed=0):
+    return np.random.default_rng(seed).normal(scale=0.1, size=(n, 128)).astype(np.float32)
+
+
+def test_add_if_unique_rejects_a_near_duplicate():
+    encodings = random_encodings(3)
+    index = FaceIndex()
+    index.add_many(["A", "B", "C"], encodings)
+
+    match, added = index.add_if_unique("D", encodings[1] + 0.001, max_distance=0.6)
+    assert not added and "D" not in index
+    assert match[0] == "B" and match[1] < 0.6
+    assert len(index) == 3
+
+
+def test_add_if_unique_adds_a_new_face():
+    encodings = random_encodings(4)
+    index = FaceIndex()
+    index.add_many(["A", "B", "C"], encodings[:3])
+
+    match, added = index.add_if_unique("D", encodings[3], max_distance=0.1)
+    assert match is None and added
+    assert index.search(encodings[3], 1)[0][0] == "D"
+
+    # The key's own encoding is not a duplicate, but an existing key is left unchanged
+    assert index.add_if_unique("D", encodings[3], max_distance=0.1) == (None, False)
+    assert len(index) == 4
+
+
+def test_remove_moves_the_last_row_into_the_gap():
+    encodings = random_encodings(4)
+    index = FaceIndex()
+    index.add_many(["A", "B", "C", "D"], encodings)
+
+    assert index.remove("B")
+    assert not index.remove("B")
+    assert index.keys() == ["A", "D", "C"]
+    assert "B" not in index
+    for key, encoding in zip("ACD", encodings[[0, 2, 3]]):
+        assert index.search(encoding, 1) == [(key, 0.0)]
+
+    # Removing the last row leaves the others in place
+    assert index.remove("C")
+    assert index.keys() == ["A", "D"]
+    assert index.search(encodings[3], 1) == [("D", 0.0)]
+
+
+def test_snapshot_round_trip_keeps_the_watermark(tmp_path):
+    encodings = random_encodings(50)
+    keys = [f"P{i}" for i in range(50)]
+    index = FaceIndex()
+    index.add_many(keys, encodings)
+    index.remove("P7")
+    index.watermark = 1234
+    index.save(str(tmp_path))
+
+    loaded = FaceIndex.load(str(tmp_path))
+    assert loaded.watermark == 1234
+    assert loaded.keys() == index.keys()
+    assert loaded.search_batch(encodings[:10], 3) == index.search_batch(encodings[:10], 3)
+
+    # The mapped snapshot is copied on the first change; the saved files stay as they were
+    loaded.add("NEW", encodings[7])
+    assert loaded.search(encodings[7], 1) == [("NEW", 0.0)]
+    assert "NEW" not in FaceIndex.load(str(tmp_path))
+
+
+def connect():
+    """
+    Connection to the test database (DB_HOST/DB_USER/DB_PASSWORD, database DB_NAME or postgres)
+    """
+    psycopg2 = pytest.importorskip("psycopg2")
+    try:
+        return psycopg2.connect(
+            dbname=os.getenv("DB_NAME", "postgres"),
+            user=os.getenv("DB_USER", "postgres"),
+            password=os.getenv("DB_PASSWORD", "postgres"),
+            host=os.getenv("DB_HOST", "localhost"),
+            connect_timeout=3,
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"No test database: {e}")
+
+
+@pytest.fixture
+def registry():
+    conn = connect()
+    table = f"face_sync_test_{os.getpid()}"
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TABLE {table} (id SERIAL PRIMARY KEY, pan_number TEXT UNIQUE, "
+                       f"face_encoding BYTEA, face_encoding_json TEXT)")
+    conn.commit()
+    yield conn, table
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+    conn.close()
+
+
+def test_sync_picks_up_rows_committed_out_of_order(registry):
+    conn, table = registry
+    rng = np.random.default_rng(0)
+    slow, fast = connect(), connect()
+    index = FaceIndex()
+    try:
+        insert = f"INSERT INTO {table} (pan_number, face_encoding) VALUES (%s, %s)"
+        with slow.cursor() as cursor:
+            cursor.execute(insert, ("SLOW", encode_face(rng.normal(size=128))))  # takes id 1, not committed
+        with fast.cursor() as cursor:
+            cursor.execute(insert, ("FAST", encode_face(rng.normal(size=128))))  # takes id 2
+        fast.commit()
+
+        assert sync_from_db(conn, index, table, "id") == 1
+        assert index.watermark == 2 and "SLOW" not in index
+
+        slow.commit()
+        assert sync_from_db(conn, index, table, "id") == 1
+        assert "SLOW" in index and index.watermark == 2
+        # Rows already in the index are not read again
+        assert sync_from_db(conn, index, table, "id") == 0
+    finally:
+        slow.close()
+        fast.close()
+
+
+def test_full_sync_checks_ids_beyond_the_overlap(registry):
+    conn, table = registry
+    rng = np.random.default_rng(1)
+    late = connect()
+    index = FaceIndex()
+    try:
+        insert = f"INSERT INTO {table} (pan_number, face_encoding) VALUES (%s, %s)"
+        with late.cursor() as cursor:
+            cursor.execute(insert, ("LATE", encode_face(rng.normal(size=128))))
+        with conn.cursor() as cursor:
+            for i in range(5):
+                cursor.execute(insert, (f"P{i}", encode_face(rng.normal(size=128))))
+        conn.commit()
+        sync_from_db(conn, index, table, "id", overlap=2)
+        late.commit()
+
+        assert sync_from_db(conn, index, table, "id", overlap=2) == 0
+        assert sync_from_db(conn, index, table, "id", overlap=None) == 1
+        assert "LATE" in index
+    finally:
+        late.close()
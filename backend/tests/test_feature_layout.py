@@ -0,0 +1,83 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feature_layout  # noqa: E402
+from feature_layout import NOT_PROVIDED, UNSEEN, FeatureLayout  # noqa: E402
+
+COLUMNS = [
+    'AMT_INCOME_TOTAL', 'DAYS_BIRTH',
+    'NAME_INCOME_TYPE_Working', 'NAME_INCOME_TYPE_Pensioner', 'NAME_INCOME_TYPE_State servant',
+    'CODE_GENDER_F', 'CODE_GENDER_M',
+    'NAME_CONTRACT_TYPE',
+]
+RAW_FIELDS = ['AMT_INCOME_TOTAL', 'AMT_CREDIT', 'DAYS_BIRTH']  # AMT_CREDIT is not a model column
+CATEGORICAL_FIELDS = ['NAME_INCOME_TYPE', 'NAME_CONTRACT_TYPE', 'CODE_GENDER']  # contract type has no one-hot columns
+
+
+def layout():
+    return FeatureLayout(COLUMNS, RAW_FIELDS, CATEGORICAL_FIELDS)
+
+
+def test_category_offsets():
+    features = layout()
+    assert features.category_offset(0, 'Pensioner') == COLUMNS.index('NAME_INCOME_TYPE_Pensioner')
+    assert features.category_offset(0, 'Student') == UNSEEN
+    assert features.category_offset(0, None) == NOT_PROVIDED
+    assert features.category_offset(0, '') == NOT_PROVIDED
+
+
+def test_encode_batch_with_unseen_and_missing_categories():
+    features = layout()
+    raw_rows = [(100000.0, 5.0, -12000.0), (250000.0, 6.0, -20000.0), (50000.0, 7.0, -9000.0)]
+    category_rows = [
+        ('Working', 'Cash loans', 'F'),
+        ('Student', None, 'XNA'),  # two unseen categories
+        (None, 'Revolving loans', ''),  # nothing provided
+    ]
+    matrix = features.encode_batch(raw_rows, category_rows)
+
+    expected = np.zeros((3, len(COLUMNS)))
+    expected[:, 0] = [100000.0, 250000.0, 50000.0]
+    expected[:, 1] = [-12000.0, -20000.0, -9000.0]
+    expected[0, COLUMNS.index('NAME_INCOME_TYPE_Working')] = 1.0
+    expected[0, COLUMNS.index('CODE_GENDER_F')] = 1.0
+    assert np.array_equal(matrix, expected)
+
+    # Same result as encoding row by row
+    for raw, categories, row in zip(raw_rows, category_rows, matrix):
+        assert np.array_equal(features.encode_row(raw, categories, features.new_matrix(1)[0]), row)
+
+
+def test_unseen_categories_are_counted():
+    features = layout()
+    raw_rows = [(1.0, 2.0, 3.0)] * 4
+    features.encode_batch(raw_rows, [('Student', 'Unknown', 'XNA'), ('Student', None, 'F'),
+                                     ('Businessman', None, None), (None, None, '')])
+    stats = features.unseen_stats()
+    # Fields without one-hot columns are not encoded, so not reported either
+    assert set(stats) == {'NAME_INCOME_TYPE', 'CODE_GENDER'}
+    assert stats['NAME_INCOME_TYPE'] == {"unseen": 3, "known_categories": 3,
+                                         "top_unseen": {'Student': 2, 'Businessman': 1}}
+    assert stats['CODE_GENDER'] == {"unseen": 1, "known_categories": 2, "top_unseen": {'XNA': 1}}
+
+    features.encode_row((1.0, 2.0, 3.0), ('Student', None, None), features.new_matrix(1)[0])
+    assert features.unseen_stats()['NAME_INCOME_TYPE']['top_unseen']['Student'] == 3
+
+
+def test_unseen_values_tracked_are_bounded(monkeypatch):
+    monkeypatch.setattr(feature_layout, 'MAX_TRACKED_UNSEEN', 5)
+    features = layout()
+    categories = [(f'Type {i}', None, None) for i in range(20)] + [('Type 0', None, None)]
+    features.encode_batch([(1.0, 2.0, 3.0)] * len(categories), categories)
+
+    assert features.unseen_counts[0] == 21
+    assert len(features.unseen_values[0]) == 5
+    assert features.unseen_values[0]['Type 0'] == 2
+
+
+def test_encode_empty_batch():
+    assert layout().encode_batch([], []).shape == (0, len(COLUMNS))
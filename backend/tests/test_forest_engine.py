@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest_engine import CHUNK_ROWS, EXACTNESS_TOLERANCE, CompiledForest, load_inference_engine  # noqa: E402
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+
+def with_missing(X, rng, fraction=0.15):
+    X = X.copy()
+    X[rng.random(X.shape) < fraction] = np.nan
+    return X
+
+
+@pytest.fixture(scope="module")
+def forest():
+    """
+    A small forest fitted on features with missing values, so splits learn where NaN goes
+    """
+    rng = np.random.default_rng(0)
+    X = rng.random((2000, 8))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.2, size=2000) > 0.8).astype(int)
+    # Rows missing feature 3 are mostly positive, so NaN matters for the splits on it
+    missing = rng.random(2000) < 0.2
+    X[missing, 3] = np.nan
+    y[missing] = rng.random(missing.sum()) < 0.8
+    X = with_missing(X, rng, 0.05)
+    model = ensemble.RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0)
+    return model.fit(X, y)
+
+
+def test_compiled_forest_learns_both_missing_directions(forest):
+    engine = CompiledForest.from_sklearn(forest)
+    internal = engine.children_left != np.arange(len(engine.children_left))
+    assert engine.missing_left[internal].any()
+    assert not engine.missing_left[internal].all()
+
+
+def test_compiled_forest_matches_sklearn_across_chunks(forest):
+    rng = np.random.default_rng(1)
+    engine = CompiledForest.from_sklearn(forest)
+    X = with_missing(rng.random((2 * CHUNK_ROWS + 123, 8)), rng)
+    # Values exactly at split thresholds take the <= branch in both
+    internal = engine.children_left != np.arange(len(engine.children_left))
+    pinned = rng.choice(np.flatnonzero(internal & np.isfinite(engine.threshold)), 500)
+    X[np.arange(500), engine.feature[pinned]] = engine.threshold[pinned]
+
+    expected = forest.predict_proba(X)
+    actual = engine.predict_proba(X)
+    assert actual.shape == expected.shape
+    assert np.max(np.abs(actual - expected)) <= EXACTNESS_TOLERANCE
+    assert np.array_equal(engine.predict(X), forest.predict(X))
+    assert engine.check_exactness(forest, X) <= EXACTNESS_TOLERANCE
+
+    # Each chunk is scored on its own
+    assert np.array_equal(engine.predict_proba(X[CHUNK_ROWS:]), actual[CHUNK_ROWS:])
+
+
+def test_compiled_forest_round_trips_through_arrays(forest):
+    engine = CompiledForest.from_sklearn(forest)
+    rebuilt = CompiledForest.from_arrays(engine.to_arrays(), engine.max_depth, engine.n_features)
+    X = with_missing(np.random.default_rng(2).random((300, 8)), np.random.default_rng(3))
+    assert np.array_equal(rebuilt.predict_proba(X), engine.predict_proba(X))
+
+
+def test_missing_only_splits_have_infinite_thresholds(forest):
+    engine = CompiledForest.from_sklearn(forest)
+    assert np.isinf(engine.threshold).any()
+
+
+def test_load_inference_engine_checks_the_compiled_forest(forest):
+    assert load_inference_engine(forest, "compiled").name == "compiled"
+    assert load_inference_engine(forest, "sklearn").name == "sklearn"
+    with pytest.raises(ValueError):
+        CompiledForest.from_sklearn(forest).predict_proba(np.zeros((3, 5)))
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fused_transform import VALIDATION_TOLERANCE, FusedTransform  # noqa: E402
+
+impute = pytest.importorskip("sklearn.impute")
+preprocessing = pytest.importorskip("sklearn.preprocessing")
+
+
+def training_data(seed=0):
+    """
+    Features on different scales with missing values, a constant column and an all-missing column
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(500, 6)) * [1, 10, 1000, 0.01, 1, 1] + [0, 5, -300, 0, 0, 0]
+    X[rng.random(X.shape) < 0.2] = np.nan
+    X[:, 4] = 7.0
+    X[:, 5] = np.nan
+    return X
+
+
+def fit(X, clip=False, **imputer_args):
+    imputer = impute.SimpleImputer(strategy="median", **imputer_args).fit(X)
+    scaler = preprocessing.MinMaxScaler(clip=clip).fit(imputer.transform(X))
+    return imputer, scaler
+
+
+@pytest.mark.parametrize("clip", [False, True])
+def test_validate_against_fitted_imputer_and_scaler(clip):
+    X = training_data()
+    imputer, scaler = fit(X, clip=clip, keep_empty_features=True)
+    fused = FusedTransform.from_fitted(imputer, scaler)
+    assert fused.validate(imputer, scaler) <= VALIDATION_TOLERANCE
+
+    # Also outside the fitted range, where clipping applies
+    rows = training_data(seed=1) * 3
+    expected = scaler.transform(imputer.transform(rows))
+    assert np.max(np.abs(fused.transform(rows) - expected)) <= VALIDATION_TOLERANCE
+
+
+def test_transform_inplace_overwrites_the_buffer():
+    X = training_data()
+    imputer, scaler = fit(X, keep_empty_features=True)
+    fused = FusedTransform.from_fitted(imputer, scaler)
+    rows = training_data(seed=2)[:10]
+    expected = fused.transform(rows)
+    assert np.isnan(rows).any()
+    assert fused.transform(rows, inplace=True) is rows
+    assert np.array_equal(rows, expected)
+
+
+def test_validate_rejects_a_different_scaler():
+    X = training_data()
+    imputer, scaler = fit(X, keep_empty_features=True)
+    fused = FusedTransform.from_fitted(imputer, scaler)
+    _, other = fit(training_data(seed=3) * 2, keep_empty_features=True)
+    with pytest.raises(ValueError, match="differs from sklearn"):
+        fused.validate(imputer, other)
+
+
+@pytest.mark.filterwarnings("ignore:Skipping features without any observed values")
+def test_from_fitted_rejects_configurations_it_cannot_reproduce():
+    X = training_data()
+    with pytest.raises(ValueError, match="empty features"):
+        FusedTransform.from_fitted(*fit(X))
+    with pytest.raises(ValueError, match="add_indicator"):
+        FusedTransform.from_fitted(*fit(X[:, :5], add_indicator=True))
+    with pytest.raises(ValueError, match="fitted"):
+        FusedTransform.from_fitted(impute.SimpleImputer(), preprocessing.MinMaxScaler())
+
+
+@pytest.mark.filterwarnings("ignore:All-NaN slice encountered")
+def test_from_statistics_matches_from_fitted():
+    X = training_data()
+    imputer, scaler = fit(X, keep_empty_features=True)
+    medians = np.nanmedian(X, axis=0)
+    filled = np.where(np.isnan(X), medians, X)
+    data_min, data_max = np.nanmin(filled, axis=0), np.nanmax(filled, axis=0)
+    fused = FusedTransform.from_statistics(medians, data_min, data_max)
+    assert fused.validate(imputer, scaler) <= VALIDATION_TOLERANCE
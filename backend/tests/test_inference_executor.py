@@ -0,0 +1,35 @@
+import asyncio
+import os
+import sys
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_executor import InferenceExecutor  # noqa: E402
+
+
+def die():
+    os._exit(1)
+
+
+def test_broken_process_pool_is_replaced():
+    executor = InferenceExecutor(mode="process", max_workers=1, max_pending=4)
+
+    async def scenario():
+        first = await executor.run(os.getpid)
+        with pytest.raises(BrokenProcessPool):
+            await executor.run(die)
+        assert executor.stats()["broken_pools"] == 1
+        assert executor.in_flight == 0
+
+        # The dead worker's pool was dropped; the next call runs in a fresh worker
+        second = await executor.run(os.getpid)
+        assert second != first
+        assert executor.stats()["broken_pools"] == 1
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
@@ -0,0 +1,76 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reference_stats import HISTOGRAM_BINS, build_reference_stats  # noqa: E402
+
+utils = pytest.importorskip("utils")
+
+
+@pytest.fixture(scope="module")
+def training_csv(tmp_path_factory):
+    """
+    A small application_train-style file: integer, wide-range and float columns with missing values,
+    a label encoded text column, one-hot text columns (one with missing values) and dropped columns
+    """
+    rng = np.random.default_rng(0)
+    n = 5001  # odd, so integer medians are a single order statistic
+    frame = pd.DataFrame({
+        'SK_ID_CURR': np.arange(100000, 100000 + n),
+        'TARGET': rng.integers(0, 2, n),
+        'CNT_CHILDREN': rng.poisson(1.0, n),
+        'DAYS_EMPLOYED': rng.integers(-20000, 365244, n),  # integers over a range too wide for one bin each
+        'AMT_INCOME_TOTAL': rng.lognormal(11.5, 0.6, n).round(2),
+        'EXT_SOURCE_1': rng.beta(2, 3, n),
+        'FLAG_OWN_CAR': rng.choice(['N', 'Y'], n),
+        'CODE_GENDER': rng.choice(['F', 'M', 'XNA'], n, p=[0.6, 0.39, 0.01]),
+        'NAME_TYPE_SUITE': rng.choice(['Unaccompanied', 'Family', 'Spouse, partner'], n),
+    })
+    frame['EXT_SOURCE_1'] = frame['EXT_SOURCE_1'].mask(rng.random(n) < 0.4)
+    frame['AMT_INCOME_TOTAL'] = frame['AMT_INCOME_TOTAL'].mask(rng.random(n) < 0.05)
+    frame['NAME_TYPE_SUITE'] = frame['NAME_TYPE_SUITE'].mask(rng.random(n) < 0.1)
+    frame['OWN_CAR_AGE'] = np.nan  # never observed
+    path = tmp_path_factory.mktemp("reference") / "application_train.csv"
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_reference_stats_match_the_encoded_training_frame(training_csv):
+    stats = build_reference_stats(training_csv, chunk_size=700)
+    encoded, binary_encodings = utils.encode_training_data(pd.read_csv(training_csv))
+    encoded = encoded.astype(np.float64)
+
+    assert stats.columns == list(encoded.columns)
+    assert stats.binary_encodings == binary_encodings
+    assert stats.n_rows == len(encoded)
+    assert np.array_equal(stats.count, encoded.notna().sum().to_numpy())
+    assert np.allclose(stats.data_min, encoded.min().to_numpy(), equal_nan=True)
+    assert np.allclose(stats.data_max, encoded.max().to_numpy(), equal_nan=True)
+
+    expected = encoded.median()
+    for i, column in enumerate(stats.columns):
+        if stats.count[i] == 0:
+            assert np.isnan(stats.median[i]) and np.isnan(expected[column])
+        elif stats.exact_median[i]:
+            assert stats.median[i] == expected[column], column
+        else:
+            # Interpolated within one histogram bin
+            width = (stats.data_max[i] - stats.data_min[i]) / HISTOGRAM_BINS
+            assert abs(stats.median[i] - expected[column]) <= width, column
+
+    exact = {column for column, is_exact in zip(stats.columns, stats.exact_median) if is_exact}
+    assert {'CNT_CHILDREN', 'FLAG_OWN_CAR', 'CODE_GENDER_F', 'NAME_TYPE_SUITE_Family'} <= exact
+    assert not {'DAYS_EMPLOYED', 'AMT_INCOME_TOTAL', 'EXT_SOURCE_1', 'OWN_CAR_AGE'} & exact
+
+
+def test_reference_stats_do_not_depend_on_the_chunk_size(training_csv):
+    small = build_reference_stats(training_csv, chunk_size=333)
+    whole = build_reference_stats(training_csv, chunk_size=100000)
+    assert np.array_equal(small.median, whole.median, equal_nan=True)
+    assert np.array_equal(small.data_min, whole.data_min, equal_nan=True)
+    assert small.summary() == whole.summary()
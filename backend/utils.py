@@ -4,6 +4,8 @@ from sklearn.preprocessing import LabelEncoder, MinMaxScaler
 from sklearn.impute import SimpleImputer
 from sklearn.model_selection import train_test_split
  
+# Target and the rare categories removed from the encoded training data
+DROPPED_TRAINING_COLUMNS = ('TARGET', 'CODE_GENDER_XNA', 'NAME_INCOME_TYPE_Maternity leave', 'NAME_FAMILY_STATUS_Unknown')
 
 def split_data(X, y, test_size=0.2, random_state=42):
     """
@@ -16,3 +18,33 @@ def split_data(X, y, test_size=0.2, random_state=42):
     """
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
     return X_train, X_test, y_train, y_test
+
+
+def encode_training_data(train_data):
+    """
+     Encode the raw application_train frame the same way as during model training.
+      Object columns with at most two values are label encoded, the rest are one-hot encoded,
+      and the target plus categories that were dropped at training time are removed.
+      param: train_data - raw DataFrame read from application_train.csv (modified in place).
+      return: X - encoded feature DataFrame, binary_encodings - {column: [classes in code order]}
+    """
+    le = LabelEncoder()
+    binary_encodings = {}
+    for col in train_data:
+        if train_data[col].dtype == 'object':
+            if len(list(train_data[col].unique())) <= 2:
+                try:
+                    le.fit(train_data[col])
+                    train_data[col] = le.transform(train_data[col])
+                    binary_encodings[col] = [str(c) for c in le.classes_]
+                except:
+                    pass
+
+    # One-hot encode
+    train_data = pd.get_dummies(train_data)
+
+    # Drop target and other columns (same as training)
+    columns_to_drop = [col for col in DROPPED_TRAINING_COLUMNS if col in train_data.columns]
+
+    X = train_data.drop(columns=columns_to_drop, errors='ignore')
+    return X, binary_encodings
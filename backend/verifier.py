@@ -1,11 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-import psycopg2
 import numpy as np
+import asyncio
+import functools
 import json
 import hashlib
+import logging
 import os
+import time
 from dotenv import load_dotenv
+from biometric_pool import BiometricTimeout, InvalidImage, biometric_pool_from_env
 from blockchain_core import SQLBlockchain   # your blockchain engine
+from db_pool import PoolTimeout, pool_from_env
+from face_ann import create_face_index
+from face_codec import FaceCodecError, encode_face, read_face
+from face_index import SYNC_OVERLAP_ROWS, sync_from_db
+from inference_executor import ExecutorSaturated
+from ttl_cache import TTLCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,15 +24,172 @@ load_dotenv()
 # Load environment for mock biometrics (set MOCK_BIOMETRICS=true to skip face_recognition)
 MOCK_BIOMETRICS = os.getenv("MOCK_BIOMETRICS", "false").lower() == "true"
 
-if not MOCK_BIOMETRICS:
-    import face_recognition
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# ------------------------------
+# DATABASE CONNECTION POOL
+# ------------------------------
+# Connections are reused across requests; queries run on the pool's threads, off the event loop
+db_pool = pool_from_env("verify_db")
+
+# ------------------------------
+# BIOMETRIC WORKER POOL
+# ------------------------------
+# Photos are decoded and encoded by worker processes with the dlib models preloaded (mock backend
+# with MOCK_BIOMETRICS), so face_recognition never blocks the event loop
+biometric_pool = biometric_pool_from_env(MOCK_BIOMETRICS)
+
+# ------------------------------
+# FACE INDEX (1:N duplicate identity check at registration)
+# ------------------------------
+FACE_INDEX_PATH = os.getenv("FACE_INDEX_PATH")  # Snapshot directory for fast restarts (unset: rebuilt from the DB)
+FACE_DEDUP_DISTANCE = float(os.getenv("FACE_DEDUP_DISTANCE", "0.5"))
+# Mock encodings are all identical, so every registration would look like a duplicate
+FACE_DEDUP = os.getenv("FACE_DEDUP", "true").lower() == "true" and not MOCK_BIOMETRICS
+# Registrations made by other workers and replicas are read from the database before a duplicate
+# check once the last read is this many seconds old (0: before every check)
+FACE_INDEX_SYNC_INTERVAL = float(os.getenv("FACE_INDEX_SYNC_INTERVAL", "0"))
+# Catch-up syncs re-check the last SYNC_OVERLAP_ROWS ids for rows that committed late; every this many
+# seconds (and at startup) a sync checks every id instead
+FACE_INDEX_FULL_SYNC_INTERVAL = float(os.getenv("FACE_INDEX_FULL_SYNC_INTERVAL", "3600"))
+
+# Encodings are stored in the binary face_encoding column. Keep also writing the legacy JSON column
+# while instances that only read JSON are still running.
+FACE_ENCODING_WRITE_JSON = os.getenv("FACE_ENCODING_WRITE_JSON", "false").lower() == "true"
+
+face_index = create_face_index()  # FACE_INDEX_MODE picks exact or approximate search
+face_index_synced = False
+face_index_synced_at = 0.0  # time.monotonic() at the start of the last sync
+face_index_full_synced_at = None  # same, for the last sync that checked every id
+face_index_lock = asyncio.Lock()
+face_index_training = None  # background face_index.train() task
+duplicates_rejected = 0
+
+
+# ------------------------------
+# CITIZEN CACHE (repeat verifications from KYC retry flows)
+# ------------------------------
+# (latest block hash, decoded face encoding) per PAN; the integrity check has no Aadhaar number to key
+# on. The block itself is always re-read, so a tampered block is caught even for a cached citizen.
+# Entries expire after CITIZEN_CACHE_TTL seconds; 0 entries disables the cache.
+CITIZEN_CACHE_SIZE = int(os.getenv("CITIZEN_CACHE_SIZE", "10000"))
+citizen_cache = (
+    TTLCache(maxsize=CITIZEN_CACHE_SIZE, ttl=float(os.getenv("CITIZEN_CACHE_TTL", "300")))
+    if CITIZEN_CACHE_SIZE > 0 else None
+)
+
+
+async def sync_face_index(max_age=0.0):
+    """Add the citizens indexed since the last sync, by any instance, to the face index.
+    The first sync reads everything after the snapshot, later ones the rows above the watermark
+    and late commits below it (see sync_from_db);
+    skipped when a sync started within max_age seconds or while the caller waited for the lock.
+    """
+    global face_index_synced, face_index_synced_at, face_index_full_synced_at
+    requested = time.monotonic()
+    async with face_index_lock:
+        if face_index_synced and face_index_synced_at >= requested - max_age:
+            return
+        started = time.monotonic()
+        full = face_index_full_synced_at is None or started - face_index_full_synced_at >= FACE_INDEX_FULL_SYNC_INTERVAL
+        sync = functools.partial(sync_from_db, overlap=None if full else SYNC_OVERLAP_ROWS)
+        added = await db_pool.run(sync, face_index, "citizen_index", "id")
+        face_index_synced_at = started
+        if full:
+            face_index_full_synced_at = started
+        if not face_index_synced:
+            face_index_synced = True
+            logger.info(f"Face index loaded {added} encodings from the database ({len(face_index)} total)")
+    schedule_face_index_training()
+
+
+def schedule_face_index_training():
+    """Start training the approximate index in the background once it has enough encodings, and
+    again each time it has doubled since; searches use the previous partitions meanwhile."""
+    global face_index_training
+    if face_index.needs_training() and (face_index_training is None or face_index_training.done()):
+        face_index_training = asyncio.create_task(train_face_index(face_index))
+
+
+async def train_face_index(index):
+    try:
+        await asyncio.to_thread(index.train)
+    except Exception as e:
+        logger.error(f"Face index training failed: {e}")
+
+
+async def reserve_face(pan_number, encoding):
+    """Add a new citizen's face to the index, or reject it with 409 if another PAN has it.
+    Returns whether the face was added (and must be removed again if registration fails).
+    """
+    global duplicates_rejected
+    if not FACE_DEDUP:
+        return False
+    try:
+        # Catch up on other instances' registrations; the PAN unique constraint still decides
+        # between two instances registering at the same moment
+        await sync_face_index(FACE_INDEX_SYNC_INTERVAL)
+    except PoolTimeout as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(503, f"Face index unavailable: {e}")
+
+    # Check and add are atomic, so two concurrent registrations of one face cannot both pass
+    match, reserved = await asyncio.to_thread(face_index.add_if_unique, pan_number, encoding, FACE_DEDUP_DISTANCE)
+    if match:
+        duplicates_rejected += 1
+        raise HTTPException(409, f"Face already registered under another identity (distance {match[1]:.3f})")
+    return reserved
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global face_index
+    try:
+        await asyncio.to_thread(db_pool.open)
+    except Exception as e:
+        # Connections are opened on demand once the database is reachable
+        logger.warning(f"Could not pre-open database connections: {e}")
+    await asyncio.to_thread(biometric_pool.start)
+    if FACE_INDEX_PATH:
+        face_index = await asyncio.to_thread(create_face_index, FACE_INDEX_PATH)
+    try:
+        await sync_face_index()
+    except Exception as e:
+        # Retried by the first registration
+        logger.warning(f"Could not load the face index: {e}")
+    yield
+    if face_index_training is not None:
+        await face_index_training
+    if FACE_INDEX_PATH and face_index_synced:
+        await asyncio.to_thread(face_index.save, FACE_INDEX_PATH)
+    biometric_pool.shutdown()
+    db_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def encode_photo(photo: UploadFile, reject_unreadable=True):
+    """Encodings of the faces in an uploaded photo, computed by the biometric pool.
+    A full pool or a timeout answers 503 with Retry-After. An unreadable image answers 400,
+    or raises InvalidImage to the caller with reject_unreadable=False.
+    """
+    image_bytes = await photo.read()
+    try:
+        return await biometric_pool.encode(image_bytes)
+    except (ExecutorSaturated, BiometricTimeout) as e:
+        logger.warning(f"Rejected face encoding: {e}")
+        raise HTTPException(503, f"Biometric processing unavailable: {e}", headers={"Retry-After": "1"})
+    except InvalidImage as e:
+        if not reject_unreadable:
+            raise
+        raise HTTPException(400, str(e))
 
 
 class BiometricEngine:
     """Lightweight biometric helper used by `central.py`.
-    Uses `face_recognition` when available, otherwise falls back
+    Compares encodings computed by the biometric pool, or falls back
     to a permissive simulation for local testing.
     """
 
@@ -31,12 +199,12 @@ class BiometricEngine:
         s = SequenceMatcher(None, (stored_name or "").lower(), (claimed_name or "").lower())
         return int(s.ratio() * 100)
 
-    def verify_face(self, stored_face_json, upload_file) -> (bool, float):
-        """Compare stored encoding (JSON list or JSON string) with uploaded selfie file.
+    def verify_face(self, stored_face, live_encodings) -> (bool, float):
+        """Compare stored encoding (array, list or JSON string) with the encodings of the selfie.
         Returns (is_match: bool, distance: float)
         
         If MOCK_BIOMETRICS=true, always returns a match (for local testing).
-        Otherwise uses face_recognition library.
+        Otherwise compares against the first face found in the selfie.
         """
         if MOCK_BIOMETRICS:
             # Mock mode: always return match with distance 0.0
@@ -44,18 +212,14 @@ class BiometricEngine:
         
         try:
             # Normalize stored encoding into a numpy array
-            if isinstance(stored_face_json, str):
-                stored = np.array(json.loads(stored_face_json))
+            if isinstance(stored_face, str):
+                stored = read_face(encoding_json=stored_face)
             else:
-                stored = np.array(stored_face_json)
+                stored = np.asarray(stored_face)
 
-            # Load candidate image
-            upload_file.seek(0)
-            img = face_recognition.load_image_file(upload_file)
-            encs = face_recognition.face_encodings(img)
-            if not encs:
+            if not live_encodings:
                 return False, 999.0
-            candidate = np.array(encs[0])
+            candidate = np.asarray(live_encodings[0])
 
             # Euclidean distance
             dist = np.linalg.norm(stored - candidate)
@@ -63,20 +227,87 @@ class BiometricEngine:
             is_match = float(dist) < 0.6
             return is_match, float(dist)
         except Exception:
-            # If face_recognition isn't available or parsing failed, return not matched
+            # If parsing failed, return not matched
             return False, 999.0
 
 # ------------------------------
-# DATABASE CONNECTION
+# DATABASE QUERIES (called with a pooled connection by db_pool.run)
 # ------------------------------
-def get_db():
-    db_config = {
-        "dbname": os.getenv("DB_NAME", "verify_db"),
-        "user": os.getenv("DB_USER", "postgres"),
-        "password": os.getenv("DB_PASSWORD", "postgres"),  # Change this to your actual password
-        "host": os.getenv("DB_HOST", "localhost"),
-    }
-    return psycopg2.connect(**db_config)
+CHAIN_APPEND_LOCK_ID = 0xB10C  # pg_advisory_xact_lock key held while a block is mined and appended
+
+def store_citizen_block(conn, citizen_data, citizen_index_row):
+    """Mine a block for the citizen, append it to the ledger and index the citizen, in one transaction."""
+    cursor = conn.cursor()
+    bc = SQLBlockchain(conn)
+
+    # Concurrent registrations would mine on the same last block; appends take turns
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (CHAIN_APPEND_LOCK_ID,))
+
+    # Mine the Block
+    new_block = bc.mine_block(citizen_data)
+
+    # Insert into Blockchain Ledger
+    cursor.execute("""
+        INSERT INTO blockchain_blocks 
+        (block_index, previous_hash, data, timestamp, nonce, block_hash)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (
+        new_block['index'],
+        new_block['previous_hash'],
+        new_block['data'],  # already JSON text, stored as JSONB
+        new_block['timestamp'],
+        new_block['nonce'],
+        new_block['block_hash']
+    ))
+
+    # Insert into Citizen Index Table
+    cursor.execute("""
+        INSERT INTO citizen_index (
+            full_name,
+            aadhaar_number_hash,
+            pan_number,
+            dob,
+            gender,
+            phone_number,
+            face_encoding,
+            face_encoding_json,
+            aadhaar_card_path,
+            pan_card_path,
+            latest_block_hash,
+            is_verified
+        )
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE)
+    """, citizen_index_row + (new_block['block_hash'],))
+
+    conn.commit()
+    return new_block
+
+
+def fetch_citizen_block(conn, pan_number, citizen=None):
+    """((latest block hash, stored face encoding or None), latest block row or None) for a PAN,
+    or None if it is not indexed. A cached `citizen` skips the index lookup.
+    """
+    cursor = conn.cursor()
+    if citizen is None:
+        # The JSON encoding is only fetched for rows that have no binary one yet
+        cursor.execute("""
+            SELECT latest_block_hash, face_encoding,
+                   CASE WHEN face_encoding IS NULL THEN face_encoding_json END
+            FROM citizen_index
+            WHERE pan_number = %s
+        """, (pan_number,))
+        result = cursor.fetchone()
+        if not result:
+            return None
+        latest_block_hash, stored_face, stored_face_json = result
+        citizen = (latest_block_hash, read_face(stored_face, stored_face_json))
+
+    cursor.execute("""
+        SELECT block_index, previous_hash, data, timestamp, nonce, block_hash 
+        FROM blockchain_blocks 
+        WHERE block_hash = %s
+    """, (citizen[0],))
+    return citizen, cursor.fetchone()
 
 # -------------------------------------------------------------
 #  REGISTER CITIZEN + STORE ON BLOCKCHAIN + INSERT INTO INDEX
@@ -94,20 +325,18 @@ async def register_citizen(
     id_photo: UploadFile = File(...)
 ):
 
-    # 1. Process Biometrics
-    if MOCK_BIOMETRICS:
-        # Mock mode: generate a dummy 128-d encoding
-        encoding = [0.0] * 128
-    else:
-        image = face_recognition.load_image_file(id_photo.file)
-        try:
-            encoding = face_recognition.face_encodings(image)[0].tolist()
-        except Exception:
-            raise HTTPException(400, "No face found in ID photo.")
+    # 1. Process Biometrics (mock mode: a dummy 128-d encoding)
+    encodings = await encode_photo(id_photo)
+    if not encodings:
+        raise HTTPException(400, "No face found in ID photo.")
+    encoding = encodings[0].tolist()
 
     # 2. Prepare Data for BLOCKCHAIN ONLY (Minimal & Hashed)
     aadhaar_hash = hashlib.sha256(aadhaar_number.encode()).hexdigest()
 
+    # Duplicate identity check: is this face already registered under another PAN?
+    reserved = await reserve_face(pan_number, encoding)
+
     citizen_data = {
         "full_name": full_name,
         "pan": pan_number,
@@ -116,71 +345,37 @@ async def register_citizen(
         "verification_status": "VERIFIED_ORIGINAL"
     }
 
-    conn = get_db()
     try:
-        cursor = conn.cursor()
-        bc = SQLBlockchain(conn)
-
-        # 3. Mine the Block
-        new_block = bc.mine_block(citizen_data)
-
-        # 4. Insert into Blockchain Ledger
-        cursor.execute("""
-            INSERT INTO blockchain_blocks 
-            (block_index, previous_hash, data, timestamp, nonce, block_hash)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            new_block['index'],
-            new_block['previous_hash'],
-            json.dumps(new_block['data']),
-            new_block['timestamp'],
-            new_block['nonce'],
-            new_block['block_hash']
-        ))
-
-        # 5. Insert into Citizen Index Table
-        cursor.execute("""
-            INSERT INTO citizen_index (
-                full_name,
-                aadhaar_number_hash,
-                pan_number,
-                dob,
-                gender,
-                phone_number,
-                face_encoding_json,
-                aadhaar_card_path,
-                pan_card_path,
-                latest_block_hash,
-                is_verified
-            )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE)
-        """, (
+        # 3-5. Mine the block and insert it with the citizen index row
+        new_block = await db_pool.run(store_citizen_block, citizen_data, (
             full_name,
             aadhaar_hash,
             pan_number,
             dob,
             gender,
             phone_number,
-            json.dumps(encoding),
+            encode_face(encoding),
+            json.dumps(encoding) if FACE_ENCODING_WRITE_JSON else None,
             aadhaar_card_path,
             pan_card_path,
-            new_block['block_hash']
         ))
-
-        conn.commit()
-
-        return {
-            "status": "SUCCESS",
-            "block_hash": new_block['block_hash'],
-            "msg": "Citizen successfully mined to blockchain."
-        }
-
     except Exception as e:
-        conn.rollback()
+        if reserved:
+            # Release the face so a corrected registration is not rejected as a duplicate
+            face_index.remove(pan_number)
+        if isinstance(e, PoolTimeout):
+            raise HTTPException(503, str(e), headers={"Retry-After": "1"})
         raise HTTPException(500, str(e))
 
-    finally:
-        conn.close()
+    face_index.add(pan_number, encoding)
+    schedule_face_index_training()
+    if citizen_cache is not None:
+        citizen_cache.invalidate(pan_number)
+    return {
+        "status": "SUCCESS",
+        "block_hash": new_block['block_hash'],
+        "msg": "Citizen successfully mined to blockchain."
+    }
 
 
 # --------------------------------------------------------------------
@@ -191,38 +386,35 @@ async def verify_citizen(
     pan_number: str = Form(...),
     live_selfie: UploadFile = File(...)
 ):
-    conn = get_db()
-    cursor = conn.cursor()
-
-    # 1. Fetch citizen’s latest block hash
-    cursor.execute("""
-        SELECT latest_block_hash, face_encoding_json
-        FROM citizen_index
-        WHERE pan_number = %s
-    """, (pan_number,))
-    result = cursor.fetchone()
+    # 1-2. Fetch citizen’s latest block hash (cached for recent verifications) and the corresponding block
+    cached = citizen_cache.get(pan_number) if citizen_cache is not None else None
+    try:
+        result = await db_pool.run(fetch_citizen_block, pan_number, cached)
+    except PoolTimeout as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": "1"})
+    except FaceCodecError:
+        return {"status": "ERROR", "reason": "Stored biometric data is unreadable."}
 
     if not result:
         return {"status": "FAILED", "reason": "Citizen not found in index."}
 
-    latest_block_hash, stored_face_json = result
-
-    # 2. Fetch corresponding block from blockchain
-    cursor.execute("""
-        SELECT block_index, previous_hash, data, timestamp, nonce, block_hash 
-        FROM blockchain_blocks 
-        WHERE block_hash = %s
-    """, (latest_block_hash,))
-    block_row = cursor.fetchone()
+    citizen, block_row = result
+    if citizen_cache is not None and cached is None:
+        citizen_cache.put(pan_number, citizen)
+    stored_face = citizen[1]
 
     if not block_row:
         return {"status": "FAILED", "reason": "Blockchain record missing."}
 
+    if stored_face is None:
+        return {"status": "ERROR", "reason": "No biometric data registered for this citizen."}
+
     block_index, prev_hash, block_data, timestamp, nonce, block_hash = block_row
-    block_data = json.loads(block_data)
+    if isinstance(block_data, str):
+        block_data = json.loads(block_data)  # psycopg2 decodes JSONB; TEXT needs parsing
 
     # 3. Recalculate block hash → check tampering
-    bc = SQLBlockchain(conn)
+    bc = SQLBlockchain(None)
     recalc_hash = bc.calculate_hash(
         index=block_index,
         previous_hash=prev_hash,
@@ -234,18 +426,15 @@ async def verify_citizen(
     integrity = "PASSED" if recalc_hash == block_hash else "FAILED"
 
     # 4. Biometric Face Matching
-    live_image = face_recognition.load_image_file(live_selfie.file)
-
     try:
-        live_encoding = face_recognition.face_encodings(live_image)[0]
-    except:
+        live_encodings = await encode_photo(live_selfie, reject_unreadable=False)
+    except InvalidImage:
+        return {"status": "REJECTED", "reason": "Face mismatch"}
+    if not live_encodings:
         return {"status": "ERROR", "reason": "No face detected in selfie."}
 
-    match = face_recognition.compare_faces(
-        [np.array(json.loads(stored_face_json))],
-        live_encoding,
-        tolerance=0.5
-    )[0]
+    # Same test as face_recognition.compare_faces(..., tolerance=0.5)
+    match = np.linalg.norm(stored_face - live_encodings[0]) <= 0.5
 
     if not match:
         return {"status": "REJECTED", "reason": "Face mismatch"}
@@ -256,3 +445,39 @@ async def verify_citizen(
         "block_hash": block_hash,
         "biometric": "MATCH"
     }
+
+
+# ------------------------------
+# POOL, FACE INDEX AND CACHE METRICS
+# ------------------------------
+@app.get("/metrics/db-pool")
+async def db_pool_metrics():
+    """Size, usage, waits and timeouts of the database connection pool."""
+    return db_pool.stats()
+
+
+@app.get("/metrics/face-index")
+async def face_index_metrics():
+    """Size and search timings of the face index, and registrations rejected as duplicates."""
+    return {
+        **face_index.stats(),
+        "synced": face_index_synced,
+        "sync_age_seconds": round(time.monotonic() - face_index_synced_at, 3) if face_index_synced else None,
+        "dedup_enabled": FACE_DEDUP,
+        "dedup_distance": FACE_DEDUP_DISTANCE,
+        "duplicates_rejected": duplicates_rejected,
+    }
+
+
+@app.get("/metrics/citizen-cache")
+async def citizen_cache_metrics():
+    """Hit rate and size of the cache of citizens looked up by integrity-check verifications."""
+    if citizen_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **citizen_cache.stats()}
+
+
+@app.get("/metrics/biometrics")
+async def biometric_metrics():
+    """Load, timeouts and per-stage timings (queue, decode, detect, embed) of the biometric pool."""
+    return biometric_pool.stats()